@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Бенчмарки горячих путей клиента. Запуск: python -m benchmarks.<модуль>"""
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк решений AI и полного кадра персонажа в безголовом режиме:
+AIController.choose_new_action, AIController.evaluate_jumps и WaifuCharacter.update.
+
+Запуск: python -m benchmarks.bench_ai
+"""
+import time
+
+import config
+from waifu.simulation import create_headless_character, run_simulation
+
+WINDOW_COUNTS = (10, 50, 150)
+DECISIONS = 200
+FRAMES = 6000
+
+
+def _settle(character):
+    """Дает персонажу упасть на платформу, чтобы AI мог принимать решения."""
+    for _ in range(600):
+        character.update(1000 / config.FPS)
+        if character.physics.on_ground:
+            break
+
+
+def bench_decisions(windows, decisions=DECISIONS, seed=0):
+    """Возвращает (мкс на choose_new_action, мкс на evaluate_jumps) для сцены с windows окнами."""
+    character = create_headless_character(seed=seed, windows=windows)
+    _settle(character)
+    ai, physics = character.ai, character.physics
+    current = physics.current_platform
+    others = [p for p in ai.platforms if p is not current and p.top > 0]
+
+    start = time.perf_counter()
+    for _ in range(decisions):
+        ai.evaluate_jumps(current, others)
+    evaluate_us = (time.perf_counter() - start) / decisions * 1e6
+
+    start = time.perf_counter()
+    for _ in range(decisions):
+        ai.choose_new_action()
+        ai.reset_target() # Решение не исполняем: персонаж остается на месте
+    choose_us = (time.perf_counter() - start) / decisions * 1e6
+
+    character.shutdown()
+    return choose_us, evaluate_us
+
+
+def bench_frame(windows, frames=FRAMES, seed=0):
+    """Среднее время WaifuCharacter.update() за кадр в микросекундах."""
+    character = create_headless_character(seed=seed, windows=windows)
+    stats = run_simulation(character, frames)
+    character.shutdown()
+    return stats["elapsed_s"] / frames * 1e6
+
+
+def run():
+    return {windows: bench_decisions(windows) + (bench_frame(windows),) for windows in WINDOW_COUNTS}
+
+
+def collect():
+    metrics = []
+    for windows, (choose_us, evaluate_us, frame_us) in run().items():
+        metrics.append((f"ai.choose_new_action_us[windows={windows}]", choose_us, "us", "lower"))
+        metrics.append((f"ai.evaluate_jumps_us[windows={windows}]", evaluate_us, "us", "lower"))
+        metrics.append((f"character.frame_us[windows={windows}]", frame_us, "us", "lower"))
+    return metrics
+
+
+if __name__ == "__main__":
+    for windows, (choose_us, evaluate_us, frame_us) in run().items():
+        print(f"{windows:>4} окон: choose_new_action {choose_us:8.1f} мкс, "
+              f"evaluate_jumps {evaluate_us:8.1f} мкс, кадр {frame_us:6.1f} мкс")
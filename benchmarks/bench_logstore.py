@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк журнала логов сервера (server/logstore.py): скорость дозаписи,
+задержка случайного чтения по offset (из памяти и с диска), выборки по времени
+и время открытия журнала после перезапуска.
+
+Запуск: python -m benchmarks.bench_logstore
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+RECORDS = 100000
+READS = 2000
+PAGE = 100
+SEGMENT_BYTES = 4 * 1024 * 1024
+
+RECORD = {
+    "timestamp": "2025-01-01T12:00:00.000000",
+    "level": "INFO",
+    "message": "2025-01-01 12:00:00,000 - waifu.character - INFO - Состояние: walk",
+    "source": "waifu.character",
+    "client_id": "a1b2c3d4",
+    "type": "log",
+}
+
+
+def _open(directory):
+    """Открывает журнал из server/ (модули сервера импортируются без пакета)."""
+    if SERVER_DIR not in sys.path:
+        sys.path.insert(0, SERVER_DIR)
+    from logstore import LogStore
+    return LogStore(directory, segment_bytes=SEGMENT_BYTES)
+
+
+def bench_append(directory, records=RECORDS):
+    """Записей в секунду при дозаписи по одной (как в обработчике /log)."""
+    store = _open(directory)
+    start_time = time.time() - records * 0.001
+    start = time.perf_counter()
+    for i in range(records):
+        store.append(json.dumps(dict(RECORD, offset=i), ensure_ascii=False), timestamp=start_time + i * 0.001)
+    elapsed = time.perf_counter() - start
+    store.close()
+    return records / elapsed
+
+
+def _read_latency(read, reads=READS):
+    """Средняя задержка одного вызова read() в микросекундах."""
+    start = time.perf_counter()
+    for _ in range(reads):
+        read()
+    return (time.perf_counter() - start) / reads * 1e6
+
+
+def bench_reads(directory):
+    """Задержки чтения (мкс): из памяти, с диска по offset, страница с диска, по времени."""
+    start = time.perf_counter()
+    store = _open(directory)
+    open_ms = (time.perf_counter() - start) * 1000
+    hot_start = store.hot[0][0]
+    cold_end = hot_start - PAGE
+    first_time, last_time = store.read(0, 1)[0][1], store.hot[0][1]
+    results = {
+        "open_ms": open_ms,
+        "hot_us": _read_latency(lambda: store.read(random.randrange(hot_start, store.next_offset), 1)),
+        "cold_us": _read_latency(lambda: store.read(random.randrange(0, cold_end), 1)),
+        "cold_page_us": _read_latency(lambda: store.read(random.randrange(0, cold_end), PAGE)),
+        "time_us": _read_latency(lambda: store.read_time(random.uniform(first_time, last_time), None, PAGE)),
+    }
+    store.close()
+    return results
+
+
+def run():
+    directory = tempfile.mkdtemp(prefix="waifu_logstore_")
+    try:
+        return dict(append_rps=bench_append(directory), **bench_reads(directory))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def collect():
+    results = run()
+    return [
+        ("logstore.append_rps", results["append_rps"], "rec/s", "higher"),
+        (f"logstore.open_ms[records={RECORDS}]", results["open_ms"], "ms", "lower"),
+        ("logstore.read_us[hot]", results["hot_us"], "us", "lower"),
+        ("logstore.read_us[cold]", results["cold_us"], "us", "lower"),
+        (f"logstore.read_us[cold,page={PAGE}]", results["cold_page_us"], "us", "lower"),
+        (f"logstore.read_time_us[page={PAGE}]", results["time_us"], "us", "lower"),
+    ]
+
+
+if __name__ == "__main__":
+    for name, value, unit, _ in collect():
+        print(f"{name}: {value:.1f} {unit}")
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк расчета видимых участков граней окон (visible_top_edges)
+и сокращения числа платформ, которое он дает.
+
+Запуск: python -m benchmarks.bench_occlusion
+"""
+import time
+
+from waifu.backends.windows import Monitor, SyntheticWindowSource
+from waifu.occlusion import visible_top_edges
+
+MONITORS = [Monitor(0, 0, 1920, 1080, True), Monitor(1920, 0, 1920, 1080, False)]
+WINDOW_COUNTS = (50, 100, 500)
+REPEATS = 5
+
+
+def bench_occlusion(count, repeats=REPEATS):
+    """Возвращает (мс на расчет, число граней без учета перекрытия, число видимых сегментов)."""
+    rects = [w.rect for w in SyntheticWindowSource.random(count, monitors=MONITORS).get_windows()]
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        edges = visible_top_edges(rects)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(rects), sum(len(segments) for segments in edges)
+
+
+def run():
+    return {count: bench_occlusion(count) for count in WINDOW_COUNTS}
+
+
+def collect():
+    return [(f"occlusion.visible_edges_ms[windows={count}]", ms, "ms", "lower") for count, (ms, _, _) in run().items()]
+
+if __name__ == "__main__":
+    for count, (ms, edges, segments) in run().items():
+        print(f"{count:>4} окон: {ms:7.2f} мс, граней {edges}, видимых сегментов {segments}")
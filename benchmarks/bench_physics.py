@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк PhysicsController.update в зависимости от количества платформ.
+Стоимость шага должна оставаться примерно постоянной от 10 до 1000 платформ.
+
+Запуск: python -m benchmarks.bench_physics
+"""
+import random
+import time
+
+import config
+from waifu.physics import PhysicsController
+from waifu.platform import Platform, PlatformIndex
+
+DESKTOP_WIDTH, DESKTOP_HEIGHT = 5760, 1080 # Три монитора 1920x1080
+PLATFORM_COUNTS = (10, 100, 250, 500, 1000)
+STEPS = 20000
+REPEATS = 3
+
+
+def make_platforms(count, seed=0):
+    """Генерирует случайные "окна" и пол рабочего стола."""
+    rng = random.Random(seed)
+    platforms = [Platform(0, DESKTOP_HEIGHT, DESKTOP_WIDTH, DESKTOP_HEIGHT + 2)]
+    for _ in range(count - 1):
+        width = rng.randint(200, 1200)
+        left = rng.randint(0, DESKTOP_WIDTH - width)
+        top = rng.randint(50, DESKTOP_HEIGHT - 100)
+        platforms.append(Platform(left, top, left + width, top + 2))
+    return platforms
+
+
+def bench_step(count, steps=STEPS, seed=0, repeats=REPEATS):
+    """Возвращает лучшее из repeats среднее время шага физики в микросекундах."""
+    return min(_bench_step_once(count, steps, seed) for _ in range(repeats))
+
+
+def _bench_step_once(count, steps, seed):
+    index = PlatformIndex(make_platforms(count, seed))
+    physics = PhysicsController(config.SPRITE_WIDTH, config.SPRITE_HEIGHT)
+    rng = random.Random(seed)
+    dt = config.PHYSICS_INTERVAL / 1000
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        if physics.on_ground or physics.y > DESKTOP_HEIGHT:
+            # Подбрасываем персонажа в случайную точку, чтобы покрыть и падения, и прыжки
+            physics.x = rng.uniform(0, DESKTOP_WIDTH - config.SPRITE_WIDTH)
+            physics.y = rng.uniform(0, DESKTOP_HEIGHT - config.SPRITE_HEIGHT)
+            physics.dx = rng.uniform(-300, 300)
+            physics.dy = rng.uniform(-1200, 300)
+            physics.on_ground = False
+        physics.update(index, dt)
+    return (time.perf_counter() - start) / steps * 1e6
+
+
+def run():
+    return {count: bench_step(count) for count in PLATFORM_COUNTS}
+
+
+def collect():
+    return [(f"physics.step_us[platforms={count}]", us, "us", "lower") for count, us in run().items()]
+
+if __name__ == "__main__":
+    for count, us in run().items():
+        print(f"{count:>5} платформ: {us:7.2f} мкс/шаг")
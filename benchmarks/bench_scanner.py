@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк фонового сканера платформ на синтетическом источнике окон.
+Показывает длительность сканирования, задержку подмены и стоимость
+PlatformManager.update() на основном потоке, пока сканер работает.
+
+Запуск: python -m benchmarks.bench_scanner
+"""
+import time
+
+import config
+from waifu.backends.windows import Monitor, SyntheticWindowSource
+from waifu.controllers.platform import PlatformManager
+
+MONITORS = [Monitor(0, 0, 1920, 1080, True), Monitor(1920, 0, 1920, 1080, False)]
+WINDOW_COUNTS = (10, 100, 500)
+SCAN_DELAY = 0.02 # Имитация EnumWindows
+FRAMES = 300
+
+
+class _Character:
+    """Минимальная заглушка персонажа: PlatformManager лишь уведомляет его о новых платформах."""
+    y = 0
+    width, height = config.SPRITE_WIDTH, config.SPRITE_HEIGHT
+    def update_platforms_list(self, platforms, diff=None): pass
+
+
+def bench_scanner(count, frames=FRAMES):
+    source = SyntheticWindowSource.random(count, monitors=MONITORS, scan_delay=SCAN_DELAY)
+    manager = PlatformManager(_Character(), None, source=source)
+
+    saved_interval = config.PLATFORM_UPDATE_INTERVAL
+    config.PLATFORM_UPDATE_INTERVAL = 0.05
+    try:
+        manager.start()
+        swaps, worst_frame, latencies = manager.scan_count, 0.0, []
+        for _ in range(frames):
+            start = time.perf_counter()
+            manager.update(1000 / config.FPS)
+            worst_frame = max(worst_frame, time.perf_counter() - start)
+            if manager.scan_count != swaps:
+                swaps = manager.scan_count
+                latencies.append(manager.last_swap_latency)
+            time.sleep(1 / config.FPS)
+    finally:
+        manager.stop()
+        config.PLATFORM_UPDATE_INTERVAL = saved_interval
+
+    return {
+        "scan_ms": manager.last_scan_duration * 1000,
+        "swap_latency_ms": (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+        "worst_update_ms": worst_frame * 1000,
+        "swaps": len(latencies),
+    }
+
+
+def run():
+    return {count: bench_scanner(count) for count in WINDOW_COUNTS}
+
+
+def collect():
+    metrics = []
+    for count, r in run().items():
+        metrics.append((f"scanner.scan_ms[windows={count}]", r["scan_ms"], "ms", "lower"))
+        metrics.append((f"scanner.worst_update_ms[windows={count}]", r["worst_update_ms"], "ms", "lower"))
+    return metrics
+
+if __name__ == "__main__":
+    for count, r in run().items():
+        print(f"{count:>4} окон: сканирование {r['scan_ms']:6.2f} мс, подмена через {r['swap_latency_ms']:6.2f} мс, "
+              f"худший update() {r['worst_update_ms']:.3f} мс ({r['swaps']} подмен)")
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк сервера (server/main.py): пропускная способность POST /status и /log
+и стоимость рассылки по WebSocket, нагрузочный тест рассылки на сотни зрителей,
+один из которых намеренно медленный, выигрыш от склейки событий в кадры
+и стоимость рассылки по фильтрованным подпискам (индекс против перебора). InfluxDB заменяется заглушкой в процессе.
+Требует зависимостей сервера (server/requirements.txt) и httpx.
+
+Запуск: python -m benchmarks.bench_server
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+REQUESTS = 500
+VIEWERS = (1, 50, 200)
+BROADCASTS = 200
+LOAD_VIEWERS = 500
+LOAD_MESSAGES = 2000
+SLOW_DELAY = 0.05 # Секунд на одно сообщение у медленного зрителя
+COALESCE_EVENTS = 2000
+COALESCE_BURST = 100 # Событий между паузами - как всплеск логов от многих клиентов
+FILTER_VIEWERS = 500 # Каждый зритель следит за своим клиентом
+FILTER_EVENTS = 5000
+
+
+class FakeWriteApi:
+    """Заглушка influxdb_client WriteApi: только считает записанные точки."""
+    def __init__(self):
+        self.points = 0
+
+    def write(self, bucket=None, org=None, record=None, **kwargs):
+        self.points += len(record) if isinstance(record, list) else 1
+
+
+class FakeWebSocket:
+    """Заглушка WebSocket-зрителя: принимает сообщения без сетевого ввода-вывода (delay - медленный зритель)."""
+    def __init__(self, delay=0.0, keep=False):
+        self.delay = delay
+        self.received = 0
+        self.messages = [] if keep else None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        else:
+            await asyncio.sleep(0) # Как настоящий сокет - отдает управление циклу событий
+        self.received += 1
+        if self.messages is not None:
+            self.messages.append(message)
+
+    async def close(self, code=1000):
+        pass
+
+
+def load_server():
+    """Импортирует server/main.py как отдельный модуль с заглушкой InfluxDB."""
+    if SERVER_DIR not in sys.path:
+        sys.path.insert(0, SERVER_DIR)
+    os.environ.setdefault("LOG_STORE_DIR", tempfile.mkdtemp(prefix="waifu_logstore_"))
+    spec = importlib.util.spec_from_file_location("waifu_server", os.path.join(SERVER_DIR, "main.py"))
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    server.write_api = FakeWriteApi()
+    logging.getLogger(server.__name__).setLevel(logging.WARNING)
+    return server
+
+
+def _status_payload(i):
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "action": "walk" if i % 2 else "idle",
+        "x": i, "y": 500,
+        "active_window_title": "Visual Studio Code",
+        "active_window_process": "Code.exe",
+    }
+
+
+def _log_payload(i):
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "level": "INFO",
+        "message": f"Сообщение {i}",
+        "source": "bench",
+        "client_id": "bench",
+    }
+
+
+def bench_http(server, path, payload_factory, requests=REQUESTS):
+    """Запросов в секунду для POST path через TestClient."""
+    from fastapi.testclient import TestClient
+    with TestClient(server.app) as client:
+        start = time.perf_counter()
+        for i in range(requests):
+            client.post(path, json=payload_factory(i))
+        return requests / (time.perf_counter() - start)
+
+
+def bench_broadcast(server, viewers, broadcasts=BROADCASTS):
+    """Микросекунд на одну рассылку manager.broadcast всем viewers зрителям."""
+    async def scenario():
+        manager = server.ConnectionManager()
+        for _ in range(viewers):
+            await manager.connect(FakeWebSocket())
+        start = time.perf_counter()
+        for i in range(broadcasts):
+            await manager.broadcast(f"Статус: walk {i}")
+        return (time.perf_counter() - start) / broadcasts * 1e6
+    return asyncio.run(scenario())
+
+
+def bench_fanout(server, viewers=LOAD_VIEWERS, messages=LOAD_MESSAGES):
+    """
+    Нагрузочный тест: viewers зрителей, один медленный. Возвращает (мкс на broadcast,
+    доля доставленного быстрым зрителям, сколько сообщений потеряно медленным).
+    """
+    async def scenario():
+        manager = server.ConnectionManager(max_queue=100)
+        fast = [FakeWebSocket() for _ in range(viewers - 1)]
+        slow = FakeWebSocket(delay=SLOW_DELAY)
+        for websocket in fast + [slow]:
+            await manager.connect(websocket)
+        async def drain_fast():
+            while any(s.queue for ws, s in manager.subscribers.items() if ws is not slow):
+                await asyncio.sleep(0)
+
+        elapsed = 0.0
+        for i in range(messages):
+            start = time.perf_counter()
+            await manager.broadcast(f"Статус: walk {i}")
+            elapsed += time.perf_counter() - start
+            if i % 50 == 49:
+                await drain_fast() # Пачками по 50, как между запросами; медленный зритель не ждем
+        await drain_fast()
+        delivered = sum(ws.received for ws in fast) / (len(fast) * messages)
+        dropped = manager.subscribers[slow].dropped
+        await manager.close_all()
+        return elapsed / messages * 1e6, delivered, dropped
+    return asyncio.run(scenario())
+
+
+def wire_bytes(frames):
+    """
+    Байт на проводе для последовательности кадров при permessage-deflate:
+    общий контекст сжатия, Z_SYNC_FLUSH на каждый кадр и заголовок кадра.
+    """
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    total = 0
+    for frame in frames:
+        payload = len(compressor.compress(frame.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+        total += payload + (2 if payload < 126 else 4)
+    return total
+
+
+def bench_coalesce(server, viewers=VIEWERS[-1], events=COALESCE_EVENTS, burst=COALESCE_BURST):
+    """
+    Склейка событий: (мкс на publish, событий в кадре,
+    байт на событие на проводе по одному кадру на событие / со склейкой).
+    """
+    async def scenario():
+        manager = server.ConnectionManager()
+        coalescer = server.BroadcastCoalescer(manager, window=0.005)
+        sockets = [FakeWebSocket(keep=i == 0) for i in range(viewers)]
+        for websocket in sockets:
+            await manager.connect(websocket)
+        encoded = []
+        elapsed = 0.0
+        for i in range(events):
+            start = time.perf_counter()
+            encoded.append(coalescer.publish(_log_payload(i)))
+            elapsed += time.perf_counter() - start
+            if i % burst == burst - 1:
+                await asyncio.sleep(coalescer.window * 2)
+        coalescer.flush()
+        while any(s.queue for s in manager.subscribers.values()):
+            await asyncio.sleep(0)
+        frames = sockets[0].messages
+        await manager.close_all()
+        single = wire_bytes(f"[{e}]" for e in encoded)
+        return elapsed / events * 1e6, events / len(frames), single / events, wire_bytes(frames) / events
+    return asyncio.run(scenario())
+
+
+def bench_filtered(server, viewers=FILTER_VIEWERS, events=FILTER_EVENTS):
+    """
+    Фильтрованные подписки: (мкс на событие через индекс, мкс на событие при
+    переборе всех подписок, доставок на событие).
+    """
+    from connections import encode_event
+    from subscriptions import Subscription, event_key
+
+    async def scenario():
+        manager = server.ConnectionManager(max_queue=events)
+        specs = []
+        for i in range(viewers):
+            websocket = FakeWebSocket()
+            await manager.connect(websocket)
+            spec = Subscription(client_ids=[f"client{i}"], min_level=logging.INFO if i % 2 else logging.WARNING)
+            manager.subscribe(websocket, spec)
+            specs.append(spec)
+        levels = ("DEBUG", "INFO", "WARNING", "ERROR")
+        batch = [(encode_event(_log_payload(i)), event_key(dict(_log_payload(i), client_id=f"client{i % viewers}",
+                                                                      level=levels[i % 4])))
+                 for i in range(events)]
+
+        deliveries = sum(1 for _, key in batch for _ in manager.filters.match(key))
+        start = time.perf_counter()
+        manager.broadcast_events(batch)
+        indexed = (time.perf_counter() - start) / events * 1e6
+
+        start = time.perf_counter()
+        for _, (client_id, level, source, event_type) in batch:
+            for spec in specs:
+                if (spec.client_ids is None or client_id in spec.client_ids) and level >= spec.min_level \
+                        and spec.matches_rest(source, event_type):
+                    pass
+        scan = (time.perf_counter() - start) / events * 1e6
+        await manager.close_all()
+        return indexed, scan, deliveries / events
+    return asyncio.run(scenario())
+
+
+def run():
+    logging.disable(logging.INFO)
+    try:
+        server = load_server()
+        return {
+            "status_rps": bench_http(server, "/status", _status_payload),
+            "log_rps": bench_http(server, "/log", _log_payload),
+            "broadcast_us": {viewers: bench_broadcast(server, viewers) for viewers in VIEWERS},
+            "fanout": bench_fanout(server),
+            "coalesce": bench_coalesce(server),
+            "filtered": bench_filtered(server),
+        }
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def collect():
+    try:
+        results = run()
+    except ImportError as e:
+        logging.warning(f"Бенчмарк сервера пропущен: {e}")
+        return []
+    metrics = [
+        ("server.status_rps", results["status_rps"], "req/s", "higher"),
+        ("server.log_rps", results["log_rps"], "req/s", "higher"),
+    ]
+    for viewers, us in results["broadcast_us"].items():
+        metrics.append((f"server.broadcast_us[viewers={viewers}]", us, "us", "lower"))
+    broadcast_us, delivered, dropped = results["fanout"]
+    metrics.append((f"server.fanout_broadcast_us[viewers={LOAD_VIEWERS},slow=1]", broadcast_us, "us", "lower"))
+    metrics.append(("server.fanout_fast_delivered", delivered * 100, "%", "higher"))
+    metrics.append(("server.fanout_slow_dropped", dropped, "messages", "lower"))
+    publish_us, per_frame, single_bytes, batched_bytes = results["coalesce"]
+    metrics.append((f"server.coalesce_publish_us[viewers={VIEWERS[-1]}]", publish_us, "us", "lower"))
+    metrics.append(("server.coalesce_events_per_frame", per_frame, "events", "higher"))
+    metrics.append(("server.wire_bytes_per_event[single]", single_bytes, "B", "lower"))
+    metrics.append(("server.wire_bytes_per_event[coalesced]", batched_bytes, "B", "lower"))
+    indexed_us, scan_us, deliveries = results["filtered"]
+    metrics.append((f"server.filtered_event_us[index,viewers={FILTER_VIEWERS}]", indexed_us, "us", "lower"))
+    metrics.append((f"server.filtered_event_us[scan,viewers={FILTER_VIEWERS}]", scan_us, "us", "lower"))
+    metrics.append(("server.filtered_deliveries_per_event", deliveries, "viewers", "lower"))
+    return metrics
+
+
+if __name__ == "__main__":
+    for name, value, unit, _ in collect():
+        print(f"{name}: {value:.1f} {unit}")
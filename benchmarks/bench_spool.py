@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк дискового спула телеметрии: скорость записи (пачками разного размера)
+и досылки (чтение + фиксация позиции) типичных записей лога.
+
+Запуск: python -m benchmarks.bench_spool
+"""
+import shutil
+import tempfile
+import time
+
+from waifu.spool import Spool
+
+RECORDS = 20000
+BATCH_SIZES = (1, 50, 1000)
+DRAIN_BATCH = 1000
+
+RECORD = {
+    "timestamp": "2025-01-01T12:00:00.000000",
+    "level": "INFO",
+    "message": "2025-01-01 12:00:00,000 - waifu.character - INFO - Состояние: walk",
+    "source": "waifu.character",
+    "client_id": "a1b2c3d4",
+}
+
+
+def bench_append(batch_size, records=RECORDS):
+    """Возвращает записей в секунду при дозаписи пачками batch_size."""
+    directory = tempfile.mkdtemp(prefix="waifu_spool_")
+    try:
+        spool = Spool(directory)
+        batch = [RECORD] * batch_size
+        start = time.perf_counter()
+        for _ in range(records // batch_size):
+            spool.append(batch)
+        elapsed = time.perf_counter() - start
+        spool.close()
+        return records / elapsed
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_drain(records=RECORDS):
+    """Возвращает записей в секунду при досылке спула пачками DRAIN_BATCH."""
+    directory = tempfile.mkdtemp(prefix="waifu_spool_")
+    try:
+        spool = Spool(directory, segment_size=256 * 1024)
+        spool.append([RECORD] * records)
+        start = time.perf_counter()
+        while spool.pending:
+            _, cursor = spool.read(DRAIN_BATCH)
+            spool.commit(cursor)
+        elapsed = time.perf_counter() - start
+        spool.close()
+        return records / elapsed
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run():
+    return {
+        "append": {size: bench_append(size) for size in BATCH_SIZES},
+        "drain": bench_drain(),
+    }
+
+
+def collect():
+    result = run()
+    metrics = [(f"spool.append_per_s[batch={size}]", rate, "records/s", "higher")
+               for size, rate in result["append"].items()]
+    metrics.append(("spool.drain_per_s", result["drain"], "records/s", "higher"))
+    return metrics
+
+if __name__ == "__main__":
+    result = run()
+    for size, rate in result["append"].items():
+        print(f"Запись пачками по {size:>4}: {rate:10.0f} записей/с")
+    print(f"Досылка пачками по {DRAIN_BATCH}: {result['drain']:10.0f} записей/с")
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк стоимости запуска: AnimationController.load_sprites
+без кеша (декодирование PNG, масштабирование и отражение кадров)
+и с прогретым дисковым кешем готовых кадров (waifu.sprite_cache),
+а также память под кадры атласа до и после использования всех кадров влево.
+
+Запуск: python -m benchmarks.bench_sprites
+"""
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import config
+from waifu.controllers.animation import AnimationController
+from waifu.sprite_cache import SpriteCache
+
+REPEATS = 5
+
+
+@contextmanager
+def _cache_dir():
+    """Временный каталог кеша спрайтов на время замера; прежний SPRITE_CACHE_DIR восстанавливается."""
+    directory = tempfile.mkdtemp(prefix="waifu_sprites_")
+    saved = config.SPRITE_CACHE_DIR
+    config.SPRITE_CACHE_DIR = directory
+    try:
+        yield directory
+    finally:
+        config.SPRITE_CACHE_DIR = saved
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_load(warm, repeats=REPEATS):
+    """Возвращает лучшее время load_sprites в миллисекундах (warm - с готовым кешем)."""
+    with _cache_dir() as directory:
+        controller = AnimationController(config.SPRITE_WIDTH, config.SPRITE_HEIGHT, headless=True)
+        best = float("inf")
+        for _ in range(repeats):
+            controller.sprite_cache = SpriteCache(directory)
+            if not warm:
+                shutil.rmtree(directory, ignore_errors=True)
+            start = time.perf_counter()
+            controller.load_sprites()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+
+def bench_memory():
+    """Возвращает (КБ сразу после загрузки, КБ после показа всех состояний в обе стороны)."""
+    with _cache_dir():
+        controller = AnimationController(config.SPRITE_WIDTH, config.SPRITE_HEIGHT, headless=True)
+    initial = controller.memory_bytes()
+    for state, frames in controller.animations.items():
+        for direction in ("right", "left"):
+            controller.reset()
+            for _ in frames:
+                controller.update(0, state, direction)
+                controller.get_current_sprite()
+                controller.update(frames[controller.current_sprite_index][1], state, direction)
+    return initial / 1024, controller.memory_bytes() / 1024
+
+
+def run():
+    memory_initial, memory_all = bench_memory()
+    return {"cold_ms": bench_load(warm=False), "warm_ms": bench_load(warm=True),
+            "memory_kb": memory_initial, "memory_all_kb": memory_all}
+
+
+def collect():
+    result = run()
+    return [
+        ("sprites.load_sprites_ms", result["cold_ms"], "ms", "lower"),
+        ("sprites.load_sprites_cached_ms", result["warm_ms"], "ms", "lower"),
+        ("sprites.memory_kb", result["memory_kb"], "KB", "lower"),
+        ("sprites.memory_all_directions_kb", result["memory_all_kb"], "KB", "lower"),
+    ]
+
+
+if __name__ == "__main__":
+    result = run()
+    print(f"load_sprites без кеша:  {result['cold_ms']:.1f} мс")
+    print(f"load_sprites из кеша:   {result['warm_ms']:.1f} мс")
+    print(f"Память кадров: {result['memory_kb']:.0f} КБ, со всеми кадрами влево: {result['memory_all_kb']:.0f} КБ")
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк get_desktop_windows на поддельном дереве окон.
+Время на одно окно верхнего уровня должно оставаться постоянным (линейный рост).
+
+Запуск: python -m benchmarks.bench_zorder
+"""
+import time
+
+from waifu.backends.fake_win32 import FakeWindowTree
+from waifu.utils import get_desktop_windows
+
+WINDOW_COUNTS = (500, 1000, 2000, 4000, 8000)
+REPEATS = 5
+
+
+def bench_enumeration(count, repeats=REPEATS):
+    """Возвращает (мс на сканирование, мкс на окно верхнего уровня, число видимых окон)."""
+    tree = FakeWindowTree.random(count)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        windows = get_desktop_windows(tree)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, best / count * 1e6, len(windows)
+
+
+def run():
+    return {count: bench_enumeration(count) for count in WINDOW_COUNTS}
+
+
+def collect():
+    return [(f"zorder.scan_ms[windows={count}]", ms, "ms", "lower") for count, (ms, _, _) in run().items()]
+
+if __name__ == "__main__":
+    for count, (ms, us_per_window, visible) in run().items():
+        print(f"{count:>5} окон ({visible:>4} видимых): {ms:7.2f} мс, {us_per_window:5.2f} мкс/окно")
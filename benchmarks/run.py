@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Набор бенчмарков клиента и сервера со стабильным JSON-форматом
+и сравнением с сохраненным базовым результатом.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --compare bench.json --threshold 10
+    python -m benchmarks.run --only physics ai
+
+Формат JSON:
+    {"format": 1, "timestamp": ..., "python": ..., "platform": ...,
+     "metrics": {"<имя>": {"value": float, "unit": str, "better": "lower"|"higher"}}}
+Код выхода 1, если при сравнении найден регресс больше порога.
+"""
+import argparse
+import importlib
+import json
+import logging
+import platform
+import sys
+from datetime import datetime
+
+import config
+
+FORMAT_VERSION = 1
+
+# Имя набора -> модуль с функцией collect(), возвращающей [(имя, значение, единица, better)]
+SUITES = {
+    "physics": "benchmarks.bench_physics",
+    "ai": "benchmarks.bench_ai",
+    "scanner": "benchmarks.bench_scanner",
+    "zorder": "benchmarks.bench_zorder",
+    "occlusion": "benchmarks.bench_occlusion",
+    "sprites": "benchmarks.bench_sprites",
+    "server": "benchmarks.bench_server",
+    "spool": "benchmarks.bench_spool",
+    "logstore": "benchmarks.bench_logstore",
+}
+
+
+def _collect_isolated(module):
+    """Запускает collect() набора и откатывает изменения настроек config, чтобы они не влияли на следующие наборы."""
+    saved = {name: value for name, value in vars(config).items() if name.isupper()}
+    try:
+        return module.collect()
+    finally:
+        for name in [name for name in vars(config) if name.isupper() and name not in saved]:
+            delattr(config, name)
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def run_suites(names):
+    metrics = {}
+    for name in names:
+        logging.info(f"Бенчмарк {name}...")
+        module = importlib.import_module(SUITES[name])
+        for metric, value, unit, better in _collect_isolated(module):
+            metrics[metric] = {"value": round(float(value), 4), "unit": unit, "better": better}
+    return {
+        "format": FORMAT_VERSION,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "metrics": dict(sorted(metrics.items())),
+    }
+
+
+def compare(current, baseline, threshold):
+    """Печатает изменения относительно baseline; возвращает список регрессов."""
+    regressions = []
+    for name, metric in current["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if not base or not base["value"]:
+            print(f"{name:<50} {metric['value']:>12.3f} {metric['unit']:<6} (новая метрика)")
+            continue
+        change = (metric["value"] - base["value"]) / base["value"] * 100
+        worse = change > threshold if metric["better"] == "lower" else change < -threshold
+        mark = "РЕГРЕСС" if worse else ""
+        print(f"{name:<50} {base['value']:>12.3f} -> {metric['value']:>12.3f} {metric['unit']:<6} {change:+7.1f}% {mark}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки Desktop Waifu")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES), help="Запустить только эти наборы")
+    parser.add_argument("--output", help="Сохранить результат в JSON-файл")
+    parser.add_argument("--compare", help="Сравнить с сохраненным JSON-результатом")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Порог регресса в процентах")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    result = run_suites(args.only or list(SUITES))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        logging.info(f"Результаты сохранены в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"Регрессов: {len(regressions)}")
+            sys.exit(1)
+    elif not args.output:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
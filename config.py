@@ -6,6 +6,26 @@ STATUS_ENDPOINT = f"{SERVER_URL}/status"
 ERROR_ENDPOINT = f"{SERVER_URL}/error"
 LOG_ENDPOINT = f"{SERVER_URL}/log"
 
+# --- Отправка логов и телеметрии ---
+LOG_QUEUE_SIZE = 10000          # Максимум записей лога в очереди на отправку
+LOG_BATCH_SIZE = 200            # Записей в одной пачке
+LOG_FLUSH_INTERVAL = 1.0        # Как часто отправлять неполную пачку (в секундах)
+LOG_OVERFLOW_POLICY = "drop_oldest" # При переполнении: "drop_oldest" или "drop_newest"
+STATUS_QUEUE_SIZE = 1000        # Максимум статусов в очереди на отправку
+STATUS_BATCH_SIZE = 50          # Статусов в одной пачке
+STATUS_FLUSH_INTERVAL = 2.0     # Как часто отправлять неполную пачку статусов (в секундах)
+STATUS_COALESCE_WINDOW = 0.5    # Статус короче этого (в секундах) заменяется следующим
+TELEMETRY_TIMEOUT = 5           # Таймаут HTTP-запроса фонового отправителя (в секундах)
+TELEMETRY_MAX_RETRIES = 3       # Повторов неудачной пачки
+TELEMETRY_BACKOFF_BASE = 0.5    # Начальная задержка между повторами (в секундах), удваивается
+TELEMETRY_BACKOFF_MAX = 30      # Максимальная задержка между повторами (в секундах)
+TELEMETRY_BREAKER_THRESHOLD = 5 # Неудач подряд до срабатывания предохранителя
+TELEMETRY_BREAKER_COOLDOWN = 30 # Пауза отправки после срабатывания предохранителя (в секундах)
+SPOOL_DIR = "spool"                # Папка дискового спула неотправленной телеметрии
+SPOOL_SEGMENT_SIZE = 4 * 1024 * 1024 # Размер одного файла-сегмента спула (в байтах)
+SPOOL_MAX_BYTES = 64 * 1024 * 1024   # Максимальный размер спула; старые сегменты удаляются
+SPOOL_DRAIN_BATCH = 1000           # Записей в одной пачке при досылке спула
+
 # --- Целевые Окна ---
 # Используются для определения, где персонаж будет "сидеть"
 TARGET_WINDOW_TITLES = ["Visual Studio Code", "Visual Studio"]
@@ -19,45 +39,68 @@ SPRITE_PATHS = {
     "sit": "assets/anime_girl_waifu_sitting_transparent_background_index_2.png",
 }
 
+SPRITE_CACHE_DIR = "cache/sprites" # Дисковый кеш готовых кадров (см. waifu.sprite_cache)
+
 # --- Параметры Персонажа ---
 SPRITE_WIDTH, SPRITE_HEIGHT = 150, 200
 
 # --- Настройки Pygame ---
 FPS = 60
+IDLE_FPS = 12            # Частота кадров в простое (персонаж стоит, ввода нет)
+IDLE_RAMP_DELAY = 1000   # Сколько мс без активности до перехода в режим простоя
+CPU_REPORT_INTERVAL = 60 # Как часто писать загрузку CPU по состояниям при DEBUG_LOGGING (в секундах)
 
 # --- Интервалы (в миллисекундах) ---
 ANIMATION_INTERVAL = 150
-PHYSICS_INTERVAL = 50 
+PHYSICS_INTERVAL = 1000 / 60 # Фиксированный шаг симуляции физики, не зависит от FPS отрисовки
+MAX_PHYSICS_STEPS = 5 # Максимум шагов физики за один кадр (защита от "спирали смерти")
 CURSOR_CHECK_INTERVAL = 200 
 STATUS_SEND_INTERVAL = 5000 
+ACTIVE_WINDOW_POLL_INTERVAL = 0.5 # Период фонового опроса активного окна (в секундах)
+PROCESS_NAME_CACHE_SIZE = 256     # Размер LRU-кеша PID -> имя процесса
+
+# --- Анимации: состояние -> кадры (изображение из SPRITE_PATHS, длительность в мс) ---
+ANIMATIONS = {
+    "idle": [("idle", ANIMATION_INTERVAL)],
+    "walk": [("walk1", ANIMATION_INTERVAL), ("walk2", ANIMATION_INTERVAL)],
+    "sit": [("sit", ANIMATION_INTERVAL)],
+}
 
-# --- Физические Константы ---
-WALK_SPEED = 2
-JUMP_POWER = 12
-GRAVITY = 0.98
-TERMINAL_VELOCITY = 10
+# --- Физические Константы (скорости в px/с, ускорения в px/с²) ---
+WALK_SPEED = 120
+JUMP_POWER = 720
+GRAVITY = 3528
+TERMINAL_VELOCITY = 600
 CURSOR_EVADE_DISTANCE = 50
 
 # --- Новые параметры для управляемого прыжка ---
 JUMP_HEIGHT = 1100
-TIME_TO_JUMP_APEX = 0.7
+TIME_TO_JUMP_APEX = 0.7 # в секундах
 
 # --- Поведение AI ---
 AI_UPDATE_INTERVAL = 3.0       # Как часто AI принимает решения (в секундах)
 PLATFORM_UPDATE_INTERVAL = 2.0 # Как часто сканировать окна на рабочем столе
 JUMP_CHANCE = 0.4              # Вероятность того, что AI решит прыгнуть
-AI_JUMP_CANDIDATES = 10        # Сколько вариантов для прыжка AI рассматривает
+AI_JUMP_CANDIDATES = 300       # Сколько точек приземления AI проверяет за одно решение (на все платформы)
+AI_MAX_SAMPLES_PER_PLATFORM = 32 # Не больше стольких точек приземления на одну платформу
 MAX_WALK_DISTANCE = 400        # Максимальное расстояние для случайной прогулки
+PLATFORM_INDEX_CELL_WIDTH = 256 # Ширина колонки пространственного индекса платформ (px)
+MIN_PLATFORM_WIDTH = 150       # Окна (и видимые участки их граней) уже этого не становятся платформами
+MIN_PLATFORM_HEIGHT = 50       # Окна ниже этого не становятся платформами
+NAV_JUMP_COST = 300            # Штраф за каждый прыжок при поиске пути к целевому окну (px)
 
 # --- Конфигурация Обновлений ---
 CURRENT_VERSION = "2.1.3.9" # Текущая версия приложения
 GITHUB_REPO = "Timok277/Waifu" # Путь к репозиторию
+UPDATE_MANIFEST_NAME = "manifest.json" # Ассет релиза со списком файлов и их SHA-256
+UPDATE_STAGING_DIR = "update_staging"  # Папка для скачанных, но еще не установленных файлов
+UPDATE_TIMEOUT = 30                    # Таймаут HTTP-запросов обновления (в секундах)
 
 # --- Отладка ---
 DEBUG_LOGGING = False # Включить для вывода подробных логов состояния в консоль 
 
 # --- Физика и движение ---
-MAX_FALL_SPEED = 25 
-MAX_HORIZONTAL_SPEED = 25 # Ограничиваем максимальную скорость по горизонтали 
+MAX_FALL_SPEED = 1500 # px/с
+MAX_HORIZONTAL_SPEED = 1500 # Ограничиваем максимальную скорость по горизонтали (px/с)
 DRAG_INERTIA_FACTOR = 0.25 # Коэффициент инерции после перетаскивания (меньше = меньше инерция)
 
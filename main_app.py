@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import time
+PROCESS_STARTED = time.perf_counter() # Начало отсчета хронологии запуска
+
 import pygame
 import sys
 import os
 import logging
 import config
+import threading
 import traceback
 import uuid
 
@@ -17,10 +21,17 @@ except ImportError:
     IS_WIN = False
 
 from waifu.character import WaifuCharacter
-from waifu.utils import check_for_updates, check_server_availability, LogstashHttpHandler
+from waifu.scheduler import FrameScheduler
+from waifu.renderer import Renderer
+from waifu.backends.host_window import Win32HostWindow
+from waifu.startup import StartupTimeline, run_in_background
+from waifu.utils import check_for_updates, check_server_availability, install_update, LogstashHttpHandler
 
 def main():
     """Основная функция приложения."""
+    timeline = StartupTimeline(PROCESS_STARTED)
+    timeline.mark("imports")
+
     if not os.path.exists("assets"):
         logging.critical("Папка 'assets' не найдена! Запуск невозможен.")
         sys.exit(1)
@@ -39,13 +50,19 @@ def main():
         client_id=client_id
     )
     logging.getLogger().addHandler(http_handler)
-
-    check_for_updates()
     logging.info(f"Приложение запущено. Client ID: {client_id}")
-    if not check_server_availability():
-        logging.warning("Работа будет продолжена без отправки данных на сервер.")
+    timeline.mark("logging")
+
+    # Проверки сети идут в фоне - персонаж появляется сразу
+    update_ready = threading.Event()
+    run_in_background("update_check", check_for_updates, timeline,
+                      on_done=lambda launched: launched and update_ready.set())
+    run_in_background("server_check", check_server_availability, timeline,
+                      on_done=lambda available: available or logging.warning(
+                          "Телеметрия будет копиться в спуле на диске и отправится, когда сервер станет доступен."))
 
     pygame.init()
+    timeline.mark("pygame_init")
 
     # --- Настройка окна Pygame ---
     screen = pygame.display.set_mode((config.SPRITE_WIDTH, config.SPRITE_HEIGHT), pygame.NOFRAME)
@@ -64,41 +81,56 @@ def main():
             win32gui.SetWindowPos(hwnd, win32con.HWND_TOPMOST, 0, 0, 0, 0, win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
         except Exception as e:
             logging.error(f"Не удалось настроить окно для Windows: {e}")
+    timeline.mark("window")
 
     try:
-        character = WaifuCharacter(hwnd)
+        character = WaifuCharacter(hwnd, client_id=client_id)
     except RuntimeError as e:
         logging.critical(str(e))
         pygame.quit()
         sys.exit(1)
+    timeline.mark("character")
 
-    clock = pygame.time.Clock()
+    scheduler = FrameScheduler()
+    renderer = Renderer(screen, TRANSPARENCY_COLOR, Win32HostWindow(hwnd) if IS_WIN and hwnd else None)
     running = True
 
     try:
         while running:
-            delta_time = clock.tick(config.FPS)
+            # В простое частота кадров снижается до IDLE_FPS (см. waifu.scheduler)
+            delta_time, events = scheduler.tick(character)
             # --- Обработка событий ---
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    renderer.invalidate()
                 character.handle_event(event)
 
             # --- Обновление и отрисовка ---
             character.update(delta_time)
-            
-            screen.fill(TRANSPARENCY_COLOR)
-            character.draw(screen)
-            pygame.display.update()
 
-            # Перемещение окна вслед за персонажем
-            if IS_WIN and hwnd:
-                win32gui.SetWindowPos(hwnd, win32con.HWND_TOPMOST, int(character.x), int(character.y), 0, 0, win32con.SWP_NOSIZE)
+            # Перерисовка только при смене кадра, перемещение окна вслед за персонажем
+            # (позиция интерполирована между шагами физики) - только при смене позиции
+            renderer.render(character)
+            if timeline is not None:
+                timeline.mark("first_frame")
+                logging.info(timeline.report())
+                timeline = None
+
+            if update_ready.is_set():
+                logging.info("Обновление подготовлено, закрываю приложение...")
+                running = False
     except KeyboardInterrupt:
         logging.info("Получено прерывание с клавиатуры (Ctrl+C). Завершение работы...")
         
+    character.shutdown()
+    logging.info(f"Нагрузка по состояниям: {scheduler.report()}")
+    logging.info(f"Отрисовка: {renderer.stats()}")
     logging.info("Приложение Desktop Waifu завершило работу.")
     pygame.quit()
+    if update_ready.is_set():
+        install_update()
     sys.exit()
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import logging
+from collections import deque
+
+from fastapi import WebSocket
+
+from subscriptions import Subscription, SubscriptionIndex, event_key
+
+logger = logging.getLogger(__name__)
+
+MAX_FRAME_EVENTS = 500 # Больше событий в одном кадре не склеиваем
+
+
+def encode_event(event: dict) -> str:
+    """Сериализует событие один раз - дальше строка идет всем зрителям как есть."""
+    return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def encode_frame(encoded_events) -> str:
+    """Собирает уже сериализованные события в один кадр - JSON-массив."""
+    return "[" + ",".join(encoded_events) + "]"
+
+
+class Subscriber:
+    """
+    Одно WebSocket-соединение со своей ограниченной очередью исходящих
+    сообщений и отдельной задачей-писателем. Медленный зритель задерживает
+    только собственную очередь.
+    """
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.manager = manager
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.task = asyncio.create_task(self._writer())
+
+    def enqueue(self, message: str) -> bool:
+        """Кладет сообщение в очередь без ожидания. False - зритель отключен как медленный."""
+        if len(self.queue) >= self.manager.max_queue:
+            if self.manager.slow_policy == "disconnect":
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+            self.manager.dropped += 1
+        self.queue.append(message)
+        self.wakeup.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.queue:
+                    message = self.queue.popleft()
+                    await asyncio.wait_for(self.websocket.send_text(message), self.manager.send_timeout)
+                    self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Сокет умер или завис дольше send_timeout - убираем зрителя
+            logger.info(f"WebSocket-зритель отключен: {e!r}")
+            self.manager.disconnect(self.websocket, cancel=False)
+            asyncio.create_task(self.manager._close(self.websocket))
+
+
+class ConnectionManager:
+    """
+    Рассылка сообщений WebSocket-зрителям. broadcast только раскладывает
+    сообщение по очередям соединений и никогда не ждет сетевого ввода-вывода;
+    отправкой занимаются задачи-писатели каждого соединения.
+
+    Зритель без подписки получает все события; подписки (Subscription) хранятся
+    в SubscriptionIndex, и такому зрителю достаются только подходящие события.
+
+    slow_policy - что делать, когда очередь зрителя заполнена (max_queue):
+      "drop_oldest" - вытеснять самые старые сообщения этого зрителя;
+      "disconnect"  - закрыть соединение медленного зрителя.
+    """
+    def __init__(self, max_queue: int = 1000, slow_policy: str = "drop_oldest", send_timeout: float = 10.0):
+        self.max_queue = max_queue
+        self.slow_policy = slow_policy
+        self.send_timeout = send_timeout
+        self.subscribers = {} # WebSocket -> Subscriber
+        self.unfiltered = {}  # WebSocket -> Subscriber без подписки (получают все)
+        self.filters = SubscriptionIndex()
+        self.dropped = 0
+        self.slow_disconnects = 0
+
+    @property
+    def active_connections(self):
+        return list(self.subscribers)
+
+    async def connect(self, websocket: WebSocket, history=(), spec: Subscription = None):
+        """
+        Принимает соединение и отправляет историю (сериализованные события)
+        кадрами по MAX_FRAME_EVENTS. history может быть функцией - она вызывается
+        после рукопожатия вместе с регистрацией зрителя, поэтому между историей
+        и живыми событиями ничего не теряется. spec - подписка с самого начала
+        (историю по ней фильтрует вызывающий).
+        """
+        await websocket.accept()
+        if callable(history):
+            history = history()
+        subscriber = Subscriber(websocket, self)
+        self.subscribers[websocket] = subscriber
+        self.unfiltered[websocket] = subscriber
+        if spec is not None:
+            self.subscribe(websocket, spec)
+        for start in range(0, len(history), MAX_FRAME_EVENTS):
+            subscriber.enqueue(encode_frame(history[start:start + MAX_FRAME_EVENTS]))
+
+    def disconnect(self, websocket: WebSocket, cancel: bool = True):
+        subscriber = self.subscribers.pop(websocket, None)
+        self.unfiltered.pop(websocket, None)
+        if subscriber is not None:
+            self.filters.remove(subscriber)
+            if cancel:
+                subscriber.task.cancel()
+
+    def subscribe(self, websocket: WebSocket, spec: Subscription):
+        """Меняет подписку зрителя; пустая подписка - снова все события."""
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is None:
+            return
+        if spec.matches_all:
+            self.filters.remove(subscriber)
+            self.unfiltered[websocket] = subscriber
+        else:
+            self.unfiltered.pop(websocket, None)
+            self.filters.add(subscriber, spec)
+
+    async def broadcast(self, message: str):
+        self.broadcast_nowait(message)
+
+    def broadcast_nowait(self, message: str):
+        """Отправляет сообщение всем зрителям, независимо от подписок."""
+        for subscriber in list(self.subscribers.values()):
+            self._deliver(subscriber, message)
+
+    def broadcast_events(self, events):
+        """
+        Рассылает пачку событий [(JSON, ключ event_key)]: зрители без подписки
+        получают один общий кадр, зрители с подпиской - кадр только из
+        подходящих им событий, найденных через индекс.
+        """
+        if self.unfiltered:
+            frame = encode_frame([encoded for encoded, _ in events])
+            for subscriber in list(self.unfiltered.values()):
+                self._deliver(subscriber, frame)
+        if len(self.filters):
+            selected = {} # Subscriber -> его события в порядке поступления
+            for encoded, key in events:
+                for subscriber in self.filters.match(key):
+                    selected.setdefault(subscriber, []).append(encoded)
+            for subscriber, encoded_events in selected.items():
+                self._deliver(subscriber, encode_frame(encoded_events))
+
+    def _deliver(self, subscriber: Subscriber, frame: str):
+        if not subscriber.enqueue(frame):
+            self.slow_disconnects += 1
+            self.disconnect(subscriber.websocket)
+            asyncio.create_task(self._close(subscriber.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            # 1013 - "try again later": зритель не успевал принимать сообщения
+            # (или отправка зависла дольше send_timeout)
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def close_all(self):
+        """Останавливает писателей всех соединений (при остановке сервера)."""
+        for websocket in list(self.subscribers):
+            self.disconnect(websocket)
+
+    def metrics(self):
+        return {
+            "connections": len(self.subscribers),
+            "filtered": len(self.filters),
+            "queued": sum(len(s.queue) for s in self.subscribers.values()),
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+        }
+
+
+class BroadcastCoalescer:
+    """
+    Склейка событий для рассылки: каждое событие сериализуется один раз,
+    а все события, пришедшие за window секунд, уходят зрителям одним кадром -
+    JSON-массивом (не больше max_batch событий в кадре). Для зрителей без
+    подписки кадр - одна и та же строка, поэтому ни сериализация, ни сжатие
+    permessage-deflate не зависят от числа событий в секунду.
+    """
+    def __init__(self, manager: ConnectionManager, window: float = 0.05, max_batch: int = MAX_FRAME_EVENTS):
+        self.manager = manager
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+
+        self.events = 0
+        self.frames = 0
+        self.frame_bytes = 0
+
+    def publish(self, event: dict) -> str:
+        """Ставит событие в текущее окно. Возвращает его JSON для истории."""
+        encoded = encode_event(event)
+        self._pending.append((encoded, event_key(event)))
+        self.events += 1
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return encoded
+
+    def flush(self):
+        """Отправляет накопленные события одним кадром."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        events, self._pending = self._pending, []
+        self.frames += 1
+        self.frame_bytes += sum(len(encoded) + 1 for encoded, _ in events) + 1
+        self.manager.broadcast_events(events)
+
+    def metrics(self):
+        return {
+            "events": self.events,
+            "frames": self.frames,
+            "events_per_frame": round(self.events / self.frames, 2) if self.frames else 0.0,
+            "avg_frame_bytes": round(self.frame_bytes / self.frames) if self.frames else 0,
+        }
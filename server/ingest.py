@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Очередь записи переполнена (а политика не позволяет вытеснять точки) или InfluxDB не принимает запись."""
+
+
+class InfluxBatchWriter:
+    """
+    Конвейер записи в InfluxDB: обработчики запросов только кладут точки
+    в ограниченную очередь, а фоновая задача пишет их пачками - по набору
+    batch_size точек или раз в flush_interval секунд. Сам синхронный вызов
+    write_api.write выполняется в пуле потоков и не блокирует цикл событий.
+
+    Политика переполнения (overflow_policy):
+      "block"       - обработчик ждет места в очереди до block_timeout секунд
+                      (обратное давление), затем получает QueueFullError;
+      "drop_oldest" - вытесняются самые старые точки;
+      "drop_newest" - новые точки отбрасываются.
+
+    Пачка, которую не удалось записать и после повторов, возвращается в начало
+    очереди, а пока InfluxDB не принимает запись, put() отвечает QueueFullError
+    (503) - клиент оставит статусы у себя в спуле и пришлет позже.
+    """
+    def __init__(self, write_api, bucket, org, max_queue=10000, batch_size=500,
+                 flush_interval=1.0, overflow_policy="block", block_timeout=2.0,
+                 max_retries=3, retry_delay=0.5):
+        self.write_api = write_api
+        self.bucket = bucket
+        self.org = org
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._queue = deque()
+        self._batch_ready = asyncio.Event()
+        self._space_freed = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self.failing = False # Последняя пачка не записалась - новые точки не принимаем
+
+        # Метрики
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0   # Точки, которые не удалось записать (вернулись в очередь или потеряны при остановке)
+        self.requeued = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, points):
+        """Ставит точки в очередь; при переполнении действует по overflow_policy."""
+        if self.failing:
+            raise QueueFullError("InfluxDB не принимает запись, повторите позже")
+        for point in points:
+            if len(self._queue) >= self.max_queue:
+                if self.overflow_policy == "drop_newest":
+                    self.dropped += 1
+                    continue
+                if self.overflow_policy == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    await self._wait_for_space()
+            self._queue.append(point)
+            self.enqueued += 1
+        if len(self._queue) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def _wait_for_space(self):
+        deadline = time.monotonic() + self.block_timeout
+        self._batch_ready.set() # Пусть флашер разгружает очередь немедленно
+        while len(self._queue) >= self.max_queue:
+            self._space_freed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.dropped += 1
+                raise QueueFullError("Очередь записи в InfluxDB переполнена")
+            try:
+                await asyncio.wait_for(self._space_freed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self, timeout=10.0):
+        """Останавливает флашер, дописав все, что осталось в очереди (не дольше timeout)."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._batch_ready.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            logger.error(f"Не успели дописать в InfluxDB точек: {len(self._queue)}")
+        self._task = None
+
+    def metrics(self):
+        return {
+            "queue_depth": len(self._queue),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "failing": self.failing,
+            "batches": self.batches,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches, 2) if self.batches else 0.0,
+        }
+
+    async def _run(self):
+        while True:
+            if len(self._queue) < self.batch_size and not self._closing:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+            while self._queue:
+                if not await self._flush([self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]):
+                    break
+                if len(self._queue) < self.batch_size and not self._closing:
+                    break
+            if self._closing and not self._queue:
+                return
+            if self.failing:
+                await asyncio.sleep(self.flush_interval) # InfluxDB недоступна - не долбим ее без паузы
+
+    async def _flush(self, batch):
+        """Пишет пачку с повторами. False - пачка не записана (возвращена в очередь)."""
+        self._space_freed.set()
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.write_api.write, bucket=self.bucket, org=self.org, record=batch)
+            except Exception as e:
+                logger.error(f"Ошибка записи пачки в InfluxDB (попытка {attempt + 1}): {e}")
+                if attempt < self.max_retries and not self._closing:
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            self.written += len(batch)
+            self.batches += 1
+            self.failing = False
+            return True
+        self.failed += len(batch)
+        if self._closing:
+            logger.error(f"InfluxDB недоступна при остановке, потеряно точек: {len(batch)}")
+            return True
+        # Возвращаем пачку в начало очереди, чтобы не нарушить порядок точек
+        self._queue.extendleft(reversed(batch))
+        self.requeued += len(batch)
+        self.failing = True
+        return False
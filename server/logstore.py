@@ -0,0 +1,347 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Segment:
+    """
+    Один файл журнала: записи с offset от base и далее, по строке на запись
+    "offset<TAB>время<TAB>JSON". index - разреженный индекс: каждая
+    index_interval-я запись как (offset, время, позиция в файле).
+    """
+    def __init__(self, directory, base):
+        self.base = base
+        self.path = os.path.join(directory, f"{base:020d}.log")
+        self.index_path = self.path[:-4] + ".idx"
+        self.index = []
+        self.next_offset = base
+        self.size = 0
+        self.last_timestamp = 0.0
+
+    @property
+    def first_timestamp(self):
+        return self.index[0][1] if self.index else self.last_timestamp
+
+    def scan(self, index_interval):
+        """Строит индекс по содержимому файла; обрезает недописанную последнюю строку."""
+        self.index = []
+        position = 0
+        with open(self.path, "rb+") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    f.truncate(position) # Запись оборвалась при падении сервера
+                    break
+                offset, timestamp, _ = line.split(b"\t", 2)
+                offset, timestamp = int(offset), float(timestamp)
+                if (offset - self.base) % index_interval == 0:
+                    self.index.append((offset, timestamp, position))
+                self.next_offset = offset + 1
+                self.last_timestamp = timestamp
+                position += len(line)
+        self.size = position
+
+    def load_index(self):
+        """Загружает индекс закрытого сегмента, сохраненный при ротации."""
+        with open(self.index_path, encoding="utf-8") as f:
+            state = json.load(f)
+        self.index = [tuple(entry) for entry in state["index"]]
+        self.next_offset = state["next_offset"]
+        self.last_timestamp = state["last_timestamp"]
+        self.size = os.path.getsize(self.path)
+
+    def save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"index": self.index, "next_offset": self.next_offset,
+                       "last_timestamp": self.last_timestamp}, f)
+        os.replace(tmp, self.index_path)
+
+    def position_for_offset(self, offset):
+        """Позиция ближайшей проиндексированной записи не позже offset."""
+        i = bisect.bisect_right(self.index, (offset, float("inf"), 0)) - 1
+        return self.index[i][2] if i >= 0 else 0
+
+    def position_for_time(self, timestamp):
+        """Позиция ближайшей проиндексированной записи раньше timestamp."""
+        i = bisect.bisect_left([entry[1] for entry in self.index], timestamp) - 1
+        return self.index[i][2] if i >= 0 else 0
+
+    def delete(self):
+        for path in (self.path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class LogStore:
+    """
+    Журнал логов на диске: записи только дописываются в сегменты по
+    segment_bytes, каждой присваивается сквозной offset. Последние hot_records
+    записей держатся в памяти (кольцевой буфер) - из него обслуживаются живые
+    подключения и свежие страницы; старые читаются с диска через разреженный
+    индекс offset/время без сканирования всего журнала.
+
+    Записи хранятся уже сериализованными (JSON-строка) и так же отдаются.
+    Время записи - время приема сервером (монотонно неубывающее), по нему
+    работают выборки по диапазону и удаление по возрасту.
+
+    Хранение: закрытые сегменты удаляются, пока журнал больше retention_bytes
+    или пока последняя запись сегмента старше retention_seconds.
+
+    Дозапись не ждет диска: при ротации файл сегмента только подменяется,
+    а fsync закрытого сегмента и удаление старых выполняет maintain() - сервер
+    вызывает ее в пуле потоков, когда maintenance_due. Чтение можно вести из
+    других потоков: общее состояние защищено блокировкой, а сами файлы
+    читаются уже без нее.
+    """
+    def __init__(self, directory, segment_bytes=8 * 1024 * 1024, hot_records=1000, index_interval=64,
+                 retention_bytes=256 * 1024 * 1024, retention_seconds=7 * 24 * 3600):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+        self.hot = deque(maxlen=hot_records) # (offset, время, JSON)
+        self._last_retention_check = 0.0
+        self._lock = threading.Lock()
+        self._retired = [] # (файл, сегмент) после ротации, ждут fsync в maintain()
+
+        os.makedirs(directory, exist_ok=True)
+        bases = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith(".log"))
+        self.segments = []
+        for base in bases:
+            segment = Segment(directory, base)
+            if base != bases[-1] and os.path.exists(segment.index_path):
+                segment.load_index()
+            else:
+                segment.scan(index_interval)
+            self.segments.append(segment)
+        if not self.segments:
+            self.segments.append(Segment(directory, 0))
+            open(self.segments[0].path, "ab").close()
+        self._bases = [segment.base for segment in self.segments]
+        self._writer = open(self.active.path, "ab")
+
+        self.appended = 0
+        self.deleted_segments = 0
+        self._warm_hot()
+        self.maintain()
+
+    @property
+    def active(self):
+        return self.segments[-1]
+
+    @property
+    def first_offset(self):
+        return self.segments[0].base
+
+    @property
+    def next_offset(self):
+        """Offset, который получит следующая запись."""
+        return self.active.next_offset
+
+    @property
+    def size(self):
+        return sum(segment.size for segment in self.segments)
+
+    def __len__(self):
+        return self.next_offset - self.first_offset
+
+    @property
+    def maintenance_due(self):
+        """Есть закрытые сегменты без fsync или пора проверить сроки хранения."""
+        return bool(self._retired) or time.time() - self._last_retention_check > 60
+
+    # --- Запись ---
+
+    def append(self, encoded, timestamp=None):
+        """Дописывает запись (JSON-строку) в журнал. Возвращает ее offset."""
+        return self.append_many([encoded], timestamp)[0]
+
+    def append_many(self, encoded_records, timestamp=None):
+        """
+        Дописывает пачку записей одной записью в файл (один flush на пачку).
+        Возвращает их offset.
+        """
+        offsets = []
+        with self._lock:
+            lines = []
+            segment = self.active
+            for encoded in encoded_records:
+                if segment.size >= self.segment_bytes:
+                    self._writer.write(b"".join(lines))
+                    lines = []
+                    segment = self._rotate()
+                offset = segment.next_offset
+                record_time = max(timestamp or time.time(), segment.last_timestamp)
+                line = f"{offset}\t{record_time!r}\t{encoded}\n".encode("utf-8")
+                if (offset - segment.base) % self.index_interval == 0:
+                    segment.index.append((offset, record_time, segment.size))
+                lines.append(line)
+                segment.size += len(line)
+                segment.next_offset = offset + 1
+                segment.last_timestamp = record_time
+                self.hot.append((offset, record_time, encoded))
+                offsets.append(offset)
+            self._writer.write(b"".join(lines))
+            self._writer.flush()
+            self.appended += len(offsets)
+        return offsets
+
+    def _rotate(self):
+        """Начинает новый сегмент; fsync и индекс закрытого - в maintain()."""
+        self._writer.flush()
+        self._retired.append((self._writer, self.active))
+        segment = Segment(self.directory, self.active.next_offset)
+        segment.last_timestamp = self.active.last_timestamp
+        self.segments.append(segment)
+        self._bases.append(segment.base)
+        self._writer = open(segment.path, "ab")
+        return segment
+
+    def maintain(self):
+        """Дисковая работа вне дозаписи: fsync закрытых сегментов и сроки хранения."""
+        with self._lock:
+            retired, self._retired = self._retired, []
+        for writer, segment in retired:
+            os.fsync(writer.fileno())
+            writer.close()
+            segment.save_index()
+        self.enforce_retention()
+
+    def enforce_retention(self):
+        """Удаляет старые закрытые сегменты сверх лимита размера или возраста."""
+        now = time.time()
+        removed = []
+        with self._lock:
+            self._last_retention_check = now
+            total = self.size
+            retired = {segment for _, segment in self._retired}
+            while len(self.segments) > 1 and self.segments[0] not in retired:
+                oldest = self.segments[0]
+                if total <= self.retention_bytes and now - oldest.last_timestamp <= self.retention_seconds:
+                    break
+                total -= oldest.size
+                del self.segments[0], self._bases[0]
+                self.deleted_segments += 1
+                removed.append(oldest)
+        for segment in removed:
+            segment.delete()
+            logger.info(f"Журнал логов: удален сегмент {segment.base}")
+
+    # --- Чтение ---
+
+    def read(self, offset, limit=100):
+        """Записи с offset (включительно), не больше limit: [(offset, время, JSON)]."""
+        with self._lock:
+            offset = max(offset, self.first_offset)
+            if offset >= self.next_offset or limit <= 0:
+                return []
+            if self.hot and offset >= self.hot[0][0]:
+                start = offset - self.hot[0][0]
+                return [self.hot[i] for i in range(start, min(start + limit, len(self.hot)))]
+            i = bisect.bisect_right(self._bases, offset) - 1
+            segments = self._segments_from(i)
+        return self._scan(segments, segments[0].position_for_offset(offset), lambda o, t: o >= offset, None, limit)
+
+    def read_time(self, since, until=None, limit=100):
+        """Записи, принятые в интервале [since, until] (unix-время), не больше limit."""
+        if limit <= 0:
+            return []
+        until = float("inf") if until is None else until
+        with self._lock:
+            if self.hot and since > self.hot[0][1]:
+                records = []
+                for record in self.hot:
+                    if record[1] > until or len(records) >= limit:
+                        break
+                    if record[1] >= since:
+                        records.append(record)
+                return records
+            i = max(bisect.bisect_left([s.first_timestamp for s in self.segments], since) - 1, 0)
+            segments = self._segments_from(i)
+        return self._scan(segments, segments[0].position_for_time(since), lambda o, t: t >= since, until, limit)
+
+    @property
+    def hot_start(self):
+        """Offset самой старой записи в памяти (next_offset, если память пуста)."""
+        with self._lock:
+            return self.hot[0][0] if self.hot else self.next_offset
+
+    def read_hot(self, offset):
+        """Записи из памяти с offset (включительно) - без обращения к диску."""
+        with self._lock:
+            if not self.hot:
+                return []
+            start = max(offset - self.hot[0][0], 0)
+            return [self.hot[i] for i in range(start, len(self.hot))]
+
+    def tail(self, count):
+        """Последние count записей из памяти."""
+        with self._lock:
+            count = min(count, len(self.hot))
+            return [self.hot[i] for i in range(len(self.hot) - count, len(self.hot))]
+
+    def _segments_from(self, segment_index):
+        """Сегменты для чтения с диска (вызывается под блокировкой): дописанное сбрасывается в файл."""
+        self._writer.flush()
+        return self.segments[segment_index:]
+
+    def _scan(self, segments, position, start_at, until, limit):
+        """Читает сегменты по порядку с позиции, пропуская записи до start_at."""
+        records = []
+        started = False
+        for segment in segments:
+            try:
+                f = open(segment.path, "rb")
+            except FileNotFoundError:
+                position = 0
+                continue # Сегмент удален по сроку хранения, пока мы читали
+            with f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offset, timestamp, encoded = line.split(b"\t", 2)
+                    offset, timestamp = int(offset), float(timestamp)
+                    if not started:
+                        if not start_at(offset, timestamp):
+                            continue
+                        started = True
+                    if until is not None and timestamp > until:
+                        return records
+                    records.append((offset, timestamp, encoded[:-1].decode("utf-8")))
+                    if len(records) >= limit:
+                        return records
+            position = 0
+        return records
+
+    def _warm_hot(self):
+        """Заполняет кольцевой буфер хвостом журнала после перезапуска."""
+        start = max(self.next_offset - self.hot.maxlen, self.first_offset)
+        if start < self.next_offset:
+            segments = self.segments[bisect.bisect_right(self._bases, start) - 1:]
+            position = segments[0].position_for_offset(start)
+            self.hot.extend(self._scan(segments, position, lambda o, t: o >= start, None, self.hot.maxlen))
+
+    def close(self):
+        self.maintain()
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+        self._writer.close()
+
+    def metrics(self):
+        return {
+            "first_offset": self.first_offset,
+            "next_offset": self.next_offset,
+            "segments": len(self.segments),
+            "bytes": self.size,
+            "hot_records": len(self.hot),
+            "appended": self.appended,
+            "deleted_segments": self.deleted_segments,
+        }
@@ -1,11 +1,14 @@
 import os
+import asyncio
+import gzip
 import logging
 import json
-from datetime import datetime
-from typing import List, Dict
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional
 
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field
 
@@ -13,6 +16,11 @@ from influxdb_client import InfluxDBClient, Point, WriteOptions
 from influxdb_client.client.write_api import SYNCHRONOUS
 from dotenv import load_dotenv
 
+from connections import BroadcastCoalescer, ConnectionManager, encode_event
+from ingest import InfluxBatchWriter, QueueFullError
+from logstore import LogStore
+from subscriptions import Subscription, SubscriptionIndex, event_key
+
 # --- Загрузка конфигурации ---
 load_dotenv()
 
@@ -20,43 +28,70 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# --- Жизненный цикл: журнал логов и конвейер записи в InfluxDB ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global status_writer, log_store
+    log_store = LogStore(
+        LOG_STORE_DIR,
+        segment_bytes=LOG_SEGMENT_BYTES,
+        hot_records=LOG_HOT_RECORDS,
+        retention_bytes=LOG_RETENTION_BYTES,
+        retention_seconds=LOG_RETENTION_HOURS * 3600,
+    )
+    logger.info(f"Журнал логов: {log_store.metrics()}")
+    if write_api:
+        status_writer = InfluxBatchWriter(
+            write_api, INFLUXDB_BUCKET, INFLUXDB_ORG,
+            max_queue=INFLUX_QUEUE_SIZE,
+            batch_size=INFLUX_BATCH_SIZE,
+            flush_interval=INFLUX_FLUSH_INTERVAL,
+            overflow_policy=INFLUX_OVERFLOW_POLICY,
+        )
+        status_writer.start()
+    yield
+    broadcaster.flush()
+    await manager.close_all()
+    if status_writer:
+        # Дописываем накопленное перед остановкой
+        await status_writer.close()
+        logger.info(f"Конвейер InfluxDB остановлен: {status_writer.metrics()}")
+        status_writer = None
+    log_store.close()
+
 # --- FastAPI приложение ---
 app = FastAPI(
     title="Waifu Server",
     description="Сервер для сбора статистики от Desktop Waifu.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- Настройка шаблонов ---
 templates = Jinja2Templates(directory="templates")
 
-# --- Менеджер WebSocket соединений ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        # Отправляем историю при подключении к странице логов
-        for log in log_history:
-            try:
-                await websocket.send_text(json.dumps(log))
-            except Exception:
-                # Клиент мог отключиться, пока мы слали историю
-                break
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+# --- Журнал логов и менеджер WebSocket ---
+# Журнал на диске: каталог, размер сегмента, сколько последних записей держать в памяти и сроки хранения
+LOG_STORE_DIR = os.getenv("LOG_STORE_DIR", "log_store")
+LOG_SEGMENT_BYTES = int(os.getenv("LOG_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+LOG_HOT_RECORDS = int(os.getenv("LOG_HOT_RECORDS", "1000"))
+LOG_RETENTION_BYTES = int(os.getenv("LOG_RETENTION_BYTES", str(256 * 1024 * 1024)))
+LOG_RETENTION_HOURS = float(os.getenv("LOG_RETENTION_HOURS", "168"))
+LOG_PAGE_LIMIT = 1000 # Максимум записей на страницу /log/history
+log_store = None # LogStore, открывается при старте приложения
 
-# --- Глобальное хранилище логов и менеджер WebSocket ---
-log_history = []
-manager = ConnectionManager()
+# История при подключении к /ws: последние WS_REPLAY_RECORDS записей или до WS_REPLAY_LIMIT с from_offset
+WS_REPLAY_RECORDS = int(os.getenv("WS_REPLAY_RECORDS", "200"))
+WS_REPLAY_LIMIT = int(os.getenv("WS_REPLAY_LIMIT", "10000"))
+# Размер очереди каждого зрителя и политика для медленных: drop_oldest или disconnect
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "1000"))
+WS_SLOW_POLICY = os.getenv("WS_SLOW_POLICY", "drop_oldest")
+# Окно склейки событий в один кадр (с) и сжатие кадров permessage-deflate
+# (сжатие согласуется с браузером при рукопожатии; при запуске через CLI uvicorn - флаг --ws-per-message-deflate)
+WS_COALESCE_WINDOW = float(os.getenv("WS_COALESCE_WINDOW", "0.05"))
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+manager = ConnectionManager(max_queue=WS_QUEUE_SIZE, slow_policy=WS_SLOW_POLICY)
+broadcaster = BroadcastCoalescer(manager, window=WS_COALESCE_WINDOW)
 
 # --- InfluxDB ---
 INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
@@ -64,8 +99,16 @@ INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
 INFLUXDB_ORG = os.getenv("INFLUXDB_ORG")
 INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET")
 
+# Пакетная запись: размер очереди, размер пачки, период сброса (с) и политика переполнения
+INFLUX_QUEUE_SIZE = int(os.getenv("INFLUX_QUEUE_SIZE", "10000"))
+INFLUX_BATCH_SIZE = int(os.getenv("INFLUX_BATCH_SIZE", "500"))
+INFLUX_FLUSH_INTERVAL = float(os.getenv("INFLUX_FLUSH_INTERVAL", "1.0"))
+INFLUX_OVERFLOW_POLICY = os.getenv("INFLUX_OVERFLOW_POLICY", "block")
+status_writer = None # InfluxBatchWriter, создается при старте приложения
+
 try:
     influx_client = InfluxDBClient(url=INFLUXDB_URL, token=INFLUXDB_TOKEN, org=INFLUXDB_ORG)
+    # Синхронный API вызывается конвейером в пуле потоков (см. ingest.py)
     write_api = influx_client.write_api(write_options=SYNCHRONOUS)
     query_api = influx_client.query_api()
     logger.info(f"Успешное подключение к InfluxDB: {INFLUXDB_URL}")
@@ -76,6 +119,7 @@ except Exception as e:
 
 # --- Модели данных (Pydantic) ---
 class StatusPayload(BaseModel):
+    client_id: Optional[str] = None # Нет у клиентов старых версий
     timestamp: datetime
     action: str
     x: int
@@ -87,7 +131,7 @@ class StatusPayload(BaseModel):
 @app.get("/", response_class=HTMLResponse)
 async def get_root(request: Request):
     """Отдает главную страницу (в будущем может быть дашборд)."""
-    return templates.TemplateResponse("index.html", {"request": request, "log_count": len(log_history)})
+    return templates.TemplateResponse("index.html", {"request": request, "log_count": len(log_store)})
 
 @app.get("/logs", response_class=HTMLResponse)
 async def get_logs_page(request: Request):
@@ -95,65 +139,194 @@ async def get_logs_page(request: Request):
     return templates.TemplateResponse("logs.html", {"request": request})
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket для отправки логов и событий на фронтенд."""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, from_offset: Optional[int] = None):
+    """
+    WebSocket для отправки логов и событий на фронтенд. Каждый кадр - JSON-массив
+    событий; история приходит первыми кадрами. Записи лога несут свой offset:
+    переподключение с ?from_offset=<последний offset + 1> продолжает поток без
+    пропусков (возможные повторы клиент отбрасывает по offset). Если история
+    не уместилась в WS_REPLAY_LIMIT, вместо пропущенных записей приходит событие
+    replay_gap с диапазоном [from_offset, next_offset).
+
+    Подписку (см. Subscription) можно задать параметрами подключения - тогда
+    и история, и живые события приходят уже отфильтрованными, - или прислать
+    сообщением позже; {} - снова все события.
+    """
+    try:
+        spec = Subscription.from_query(websocket.query_params)
+    except ValueError as e:
+        logger.warning(f"Некорректная подписка WebSocket: {e}")
+        await websocket.close(code=1008)
+        return
+
+    # Все, что лежит на диске, читается и фильтруется в пуле потоков, не в цикле событий
+    if from_offset is not None:
+        replay, next_offset, replayed = await asyncio.to_thread(read_replay, from_offset, spec)
+
+    def history():
+        if from_offset is None:
+            return [encoded for _, _, encoded in filter_history(log_store.tail(WS_REPLAY_RECORDS), spec)]
+        # Догоняем только из памяти то, что пришло, пока читался диск
+        events = [encoded for _, _, encoded in replay]
+        end = log_store.next_offset
+        caught_up = log_store.read_hot(next_offset)[:max(WS_REPLAY_LIMIT - replayed, 0)]
+        start = next_offset
+        if caught_up:
+            if caught_up[0][0] > start:
+                events.append(encode_event(replay_gap_event(start, caught_up[0][0])))
+            events += [encoded for _, _, encoded in filter_history(caught_up, spec)]
+            start = caught_up[-1][0] + 1
+        if start < end:
+            events.append(encode_event(replay_gap_event(start, end)))
+        return events
+
+    await manager.connect(websocket, history, spec)
     try:
         while True:
-            # Просто держим соединение открытым
-            await websocket.receive_text()
+            # Единственное, что присылает зритель, - подписка
+            message = await websocket.receive_text()
+            try:
+                manager.subscribe(websocket, Subscription.from_message(json.loads(message)))
+            except ValueError as e:
+                logger.warning(f"Некорректная подписка WebSocket: {e}")
     except WebSocketDisconnect:
         manager.disconnect(websocket)
-        print("Client disconnected from websocket")
+        logger.info("Зритель WebSocket отключился")
 
-@app.post("/status")
-async def receive_status(payload: StatusPayload, request: Request):
-    """Принимает данные о состоянии от клиента."""
-    client_host = request.client.host if request.client else "unknown"
-    
-    log_msg = f"Статус: {payload.action}, Процесс: {payload.active_window_process}"
+def filter_history(records: list, spec: Subscription) -> list:
+    """Записи журнала, подходящие подписке, - через тот же SubscriptionIndex, что и живая рассылка."""
+    if spec.matches_all:
+        return records
+    index = SubscriptionIndex()
+    index.add(spec, spec)
+    return [record for record in records if any(index.match(event_key(json.loads(record[2]))))]
+
+def read_replay(offset: int, spec: Subscription):
+    """
+    История /ws с offset (выполняется в пуле потоков): журнал читается страницами,
+    пока непрочитанный остаток не окажется в памяти или не наберется WS_REPLAY_LIMIT
+    записей. Возвращает (подходящие подписке записи, offset следующей непрочитанной,
+    сколько записей прочитано).
+    """
+    records, replayed = [], 0
+    while replayed < WS_REPLAY_LIMIT and offset < log_store.hot_start:
+        page = log_store.read(offset, min(LOG_PAGE_LIMIT, WS_REPLAY_LIMIT - replayed))
+        if not page:
+            break
+        replayed += len(page)
+        offset = page[-1][0] + 1
+        records += filter_history(page, spec)
+    return records, offset, replayed
+
+def replay_gap_event(start: int, end: int) -> dict:
+    """Служебное событие /ws: записи [start, end) в историю не вошли, дальше идет живой поток."""
+    event = server_event(f"История передана не полностью: пропущены записи {start}-{end - 1}, "
+                         f"их можно прочитать через /log/history?offset={start}", None, "WARNING", "replay_gap")
+    event.update(from_offset=start, next_offset=end)
+    return event
+
+def server_event(message: str, client_host: str, level: str = "INFO", event_type: str = "status",
+                 timestamp: datetime = None, client_id: Optional[str] = None) -> dict:
+    """
+    Событие сервера в формате записи лога - страницы логов показывают его как обычную строку.
+    client_id - идентификатор клиента (тот же, что в его записях лога), client_host - его IP.
+    """
+    return {
+        "timestamp": (timestamp or datetime.utcnow()).isoformat(),
+        "type": event_type,
+        "level": level,
+        "source": "server",
+        "client_id": client_id,
+        "client_host": client_host,
+        "message": message,
+    }
+
+def status_event(payload: StatusPayload, client_host: str) -> dict:
+    log_msg = f"Статус: {payload.action}, Процесс: {payload.active_window_process}, клиент: {payload.client_id or client_host}"
     logger.info(log_msg)
-    await manager.broadcast(log_msg)
-    await manager.broadcast(f"Connection event: status, client: {client_host}")
+    return server_event(log_msg, client_host, timestamp=payload.timestamp, client_id=payload.client_id)
+
+def status_point(payload: StatusPayload) -> Point:
+    return Point("waifu_status") \
+        .tag("action", payload.action) \
+        .tag("process", payload.active_window_process) \
+        .field("x", payload.x) \
+        .field("y", payload.y) \
+        .field("window_title", payload.active_window_title) \
+        .time(payload.timestamp)
 
-    if not write_api:
+async def write_statuses(payloads: List[StatusPayload], client_host: str):
+    """
+    Ставит статусы в конвейер записи InfluxDB (сама запись идет в фоне пачками)
+    и только после этого рассылает их зрителям: пачка, на которую ответили 503,
+    придет повторно и не должна показаться дважды.
+    """
+    if not status_writer:
         error_msg = "InfluxDB не настроен на сервере."
         logger.error(error_msg)
-        await manager.broadcast(error_msg)
-        await manager.broadcast(f"Connection event: error, client: {client_host}")
+        publish_statuses(payloads, client_host)
+        client_id = payloads[0].client_id if payloads else None
+        broadcaster.publish(server_event(error_msg, client_host, "ERROR", "error", client_id=client_id))
         return {"status": "error", "message": error_msg}
 
     try:
-        point = Point("waifu_status") \
-            .tag("action", payload.action) \
-            .tag("process", payload.active_window_process) \
-            .field("x", payload.x) \
-            .field("y", payload.y) \
-            .field("window_title", payload.active_window_title) \
-            .time(payload.timestamp)
-        
-        write_api.write(bucket=INFLUXDB_BUCKET, org=INFLUXDB_ORG, record=point)
-        return {"status": "success"}
-
-    except Exception as e:
-        error_msg = f"Ошибка записи в InfluxDB: {e}"
-        logger.error(error_msg)
-        await manager.broadcast(error_msg)
-        await manager.broadcast(f"Connection event: error, client: {client_host}")
-        return {"status": "error", "message": str(e)}
+        await status_writer.put([status_point(payload) for payload in payloads])
+    except QueueFullError as e:
+        # Обратное давление: InfluxDB не успевает или недоступна, клиент повторит позже
+        logger.error(str(e))
+        return JSONResponse(status_code=503, content={"status": "error", "message": str(e)})
+    publish_statuses(payloads, client_host)
+    return {"status": "success", "count": len(payloads)}
+
+def publish_statuses(payloads: List[StatusPayload], client_host: str):
+    for payload in payloads:
+        broadcaster.publish(status_event(payload, client_host))
+
+@app.post("/status")
+async def receive_status(payload: StatusPayload, request: Request):
+    """Принимает данные о состоянии от клиента."""
+    client_host = request.client.host if request.client else "unknown"
+    return await write_statuses([payload], client_host)
+
+@app.post("/status/batch")
+async def receive_status_batch(request: Request):
+    """
+    Принимает пачку статусов от фонового отправителя клиента и ставит их
+    в конвейер записи InfluxDB. При переполнении конвейера или пока InfluxDB
+    не принимает запись отвечает 503, чтобы клиент повторил пачку позже;
+    на некорректную пачку - 400.
+    """
+    client_host = request.client.host if request.client else "unknown"
+    try:
+        payloads = [StatusPayload(**entry) for entry in await read_json_batch(request)]
+    except (ValueError, TypeError) as e:
+        logger.error(f"Некорректная пачка статусов: {e}")
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+    return await write_statuses(payloads, client_host)
 
 @app.post("/error")
 async def receive_error(request: Request, payload: Dict):
-    """Принимает отчеты об ошибках от клиента."""
+    """Принимает отчеты об ошибках от клиента (client_id клиента - в поле client_id отчета)."""
     client_host = request.client.host if request.client else "unknown"
-    error_msg = f"Ошибка от клиента {client_host}: {json.dumps(payload)}"
+    client_id = payload.get("client_id")
+    client_id = None if client_id is None else str(client_id)
+    error_msg = f"Ошибка от клиента {client_id or client_host}: {json.dumps(payload)}"
     logger.error(error_msg)
-    
-    await manager.broadcast(error_msg)
-    await manager.broadcast(f"Connection event: error, client: {client_host}")
-    
+
+    broadcaster.publish(server_event(error_msg, client_host, "ERROR", "error", client_id=client_id))
     return {"status": "logged"}
 
+@app.get("/metrics")
+def get_metrics():
+    """Метрики конвейера записи в InfluxDB и рассылки по WebSocket."""
+    return {
+        "influx": status_writer.metrics() if status_writer else None,
+        "websocket": manager.metrics(),
+        "broadcast": broadcaster.metrics(),
+        "log_store": log_store.metrics(),
+    }
+
 @app.get("/health")
 def health_check():
     """Проверка доступности сервера и InfluxDB."""
@@ -161,21 +334,94 @@ def health_check():
         return {"status": "ok", "influxdb": "connected"}
     return {"status": "ok", "influxdb": "disconnected"}
 
+async def publish_logs(entries: list):
+    """Рассылает записи лога зрителям и дописывает их (уже сериализованными) в журнал одной пачкой."""
+    offset = log_store.next_offset
+    encoded = []
+    for log_entry in entries:
+        if isinstance(log_entry, dict):
+            log_entry.setdefault("type", "log")
+            log_entry["offset"] = offset + len(encoded)
+        encoded.append(broadcaster.publish(log_entry))
+    log_store.append_many(encoded)
+    if log_store.maintenance_due:
+        # fsync после ротации и удаление старых сегментов - в пуле потоков
+        await asyncio.to_thread(log_store.maintain)
+
+def unix_time(value: datetime) -> float:
+    """Время без часового пояса считается UTC, как и timestamp клиентов."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+@app.get("/log/history")
+def get_log_history(offset: Optional[int] = None, since: Optional[datetime] = None,
+                          until: Optional[datetime] = None, limit: int = 100):
+    """
+    Страница журнала логов: с offset или начиная со времени приема since
+    (оба варианта - не позже until). Без параметров - последние limit записей.
+    Следующая страница читается с offset=next_offset.
+    Обычная функция: FastAPI выполняет ее в пуле потоков, чтение с диска не держит цикл событий.
+    """
+    limit = max(1, min(limit, LOG_PAGE_LIMIT))
+    if offset is not None:
+        records = log_store.read(offset, limit)
+    elif since is not None:
+        records = log_store.read_time(unix_time(since), None, limit)
+    else:
+        records = log_store.tail(limit)
+    if until is not None:
+        until_ts = unix_time(until)
+        records = [record for record in records if record[1] <= until_ts]
+
+    if records:
+        next_offset = records[-1][0] + 1
+    else:
+        next_offset = max(offset, log_store.first_offset) if offset is not None else log_store.next_offset
+    # Записи хранятся сериализованными - собираем ответ без повторного разбора JSON
+    body = '{"first_offset":%d,"end_offset":%d,"next_offset":%d,"records":[%s]}' % (
+        log_store.first_offset, log_store.next_offset, next_offset,
+        ",".join('{"offset":%d,"received":%r,"entry":%s}' % record for record in records),
+    )
+    return Response(content=body, media_type="application/json")
+
 @app.post("/log")
 async def receive_log(log_entry: dict):
     """
     Принимает запись лога, добавляет в историю и транслирует по WebSocket.
     """
-    log_history.append(log_entry)
-    # Ограничиваем историю, чтобы не переполнять память
-    if len(log_history) > 200:
-        log_history.pop(0)
-    
-    # В broadcast передаем JSON-строку
-    await manager.broadcast(json.dumps(log_entry))
+    await publish_logs([log_entry])
     return {"status": "log_received"}
 
+async def read_json_batch(request: Request) -> list:
+    """Читает тело запроса-пачки: JSON-массив, опционально сжатый gzip (Content-Encoding: gzip)."""
+    body = await request.body()
+    try:
+        if request.headers.get("content-encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        entries = json.loads(body)
+    except (OSError, ValueError) as e:
+        raise ValueError(str(e))
+    if not isinstance(entries, list):
+        raise ValueError("Ожидается JSON-массив записей")
+    return entries
+
+@app.post("/log/batch")
+async def receive_log_batch(request: Request):
+    """
+    Принимает пачку записей лога (JSON-массив, опционально сжатый gzip
+    с заголовком Content-Encoding: gzip) от фонового отправителя клиента.
+    """
+    try:
+        entries = await read_json_batch(request)
+    except ValueError as e:
+        logger.error(f"Некорректная пачка логов: {e}")
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+    await publish_logs(entries)
+    return {"status": "log_received", "count": len(entries)}
+
 if __name__ == '__main__':
     # Запуск uvicorn для асинхронного FastAPI
     import uvicorn
-    uvicorn.run(app, host='0.0.0.0', port=8000, debug=False) 
\ No newline at end of file
+    uvicorn.run(app, host='0.0.0.0', port=8000, ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE) 
\ No newline at end of file
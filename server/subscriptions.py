@@ -0,0 +1,109 @@
+import logging
+
+LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING,
+          "ERROR": logging.ERROR, "CRITICAL": logging.CRITICAL}
+
+
+def event_key(event) -> tuple:
+    """Поля события, по которым идет маршрутизация: (client_id, уровень, источник, тип)."""
+    if not isinstance(event, dict):
+        return None, logging.NOTSET, None, None
+    level = LEVELS.get(str(event.get("level", "")).upper(), logging.NOTSET)
+    client_id, source, event_type = (None if event.get(name) is None else str(event[name])
+                                     for name in ("client_id", "source", "type"))
+    return client_id, level, source, event_type
+
+
+class Subscription:
+    """
+    Что хочет видеть зритель /ws. Пустое поле - без ограничения.
+    Задается параметрами подключения /ws (списки - через запятую):
+        /ws?client_ids=a1b2c3d4&min_level=WARNING&sources=waifu.character&types=log
+    или меняется сообщением в сокет:
+        {"client_ids": ["a1b2c3d4"], "min_level": "WARNING", "sources": ["waifu.character"], "types": ["log"]}
+    """
+    def __init__(self, client_ids=None, min_level=logging.NOTSET, sources=None, types=None):
+        self.client_ids = frozenset(client_ids) if client_ids else None
+        self.min_level = min_level
+        self.sources = frozenset(sources) if sources else None
+        self.types = frozenset(types) if types else None
+
+    @classmethod
+    def from_message(cls, data: dict) -> "Subscription":
+        if not isinstance(data, dict):
+            raise ValueError("Подписка должна быть JSON-объектом")
+        min_level = data.get("min_level") or "NOTSET"
+        if str(min_level).upper() not in LEVELS and str(min_level).upper() != "NOTSET":
+            raise ValueError(f"Неизвестный уровень: {min_level}")
+        fields = {}
+        for name in ("client_ids", "sources", "types"):
+            value = data.get(name)
+            if value is not None and not isinstance(value, list):
+                raise ValueError(f"{name} должен быть списком")
+            fields[name] = [str(v) for v in value] if value else None
+        return cls(min_level=LEVELS.get(str(min_level).upper(), logging.NOTSET), **fields)
+
+    @classmethod
+    def from_query(cls, params) -> "Subscription":
+        """Подписка из параметров запроса (QueryParams): списки через запятую или повтором параметра."""
+        data = {"min_level": params.get("min_level")}
+        for name in ("client_ids", "sources", "types"):
+            values = [v.strip() for value in params.getlist(name) for v in value.split(",") if v.strip()]
+            data[name] = values or None
+        return cls.from_message(data)
+
+    @property
+    def matches_all(self):
+        return not (self.client_ids or self.min_level or self.sources or self.types)
+
+    def matches_rest(self, source, event_type):
+        """Проверка полей, не вошедших в индекс (источник и тип)."""
+        return (self.sources is None or source in self.sources) and (self.types is None or event_type in self.types)
+
+
+class SubscriptionIndex:
+    """
+    Индекс подписок: client_id (None - любой клиент) -> минимальный уровень ->
+    подписчики. Для события просматриваются только две ветки (его client_id и
+    "любой") и уровни не выше уровня события, поэтому стоимость рассылки
+    зависит от числа подходящих зрителей, а не от числа всех подключений.
+    Источник и тип проверяются уже у найденных кандидатов.
+    """
+    def __init__(self):
+        self._by_client = {} # client_id | None -> {уровень: {подписчик: Subscription}}
+        self._specs = {}     # подписчик -> Subscription
+
+    def __len__(self):
+        return len(self._specs)
+
+    def add(self, subscriber, spec: Subscription):
+        self.remove(subscriber)
+        self._specs[subscriber] = spec
+        for client_id in spec.client_ids or (None,):
+            self._by_client.setdefault(client_id, {}).setdefault(spec.min_level, {})[subscriber] = spec
+
+    def remove(self, subscriber):
+        spec = self._specs.pop(subscriber, None)
+        if spec is None:
+            return
+        for client_id in spec.client_ids or (None,):
+            levels = self._by_client[client_id]
+            del levels[spec.min_level][subscriber]
+            if not levels[spec.min_level]:
+                del levels[spec.min_level]
+            if not levels:
+                del self._by_client[client_id]
+
+    def match(self, key):
+        """Подписчики, которым нужно событие с ключом из event_key()."""
+        client_id, level, source, event_type = key
+        for client in ((client_id, None) if client_id is not None else (None,)):
+            levels = self._by_client.get(client)
+            if not levels:
+                continue
+            for min_level, subscribers in levels.items():
+                if min_level > level:
+                    continue
+                for subscriber, spec in subscribers.items():
+                    if spec.matches_rest(source, event_type):
+                        yield subscriber
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from waifu.active_window import ActiveWindowTracker, ProcessNameCache
+from waifu.backends.foreground import FakeForegroundSource
+
+
+def test_reused_pid_with_new_create_time_is_looked_up_again():
+    source = FakeForegroundSource()
+    cache = ProcessNameCache(source)
+    source.start_process(42, "editor.exe", create_time=100.0)
+    assert cache.lookup(42) == "editor.exe"
+    assert cache.lookup(42) == "editor.exe"
+    assert source.process_lookups == 1 and cache.hits == 1
+
+    # Процесс завершился, а его PID достался новому
+    source.start_process(42, "browser.exe", create_time=200.0)
+    assert cache.lookup(42) == "browser.exe"
+    assert source.process_lookups == 2 and cache.invalidations == 1
+
+
+def test_dead_process_is_dropped_from_cache():
+    source = FakeForegroundSource()
+    cache = ProcessNameCache(source)
+    source.start_process(7, "game.exe", create_time=1.0)
+    cache.lookup(7)
+    source.kill_process(7)
+    assert cache.lookup(7) is None and len(cache) == 0
+
+
+def test_tracker_looks_up_process_only_when_window_changes():
+    source = FakeForegroundSource()
+    source.start_process(1, "editor.exe", create_time=1.0)
+    source.set_foreground(10, 1, "main.py")
+    tracker = ActiveWindowTracker(source=source)
+    tracker.sample()
+    source.set_foreground(10, 1, "utils.py") # Сменился только заголовок
+    tracker.sample()
+    assert tracker.snapshot.title == "utils.py" and tracker.snapshot.process == "editor.exe"
+    assert source.process_lookups == 1
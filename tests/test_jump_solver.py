@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import config
+from waifu.jump_solver import JumpEvaluator, descent_time
+from waifu.physics import PhysicsController
+from waifu.platform import Platform, PlatformIndex
+
+GRAVITY = 2 * config.JUMP_HEIGHT / config.TIME_TO_JUMP_APEX ** 2
+JUMP_VELOCITY = GRAVITY * config.TIME_TO_JUMP_APEX
+
+
+def _simulated_time(vy0, drop):
+    """Время, за которое PhysicsController опускается на drop ниже точки взлета."""
+    physics = PhysicsController(10, 10)
+    physics.set_position(0, 0)
+    physics.dy, physics.gravity_override = vy0, GRAVITY
+    dt, t = config.PHYSICS_INTERVAL / 1000, 0.0
+    while physics.y < drop:
+        physics.update(PlatformIndex(), dt)
+        t += dt
+    return t
+
+
+def test_descent_time_follows_fall_speed_clamp():
+    # Длинные спуски: большую часть полета скорость ограничена MAX_FALL_SPEED
+    for vy0, drop in ((0.0, 100), (0.0, 1500), (-JUMP_VELOCITY, 200), (-JUMP_VELOCITY, 2000)):
+        t, reachable = descent_time(vy0, drop, GRAVITY)
+        assert reachable
+        assert abs(float(t) - _simulated_time(vy0, drop)) < 2 * config.PHYSICS_INTERVAL / 1000
+
+
+def test_candidates_skip_platforms_missing_from_cache():
+    evaluator = JumpEvaluator(20, 20)
+    source, cached, stale = Platform(0, 500, 300, 502), Platform(400, 600, 700, 602), Platform(800, 600, 900, 602)
+    evaluator.set_platforms([source, cached])
+    target_idx, landing_x, _ = evaluator.candidates(source, [cached, stale], 3)
+    assert list(target_idx) == [1, 1, 1]
+    assert min(landing_x) >= cached.left
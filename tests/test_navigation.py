@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import random
+
+from waifu.navigation import NavigationGraph
+from waifu.platform import Platform, PlatformDiff, PlatformIndex, PlatformStore
+
+
+def _random_platform(rng, key):
+    left, top = rng.randrange(0, 3600), rng.randrange(50, 1000)
+    return Platform(left, top, left + rng.randrange(150, 800), top + 2, key=key)
+
+
+def _fresh_graph(platforms):
+    graph = NavigationGraph(150, 200, PlatformIndex(platforms))
+    graph.apply_diff(PlatformDiff(platforms, [], []))
+    return graph
+
+
+def test_incremental_rescans_match_fresh_build_without_stale_pairs():
+    rng = random.Random(7)
+    store, index = PlatformStore(), PlatformIndex()
+    graph = NavigationGraph(150, 200, index)
+    current = {key: _random_platform(rng, key) for key in range(60)}
+    for _ in range(15):
+        diff = store.apply(list(current.values()))
+        index.apply_diff(diff)
+        graph.apply_diff(diff)
+        for key in rng.sample(sorted(current), 6):
+            current[key] = _random_platform(rng, key)
+        for key in rng.sample(sorted(current), 2):
+            del current[key] # Окно закрылось, вместо него открылось новое
+            new_key = key + 1000 * rng.randrange(1, 100)
+            current[new_key] = _random_platform(rng, new_key)
+
+    fresh = _fresh_graph(store.platforms)
+    assert {p: set(graph.edges_from(p)) for p in store.platforms} == \
+           {p: set(fresh.edges_from(p)) for p in store.platforms}
+    assert graph.blocked_pairs == fresh.blocked_pairs
+
+
+def test_snapshot_is_not_affected_by_later_diffs():
+    a, b = Platform(0, 500, 400, 502, key="a"), Platform(300, 400, 700, 402, key="b")
+    index = PlatformIndex([a, b])
+    graph = NavigationGraph(150, 200, index)
+    graph.apply_diff(PlatformDiff([a, b], [], []))
+    snapshot = graph.snapshot()
+
+    index.remove(b)
+    graph.apply_diff(PlatformDiff([], [b], []))
+    assert b not in graph
+    assert b in snapshot and snapshot.find_path(a, [b])
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import random
+
+from waifu.occlusion import visible_top_edges
+
+
+def _reference(rects):
+    """Перебор: участок грани окна z виден, если его не накрывает ни одно окно выше по Z."""
+    result = []
+    for z, (left, top, right, bottom) in enumerate(rects):
+        segments = []
+        if right > left and bottom > top:
+            for x in range(left, right):
+                covered = any(l <= x < r and t <= top < b and r > l and b > t
+                              for l, t, r, b in rects[:z])
+                if covered:
+                    continue
+                if segments and segments[-1][1] == x:
+                    segments[-1] = (segments[-1][0], x + 1)
+                else:
+                    segments.append((x, x + 1))
+        result.append(segments)
+    return result
+
+
+def _random_layout(rng, count, size=40):
+    rects = []
+    for _ in range(count):
+        left, top = rng.randrange(size), rng.randrange(size)
+        # Изредка - вырожденные окна и совпадающие грани
+        rects.append((left, top, left + rng.randrange(0, size // 2), top + rng.randrange(0, size // 2)))
+    return rects
+
+
+def test_matches_brute_force_on_random_overlapping_layouts():
+    rng = random.Random(0)
+    for _ in range(500):
+        rects = _random_layout(rng, rng.randint(1, 12))
+        assert visible_top_edges(rects) == _reference(rects), rects
+
+
+def test_window_below_top_edge_of_another_does_not_hide_it():
+    # Верхнее по Z окно начинается ниже грани второго окна и не перекрывает ее
+    assert visible_top_edges([(0, 50, 100, 80), (20, 10, 60, 40)]) == [[(0, 100)], [(20, 60)]]
+    # Окно, заканчивающееся ровно на грани, тоже не перекрывает
+    assert visible_top_edges([(0, 0, 100, 10), (20, 10, 60, 40)]) == [[(0, 100)], [(20, 60)]]
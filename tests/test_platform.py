@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import config
+from waifu.backends.windows import Monitor, SyntheticWindowSource
+from waifu.controllers.platform import PlatformManager
+from waifu.platform import Platform, PlatformIndex, PlatformStore
+
+
+def _segments(spans, top=100):
+    return [Platform(left, top, right, top + 2, key=("w", i)) for i, (left, right) in enumerate(spans)]
+
+
+def test_moved_platform_takes_geometry_of_another_moved_platform():
+    # Новая геометрия (w, 1) совпадает со старой геометрией (w, 2), которая уезжает дальше
+    store, index = PlatformStore(), PlatformIndex(cell_width=100)
+    index.apply_diff(store.apply(_segments([(0, 50), (80, 120), (200, 300)])))
+    index.apply_diff(store.apply(_segments([(0, 50), (200, 300), (400, 450)])))
+
+    assert len(index) == len(store) == 3
+    assert sorted(p.left for p in index) == [0, 200, 400]
+    assert all(p in index for p in store.platforms)
+    ground = index.find_ground(240, 260, 90, 110)
+    assert ground is not None and ground.key == ("w", 1)
+
+
+def test_index_membership_is_by_identity():
+    index = PlatformIndex(cell_width=100)
+    a, b = Platform(0, 100, 50, 102, key=1), Platform(0, 100, 50, 102, key=2)
+    index.add(a)
+    assert a in index and b not in index
+    index.add(b)
+    index.remove(a)
+    assert len(index) == 1 and b in index
+    assert index.find_ground(10, 20, 90, 110) is b
+
+
+class _Character:
+    width, height = config.SPRITE_WIDTH, config.SPRITE_HEIGHT
+    def update_platforms_list(self, platforms, diff=None): pass
+
+
+def test_unchanged_window_segment_keeps_identity_when_neighbour_appears():
+    # Окно сверху по Z перекрывает середину грани нижнего: у грани появляется второй участок слева
+    base = (100, 500, 1100, 900)
+    source = SyntheticWindowSource([Monitor(0, 0, 1920, 1080, True)], [(0, 300, 500, 600), base])
+    manager = PlatformManager(_Character(), None, source=source, threaded=False)
+    manager.prepare(manager.build_platforms())
+    right_part = next(p for p in manager.store.platforms if p.left == 500)
+
+    source.set_windows([(300, 300, 500, 600), base])
+    diff = manager.prepare(manager.build_platforms()).diff
+
+    assert any(p is right_part for p in manager.store.platforms)
+    assert [(p.left, p.right) for p in diff.added] == [(100, 300)]
+    assert not diff.removed and [old.key[0] for old, _ in diff.moved] == [1] # Сдвинулось только верхнее окно
+
+
+def test_unconsumed_scan_is_merged_into_the_next_one():
+    # Два скана готовы за один кадр: основной поток забирает только последний
+    source = SyntheticWindowSource([Monitor(0, 0, 1920, 1080, True)], [(0, 300, 500, 600), (600, 500, 900, 700)])
+    manager = PlatformManager(_Character(), None, source=source)
+    manager.scan_platforms()
+
+    source.set_windows([(0, 300, 500, 600), (600, 300, 900, 700), (1000, 200, 1300, 400)])
+    manager._submit(manager.prepare(manager.build_platforms()))
+    source.set_windows([(100, 300, 500, 600), (600, 300, 900, 700)])
+    manager._submit(manager.prepare(manager.build_platforms()))
+    manager.update()
+
+    assert len(manager.index) == len(manager.store)
+    assert all(p in manager.index for p in manager.store.platforms)
+    assert manager.index.find_ground(700, 710, 290, 310) is not None
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pytest
+
+from waifu.backends.host_window import FakeHostWindow
+from waifu.renderer import Renderer
+
+
+class _Animation:
+    def __init__(self):
+        self.current_sprite_index = 0
+        self.sprite = pygame.Surface((20, 20), pygame.SRCALPHA)
+        self.sprite.fill((255, 0, 0, 255), (5, 5, 10, 10))
+
+    def get_current_sprite(self):
+        return self.sprite
+
+
+class _Character:
+    def __init__(self):
+        self.state, self.facing_direction = "idle", "right"
+        self.animation = _Animation()
+        self.render_position = (100, 200)
+        self.draws = 0
+
+    def draw(self, screen):
+        self.draws += 1
+        screen.blit(self.animation.get_current_sprite(), (0, 0))
+
+
+@pytest.fixture
+def screen():
+    pygame.display.init()
+    yield pygame.display.set_mode((20, 20))
+    pygame.display.quit()
+
+
+def test_idle_frames_neither_redraw_nor_move_the_window(screen):
+    window, character = FakeHostWindow(), _Character()
+    renderer = Renderer(screen, (255, 0, 255), window)
+    for _ in range(10):
+        renderer.render(character)
+    assert character.draws == 1 and window.moves == [(100, 200)]
+    assert renderer.stats() == {"frames_drawn": 1, "frames_skipped": 9, "moves": 1, "moves_skipped": 9}
+
+
+def test_moving_character_moves_the_window_without_redrawing(screen):
+    window, character = FakeHostWindow(), _Character()
+    renderer = Renderer(screen, (255, 0, 255), window)
+    for x in range(100, 105):
+        character.render_position = (x, 200)
+        renderer.render(character)
+    assert character.draws == 1
+    assert window.moves == [(x, 200) for x in range(100, 105)]
+
+
+def test_redraws_on_frame_change_and_invalidate(screen):
+    window, character = FakeHostWindow(), _Character()
+    renderer = Renderer(screen, (255, 0, 255), window)
+    renderer.render(character)
+    character.animation.current_sprite_index = 1
+    renderer.render(character)
+    renderer.render(character)
+    renderer.invalidate()
+    renderer.render(character)
+    assert character.draws == 3 and len(window.moves) == 1
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import config
+from waifu.telemetry import StatusShipper
+
+
+def _queued(shipper):
+    return [(item[2]["client_id"], item[2]["action"]) for item in shipper._queue]
+
+
+def test_status_is_coalesced_with_its_own_client_not_the_last_queued(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "STATUS_FLUSH_INTERVAL", 60)
+    monkeypatch.setattr(config, "STATUS_COALESCE_WINDOW", 0)
+    shipper = StatusShipper("http://127.0.0.1:9/status/batch")
+    try:
+        shipper.submit_status({"client_id": "a", "action": "walk"})
+        shipper.submit_status({"client_id": "b", "action": "idle"})
+        # Повтор действия клиента a, хотя последним в очереди стоит статус b
+        shipper.submit_status({"client_id": "a", "action": "walk"})
+        assert _queued(shipper) == [("a", "walk"), ("b", "idle")]
+        assert shipper.coalesced == 1
+
+        # Короткий статус a заменяется следующим на своем месте в очереди
+        monkeypatch.setattr(config, "STATUS_COALESCE_WINDOW", 60)
+        shipper.submit_status({"client_id": "a", "action": "jump"})
+        assert _queued(shipper) == [("a", "jump"), ("b", "idle")]
+
+        # Отправленный статус больше не сливается
+        shipper._take_batch(1)
+        shipper.submit_status({"client_id": "a", "action": "jump"})
+        assert _queued(shipper) == [("b", "idle"), ("a", "jump")]
+    finally:
+        shipper.close(timeout=0)
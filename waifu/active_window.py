@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+
+import config
+from .backends.foreground import Win32ForegroundSource
+from .utils import IS_WIN
+
+# Снимок активного окна для статусов персонажа
+ActiveWindow = namedtuple("ActiveWindow", "hwnd pid title process")
+UNKNOWN_WINDOW = ActiveWindow(None, None, "Unknown", "Unknown")
+
+
+class ProcessNameCache:
+    """
+    LRU-кеш PID -> имя процесса. Запись помнит время запуска процесса:
+    если PID переиспользован новым процессом, время не совпадет и запись
+    будет перезапрошена.
+    """
+    def __init__(self, source, maxsize=None):
+        self.source = source
+        self.maxsize = maxsize or config.PROCESS_NAME_CACHE_SIZE
+        self._entries = OrderedDict() # pid -> (время запуска, имя)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, pid):
+        """Возвращает имя процесса или None, если процесса уже нет."""
+        started = self.source.get_process_start(pid)
+        entry = self._entries.get(pid)
+        if started is None:
+            if entry is not None:
+                del self._entries[pid]
+                self.invalidations += 1
+            return None
+        if entry is not None:
+            if entry[0] == started:
+                self._entries.move_to_end(pid)
+                self.hits += 1
+                return entry[1]
+            self.invalidations += 1 # PID переиспользован
+
+        self.misses += 1
+        name = self.source.get_process_name(pid)
+        if name is None:
+            self._entries.pop(pid, None)
+            return None
+        self._entries[pid] = (started, name)
+        self._entries.move_to_end(pid)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return name
+
+
+class ActiveWindowTracker:
+    """
+    Фоновый опрос активного окна. Статусы читают готовый снимок (snapshot)
+    без системных вызовов в главном цикле. Имя процесса запрашивается только
+    при смене окна - у одного окна процесс-владелец не меняется.
+    source - бэкенд waifu.backends.foreground (по умолчанию Win32, если доступен).
+    """
+    def __init__(self, source=None, interval=None, cache_size=None):
+        if source is None and IS_WIN:
+            source = Win32ForegroundSource()
+        self.source = source
+        self.interval = interval or config.ACTIVE_WINDOW_POLL_INTERVAL
+        self.cache = ProcessNameCache(source, cache_size) if source is not None else None
+        self.snapshot = UNKNOWN_WINDOW
+        self.samples = 0
+
+        self._stop_event = threading.Event()
+        self._worker = None
+
+    def start(self):
+        """Делает первый замер синхронно и запускает фоновый опрос."""
+        if self.source is None or self._worker is not None:
+            return
+        self.sample()
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._run, name="ActiveWindowTracker", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        if self._worker is None:
+            return
+        self._stop_event.set()
+        self._worker.join(timeout=2.0)
+        self._worker = None
+
+    def stats(self):
+        if self.cache is None:
+            return {"samples": self.samples}
+        return {
+            "samples": self.samples,
+            "cache_size": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cache_invalidations": self.cache.invalidations,
+        }
+
+    def sample(self):
+        """Один замер активного окна; обновляет snapshot."""
+        self.samples += 1
+        foreground = self.source.get_foreground()
+        if foreground is None:
+            self.snapshot = UNKNOWN_WINDOW
+            return
+        hwnd, pid, title = foreground
+        previous = self.snapshot
+        if previous.hwnd == hwnd and previous.pid == pid and previous.process != "Unknown":
+            if previous.title != (title or "Unknown"):
+                self.snapshot = previous._replace(title=title or "Unknown")
+            return
+        process = self.cache.lookup(pid) or "Unknown"
+        # Присваивание ссылки атомарно - читатели видят либо старый, либо новый снимок
+        self.snapshot = ActiveWindow(hwnd, pid, title or "Unknown", process)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"Ошибка опроса активного окна: {e}")
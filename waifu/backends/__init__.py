@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Подключаемые платформенные бэкенды (Win32 и синтетические для тестов и бенчмарков)."""
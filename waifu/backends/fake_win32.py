@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+# Значения констант win32con, которые нужны get_desktop_windows
+GWL_STYLE = -16
+GWL_EXSTYLE = -20
+WS_CAPTION = 0x00C00000
+WS_EX_TOOLWINDOW = 0x00000080
+GW_HWNDNEXT = 2
+
+
+class FakeWindowTree:
+    """
+    Поддельное дерево окон верхнего уровня с интерфейсом win32gui/win32process
+    (подмножество, нужное get_desktop_windows). Позволяет тестировать и
+    бенчмаркать перечисление окон без Windows.
+    """
+    GWL_STYLE = GWL_STYLE
+    GWL_EXSTYLE = GWL_EXSTYLE
+    WS_CAPTION = WS_CAPTION
+    WS_EX_TOOLWINDOW = WS_EX_TOOLWINDOW
+    GW_HWNDNEXT = GW_HWNDNEXT
+
+    def __init__(self):
+        self._windows = {} # hwnd -> dict(title, rect, pid, visible, style, ex_style)
+        self._z_order = [] # hwnd сверху вниз
+        self._next = {}    # hwnd -> следующий hwnd в Z-порядке
+        self._next_hwnd = 0x10000
+
+    def add_window(self, rect, title="Window", pid=1000, visible=True,
+                   style=WS_CAPTION, ex_style=0):
+        """Добавляет окно под всеми существующими (в конец Z-порядка) и возвращает его hwnd."""
+        hwnd = self._next_hwnd
+        self._next_hwnd += 4
+        self._windows[hwnd] = dict(title=title, rect=tuple(rect), pid=pid,
+                                   visible=visible, style=style, ex_style=ex_style)
+        if self._z_order:
+            self._next[self._z_order[-1]] = hwnd
+        self._z_order.append(hwnd)
+        return hwnd
+
+    def bring_to_top(self, hwnd):
+        """Переносит окно наверх Z-порядка."""
+        self._z_order.remove(hwnd)
+        self._z_order.insert(0, hwnd)
+        self._next = dict(zip(self._z_order, self._z_order[1:]))
+
+    @classmethod
+    def random(cls, count, seed=0, visible_ratio=0.1, screen=(0, 0, 3840, 1080)):
+        """
+        Создает дерево из count окон. Как и на реальном рабочем столе, видимых
+        окон с заголовком лишь небольшая доля (visible_ratio), остальные -
+        скрытые, служебные и инструментальные.
+        """
+        rng = random.Random(seed)
+        tree = cls()
+        sx, sy, sw, sh = screen
+        for i in range(count):
+            width, height = rng.randint(100, sw // 2), rng.randint(40, sh // 2)
+            left, top = rng.randint(sx, sx + sw - width), rng.randint(sy, sy + sh - height)
+            rect = (left, top, left + width, top + height)
+            kind = rng.random()
+            if kind < visible_ratio:
+                tree.add_window(rect, f"Window {i}", pid=rng.randint(100, 9000))
+            elif kind < visible_ratio * 2:
+                tree.add_window(rect, f"Tool {i}", ex_style=WS_EX_TOOLWINDOW)
+            elif kind < 0.5:
+                tree.add_window(rect, "", style=0)
+            else:
+                tree.add_window(rect, f"Hidden {i}", visible=False)
+        return tree
+
+    # --- Интерфейс win32gui ---
+    def EnumWindows(self, callback, extra):
+        for hwnd in list(self._z_order):
+            if callback(hwnd, extra) is False:
+                break
+
+    def IsWindowVisible(self, hwnd):
+        return self._windows[hwnd]["visible"]
+
+    def GetWindowText(self, hwnd):
+        return self._windows[hwnd]["title"]
+
+    def GetWindowLong(self, hwnd, index):
+        return self._windows[hwnd]["style" if index == GWL_STYLE else "ex_style"]
+
+    def GetWindowRect(self, hwnd):
+        return self._windows[hwnd]["rect"]
+
+    def GetTopWindow(self, hwnd=None):
+        return self._z_order[0] if self._z_order else 0
+
+    def GetWindow(self, hwnd, cmd):
+        # Как и у настоящего списка окон: переход к следующему окну за O(1)
+        if cmd != GW_HWNDNEXT:
+            return 0
+        return self._next.get(hwnd, 0)
+
+    # --- Интерфейс win32process ---
+    def GetWindowThreadProcessId(self, hwnd):
+        return (hwnd + 1, self._windows[hwnd]["pid"])
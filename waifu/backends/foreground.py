@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import psutil
+
+from ..utils import IS_WIN
+
+if IS_WIN:
+    import win32gui
+    import win32process
+
+
+class ForegroundSource:
+    """
+    Источник данных об активном окне для ActiveWindowTracker.
+    Методы вызываются из фонового потока трекера.
+    """
+    def get_foreground(self):
+        """Возвращает (hwnd, pid, заголовок) активного окна или None."""
+        raise NotImplementedError
+
+    def get_process_start(self, pid):
+        """Возвращает время запуска процесса (дешевый запрос) или None, если процесса нет."""
+        raise NotImplementedError
+
+    def get_process_name(self, pid):
+        """Возвращает имя процесса (дорогой запрос) или None, если процесса нет."""
+        raise NotImplementedError
+
+
+class Win32ForegroundSource(ForegroundSource):
+    """Активное окно Windows (win32gui) и процессы через psutil."""
+
+    def get_foreground(self):
+        hwnd = win32gui.GetForegroundWindow()
+        if not hwnd:
+            return None
+        pid = win32process.GetWindowThreadProcessId(hwnd)[1]
+        return hwnd, pid, win32gui.GetWindowText(hwnd)
+
+    def get_process_start(self, pid):
+        try:
+            return psutil.Process(pid).create_time()
+        except (psutil.Error, OSError):
+            return None
+
+    def get_process_name(self, pid):
+        try:
+            return psutil.Process(pid).name()
+        except (psutil.Error, OSError):
+            return None
+
+
+class FakeForegroundSource(ForegroundSource):
+    """
+    Поддельное активное окно и таблица процессов для тестов на любой ОС.
+    lookup_delay имитирует стоимость запроса имени процесса; process_lookups
+    считает такие запросы.
+    """
+    def __init__(self, lookup_delay=0.0):
+        self.lookup_delay = lookup_delay
+        self.process_lookups = 0
+        self._lock = threading.Lock()
+        self._foreground = None
+        self._processes = {} # pid -> (имя, время запуска)
+
+    def set_foreground(self, hwnd, pid, title):
+        with self._lock:
+            self._foreground = (hwnd, pid, title)
+
+    def start_process(self, pid, name, create_time=None):
+        """Регистрирует процесс; повторный вызов с тем же pid имитирует переиспользование PID."""
+        with self._lock:
+            self._processes[pid] = (name, time.time() if create_time is None else create_time)
+
+    def kill_process(self, pid):
+        with self._lock:
+            self._processes.pop(pid, None)
+
+    def get_foreground(self):
+        with self._lock:
+            return self._foreground
+
+    def get_process_start(self, pid):
+        with self._lock:
+            process = self._processes.get(pid)
+        return process[1] if process else None
+
+    def get_process_name(self, pid):
+        self.process_lookups += 1
+        if self.lookup_delay:
+            time.sleep(self.lookup_delay)
+        with self._lock:
+            process = self._processes.get(pid)
+        return process[0] if process else None
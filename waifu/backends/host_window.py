@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from ..utils import IS_WIN
+
+if IS_WIN:
+    import win32con
+    import win32gui
+
+
+class HostWindow:
+    """Окно приложения, в котором рисуется персонаж; двигается вслед за ним."""
+
+    def move(self, x, y):
+        raise NotImplementedError
+
+
+class Win32HostWindow(HostWindow):
+    """Окно Pygame в Windows: перемещение поверх всех окон через SetWindowPos."""
+
+    def __init__(self, hwnd):
+        self.hwnd = hwnd
+
+    def move(self, x, y):
+        win32gui.SetWindowPos(self.hwnd, win32con.HWND_TOPMOST, x, y, 0, 0, win32con.SWP_NOSIZE)
+
+
+class FakeHostWindow(HostWindow):
+    """Запоминает перемещения вместо вызовов Win32 (для тестов на любой ОС)."""
+
+    def __init__(self):
+        self.position = None
+        self.moves = []
+
+    def move(self, x, y):
+        self.position = (x, y)
+        self.moves.append((x, y))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+
+from screeninfo import get_monitors
+
+from ..utils import DesktopWindow, get_desktop_windows, IS_WIN
+
+# Совместим по полям с screeninfo.Monitor
+Monitor = namedtuple("Monitor", "x y width height is_primary")
+
+
+class WindowSource:
+    """
+    Источник данных для построения платформ: мониторы и окна рабочего стола.
+    Методы вызываются из фонового потока сканера.
+    """
+    def get_monitors(self):
+        """Возвращает список мониторов (x, y, width, height, is_primary)."""
+        raise NotImplementedError
+
+    def get_windows(self):
+        """Возвращает окна (DesktopWindow) по Z-порядку, сверху вниз."""
+        raise NotImplementedError
+
+
+class Win32WindowSource(WindowSource):
+    """
+    Реальные окна рабочего стола Windows, без окон собственного процесса.
+    api - бэкенд для get_desktop_windows (по умолчанию настоящий Win32).
+    """
+
+    def __init__(self, hwnd, api=None):
+        self.hwnd = hwnd
+        self.api = api
+        self.pid = os.getpid()
+
+    def get_monitors(self):
+        return get_monitors()
+
+    def get_windows(self):
+        if self.api is None and not IS_WIN: return []
+        return [w for w in get_desktop_windows(self.api) if w.pid != self.pid]
+
+
+class SyntheticWindowSource(WindowSource):
+    """
+    Синтетический набор окон для тестов и бенчмарков (работает на любой ОС).
+    scan_delay имитирует стоимость перечисления окон Win32.
+    """
+    def __init__(self, monitors=None, windows=(), scan_delay=0.0):
+        self.monitors = list(monitors or [Monitor(0, 0, 1920, 1080, True)])
+        self.scan_delay = scan_delay
+        self._lock = threading.Lock()
+        self._windows = []
+        self.set_windows(windows)
+
+    @classmethod
+    def random(cls, count, seed=0, monitors=None, scan_delay=0.0):
+        """Создает источник со count случайными окнами в пределах мониторов."""
+        rng = random.Random(seed)
+        monitors = list(monitors or [Monitor(0, 0, 1920, 1080, True)])
+        windows = []
+        for _ in range(count):
+            m = rng.choice(monitors)
+            width = rng.randint(160, max(161, m.width // 2))
+            height = rng.randint(60, max(61, m.height // 2))
+            left = rng.randint(m.x, m.x + m.width - width)
+            top = rng.randint(m.y, m.y + m.height - height)
+            windows.append((left, top, left + width, top + height))
+        return cls(monitors, windows, scan_delay)
+
+    @staticmethod
+    def _as_window(hwnd, window):
+        if isinstance(window, DesktopWindow):
+            return window
+        return DesktopWindow(hwnd, 0, f"Window {hwnd}", tuple(window))
+
+    def set_windows(self, windows):
+        """
+        Подменяет набор окон (потокобезопасно). Принимает DesktopWindow или
+        прямоугольники (left, top, right, bottom) - им назначается hwnd по позиции.
+        """
+        windows = [self._as_window(hwnd, w) for hwnd, w in enumerate(windows, start=1)]
+        with self._lock:
+            self._windows = windows
+
+    def get_monitors(self):
+        return list(self.monitors)
+
+    def get_windows(self):
+        if self.scan_delay:
+            time.sleep(self.scan_delay)
+        with self._lock:
+            return list(self._windows)
@@ -1,48 +1,59 @@
 # -*- coding: utf-8 -*-
 import pygame
 import logging
-import sys
 from datetime import datetime
 
 import config
 from .physics import PhysicsController
-from .utils import send_to_server
+from .utils import send_status, shutdown_telemetry, telemetry_stats
 from .controllers.ai import AIController
 from .controllers.animation import AnimationController
 from .controllers.input import InputHandler
 from .controllers.platform import PlatformManager
+from .active_window import ActiveWindowTracker
 
-import pygetwindow
-import psutil
-
-try:
-    import win32process
-    IS_WIN = sys.platform.startswith('win')
-except ImportError:
-    IS_WIN = False
 
 class WaifuCharacter:
     """
     Основной класс-оркестратор, управляющий всеми аспектами персонажа,
     делегируя задачи специализированным контроллерам.
     """
-    def __init__(self, hwnd=None):
+    def __init__(self, hwnd=None, window_source=None, rng=None, headless=False, client_id=None):
+        """
+        headless - режим без дисплея и сети (см. waifu.simulation): спрайты не
+        конвертируются под дисплей, платформы сканируются синхронно по таймеру
+        из window_source, статусы на сервер не отправляются. rng - random.Random
+        для воспроизводимых решений AI. client_id - идентификатор клиента в
+        статусах (тот же, что в записях лога).
+        """
         self.width, self.height = config.SPRITE_WIDTH, config.SPRITE_HEIGHT
         self.hwnd = hwnd
+        self.headless = headless
+        self.client_id = client_id
 
         self.physics = PhysicsController(self.width, self.height)
-        self.animation = AnimationController(self.width, self.height)
-        self.platform_manager = PlatformManager(self, self.hwnd)
-        self.ai = AIController(self, self.platform_manager.platforms)
+        self.animation = AnimationController(self.width, self.height, headless=headless)
+        self.platform_manager = PlatformManager(self, self.hwnd, source=window_source, threaded=not headless)
+        self.ai = AIController(self, self.platform_manager.platforms, rng=rng)
         self.input = InputHandler(self, self.hwnd)
         
-        # Параметры для прыжков, которые нужны разным контроллерам
-        time_to_apex = config.TIME_TO_JUMP_APEX * config.FPS
+        # Параметры для прыжков, которые нужны разным контроллерам (px/с² и px/с)
+        time_to_apex = config.TIME_TO_JUMP_APEX
         self.jump_gravity = (2 * config.JUMP_HEIGHT) / (time_to_apex**2)
         self.jump_velocity = self.jump_gravity * time_to_apex
 
+        # Накопитель времени для фиксированного шага физики (в мс)
+        self.physics_accumulator = 0
+
         self.state = "idle"
         self.facing_direction = "right"
+
+        self.active_window = ActiveWindowTracker()
+        if not headless:
+            self.active_window.start()
+
+        # Первое сканирование и запуск фонового сканера - когда все контроллеры готовы
+        self.platform_manager.start()
         
         if config.DEBUG_LOGGING:
             logging.info("Инициализация персонажа и всех контроллеров завершена.")
@@ -52,20 +63,38 @@ class WaifuCharacter:
     @property
     def y(self): return self.physics.y
 
+    @property
+    def render_position(self):
+        """Целочисленная позиция для отрисовки, интерполированная между шагами физики."""
+        alpha = self.physics_accumulator / config.PHYSICS_INTERVAL
+        x, y = self.physics.interpolated_position(alpha)
+        return int(x), int(y)
+
     def update(self, delta_time):
+        """Вызывается раз в кадр отрисовки; физика и AI идут фиксированными шагами."""
         self.platform_manager.update(delta_time)
         self.input.update()
-        
+
+        # Не даем накопиться долгу после зависаний (перетаскивание окна, сон системы)
+        self.physics_accumulator = min(self.physics_accumulator + delta_time,
+                                       config.PHYSICS_INTERVAL * config.MAX_PHYSICS_STEPS)
+        while self.physics_accumulator >= config.PHYSICS_INTERVAL:
+            self.fixed_update(config.PHYSICS_INTERVAL)
+            self.physics_accumulator -= config.PHYSICS_INTERVAL
+
+        self.animation.update(delta_time, self.state, self.facing_direction)
+
+    def fixed_update(self, step_ms):
+        """Один шаг симуляции длительностью step_ms миллисекунд."""
         if not self.input.is_mouse_dragging:
-            self.ai.update(delta_time)
+            self.ai.update(step_ms)
         
         # Определение направления до обновления физики
         if self.physics.dx > 0.1: self.facing_direction = "right"
         elif self.physics.dx < -0.1: self.facing_direction = "left"
             
-        self.physics.update(self.platform_manager.platforms)
+        self.physics.update(self.platform_manager.index, step_ms / 1000)
         self.platform_manager.check_teleport_conditions()
-        self.animation.update(delta_time, self.state, self.facing_direction)
 
     def draw(self, screen):
         current_sprite = self.animation.get_current_sprite()
@@ -77,38 +106,41 @@ class WaifuCharacter:
     def set_state(self, new_state):
         if self.state == new_state: return
         self.state = new_state
-        self.animation.animation_timer = 0
-        self.animation.current_sprite_index = 0
+        self.animation.reset()
         self.send_status_to_server(new_state)
 
     def send_status_to_server(self, action):
-        try:
-            active_win = pygetwindow.getActiveWindow()
-            if active_win and active_win._hWnd and IS_WIN:
-                pid = win32process.GetWindowThreadProcessId(active_win._hWnd)[1]
-                process_name = psutil.Process(pid).name()
-                active_window_title = active_win.title
-            else:
-                active_window_title = "Unknown"
-                process_name = "Unknown"
-        except Exception:
-             active_window_title = "Unknown"
-             process_name = "Unknown"
+        if self.headless: return
+        # Готовый снимок фонового трекера - без системных вызовов в главном цикле
+        active_window = self.active_window.snapshot
 
         payload = {
+            "client_id": self.client_id,
             "timestamp": datetime.utcnow().isoformat(),
             "action": action,
             "x": int(self.x), "y": int(self.y),
-            "active_window_title": active_window_title,
-            "active_window_process": process_name
+            "active_window_title": active_window.title,
+            "active_window_process": active_window.process
         }
-        send_to_server(f"{config.SERVER_URL}/status", payload)
+        send_status(payload)
 
-    def update_platforms_list(self, new_platforms):
-        """Обновляет список платформ в AI контроллере."""
+    def update_platforms_list(self, new_platforms, diff=None):
+        """Обновляет список платформ в AI контроллере и ссылки на платформы в физике."""
         self.ai.platforms = new_platforms
+        if diff is not None:
+            self.physics.apply_platform_diff(diff)
+            self.ai.apply_platform_diff(diff)
+
+    def shutdown(self):
+        """Останавливает фоновые потоки персонажа."""
+        self.platform_manager.stop()
+        self.active_window.stop()
+        if not self.headless:
+            shutdown_telemetry()
+            logging.info(f"Телеметрия: {telemetry_stats()}")
+            logging.info(f"Активное окно: {self.active_window.stats()}")
 
     def teleport(self, x, y):
         """Телепортирует персонажа в заданные координаты."""
-        self.physics.x, self.physics.y = x, y
+        self.physics.set_position(x, y)
         self.physics.dx, self.physics.dy = 0, 0
\ No newline at end of file
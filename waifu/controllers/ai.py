@@ -1,23 +1,28 @@
 import logging
 import random
-import math
 
 import config
+from ..jump_solver import JumpEvaluator, descent_time
 
 class AIController:
     """Управляет принятием решений и поведением персонажа."""
 
-    def __init__(self, character, platforms):
+    def __init__(self, character, platforms, rng=None):
         self.character = character
+        self.rng = rng or random.Random()
         self.physics = character.physics
         self.platforms = platforms
+        # Граф прыжков строит поток сканера платформ, решения - поиск по его снимку
+        self.navigation = character.platform_manager.navigation
+        # Пакетная точная проверка траекторий прыжков
+        self.jump_evaluator = JumpEvaluator(character.width, character.height)
         self.ai_timer = 0
         self.target_x = None
         self.pending_jump_platform = None
         self.pending_jump_x = None
 
     def update(self, delta_time):
-        """Обновляет состояние AI."""
+        """Обновляет состояние AI. Вызывается на каждом шаге физики (delta_time в мс)."""
         self.ai_timer += delta_time
         
         if self.physics.on_ground and self.target_x is None and self.pending_jump_platform is None:
@@ -30,7 +35,7 @@ class AIController:
             move_direction = 1 if self.target_x > self.physics.x else -1
             self.physics.dx = config.WALK_SPEED * move_direction
             
-            if abs(self.target_x - self.physics.x) < config.WALK_SPEED:
+            if abs(self.target_x - self.physics.x) < config.WALK_SPEED * delta_time / 1000:
                 self.physics.x = self.target_x
                 self.target_x = None
                 self.physics.dx = 0
@@ -42,6 +47,18 @@ class AIController:
             self.physics.dx = 0
             self.character.set_state("idle")
     
+    def apply_platform_diff(self, diff):
+        """Подменяет граф прыжков и обновляет запланированный прыжок, если целевое окно сдвинулось или закрылось."""
+        self.navigation = self.character.platform_manager.navigation
+        self.jump_evaluator.set_platforms(self.platforms)
+        if self.pending_jump_platform is None: return
+        for old, new in diff.moved:
+            if old is self.pending_jump_platform:
+                self.pending_jump_platform = new
+                return
+        if any(p is self.pending_jump_platform for p in diff.removed):
+            self.reset_target()
+
     def reset_target(self):
         """Сбрасывает текущую цель AI."""
         self.ai_timer = 0
@@ -49,22 +66,16 @@ class AIController:
         self.pending_jump_platform = None
 
     def choose_new_action(self):
-        # ... (логика выбора действия)
         if not self.physics.on_ground or not self.physics.current_platform:
             return
 
         current_platform = self.physics.current_platform
-        other_platforms = [
-            p for p in self.platforms
-            if p != current_platform and p.top > 0
-        ]
+        jump = None
+        if self.rng.random() < config.JUMP_CHANCE:
+            jump = self.plan_jump(current_platform)
 
-        possible_jumps = self.evaluate_jumps(current_platform, other_platforms)
-
-        if possible_jumps and random.random() < config.JUMP_CHANCE:
-            possible_jumps.sort(key=lambda j: j[0])
-            best_jump = possible_jumps[0]
-            _, target_platform, landing_x, takeoff_x = best_jump
+        if jump:
+            target_platform, landing_x, takeoff_x = jump
 
             if config.DEBUG_LOGGING:
                 logging.info(f"Решил прыгнуть с x={takeoff_x:.0f} на платформу Y={target_platform.top} в точку x={landing_x:.0f}")
@@ -79,42 +90,50 @@ class AIController:
             self.walk_on_platform(current_platform)
 
     def evaluate_jumps(self, current_platform, other_platforms):
-        # ... (логика оценки прыжков)
-        possible_jumps = []
-        for _ in range(config.AI_JUMP_CANDIDATES):
-            if not other_platforms: break
-            
-            target_platform = random.choice(other_platforms)
-            landing_x = random.uniform(target_platform.left, target_platform.right - self.character.width)
-            
-            is_jumping_down = target_platform.top > current_platform.top
-
-            path_is_clear = self.is_jump_path_clear(current_platform, target_platform)
-            can_reach_height = is_jumping_down or (current_platform.top - target_platform.top) <= config.JUMP_HEIGHT
+        """
+        Одним пакетом проверяет AI_JUMP_CANDIDATES точек приземления, распределенных
+        по other_platforms, и возвращает выполнимые прыжки (cost, платформа, landing_x, takeoff_x).
+        """
+        if not other_platforms:
+            return []
+        evaluator = self.jump_evaluator
+        samples = max(1, min(config.AI_MAX_SAMPLES_PER_PLATFORM, config.AI_JUMP_CANDIDATES // len(other_platforms)))
+        target_idx, landing_x, takeoff_x = evaluator.candidates(current_platform, other_platforms, samples)
+        mask, cost = evaluator.evaluate(
+            current_platform, target_idx, landing_x, takeoff_x, self.physics.x,
+            self.character.jump_gravity, self.character.jump_velocity)
+        return [(float(cost[i]), evaluator.platforms[target_idx[i]], float(landing_x[i]), float(takeoff_x[i]))
+                for i in mask.nonzero()[0]]
+
+    def plan_jump(self, current_platform):
+        """
+        Выбирает следующий прыжок (платформа, landing_x, takeoff_x): первый шаг
+        кратчайшего пути к целевому окну (TARGET_WINDOW_TITLES), а если целей нет -
+        лучшую точку на случайной из достижимых платформ.
+        """
+        targets = [p for p in self.platforms if p.is_target]
+        if targets:
+            if current_platform.is_target:
+                return None # Уже на целевом окне - остаемся на нем
+            path = self.navigation.find_path(current_platform, targets) if self.navigation else None
+            if path:
+                hop = path[0]
+                possible_jumps = self.evaluate_jumps(current_platform, [hop.target])
+                if possible_jumps:
+                    _, target_platform, landing_x, takeoff_x = min(possible_jumps, key=lambda j: j[0])
+                    return target_platform, landing_x, takeoff_x
+                # Точная проверка отвергла шаг пути - выбираем из выполнимых прыжков
 
-            if path_is_clear and can_reach_height:
-                takeoff_x = max(current_platform.left, min(landing_x, current_platform.right - self.character.width))
-                walk_distance = abs(self.physics.x - takeoff_x)
-                possible_jumps.append((walk_distance, target_platform, landing_x, takeoff_x))
-        return possible_jumps
-    
-    def is_jump_path_clear(self, current_platform, target_platform):
-        """Проверяет, свободен ли путь для прыжка."""
-        jump_left = min(self.physics.x, target_platform.left)
-        jump_right = max(self.physics.x + self.character.width, target_platform.right)
-        jump_top = target_platform.top
-        jump_bottom = current_platform.top
-
-        for p in self.platforms:
-            if p == current_platform or p == target_platform:
-                continue
-            
-            horizontal_overlap = max(jump_left, p.left) < min(jump_right, p.right)
-            vertical_overlap = max(jump_top, p.top) < min(jump_bottom, p.bottom)
-
-            if horizontal_overlap and vertical_overlap:
-                return False
-        return True
+        other_platforms = [
+            p for p in self.platforms
+            if p is not current_platform and p.top > 0 and self.jump_evaluator.position(p) >= 0
+        ]
+        possible_jumps = self.evaluate_jumps(current_platform, other_platforms)
+        if not possible_jumps:
+            return None
+        target_platform = self.rng.choice(possible_jumps)[1]
+        _, _, landing_x, takeoff_x = min((j for j in possible_jumps if j[1] is target_platform), key=lambda j: j[0])
+        return target_platform, landing_x, takeoff_x
 
     def walk_on_platform(self, current_platform):
         """Выбирает случайную точку для прогулки на текущей платформе."""
@@ -122,7 +141,7 @@ class AIController:
             min_walk = max(current_platform.left, self.physics.x - config.MAX_WALK_DISTANCE)
             max_walk = min(current_platform.right - self.character.width, self.physics.x + config.MAX_WALK_DISTANCE)
             if max_walk > min_walk:
-                self.target_x = random.uniform(min_walk, max_walk)
+                self.target_x = self.rng.uniform(min_walk, max_walk)
                 if config.DEBUG_LOGGING:
                     logging.info(f"Решил прогуляться по текущей платформе до x={self.target_x:.0f}")
 
@@ -141,18 +160,12 @@ class AIController:
         delta_y = (target_platform.top - self.character.height) - self.physics.y
         gravity = self.character.jump_gravity
 
-        vy0 = 0
-        time_to_target = 0
-
-        if delta_y <= 0: # Прыжок вверх
-            vy0 = -self.character.jump_velocity
-            discriminant = vy0**2 + 2 * gravity * delta_y
-            if discriminant < 0: return
-            time_to_target = (-vy0 + math.sqrt(discriminant)) / gravity
-        else: # Прыжок вниз
-            if gravity > 0: time_to_target = math.sqrt(2 * delta_y / gravity)
-        
-        if time_to_target <= 0: return
+        # Вверх - с толчком, вниз - просто шагаем; время полета с учетом MAX_FALL_SPEED
+        vy0 = -self.character.jump_velocity if delta_y <= 0 else 0
+        if gravity <= 0: return
+        time_to_target, reachable = descent_time(vy0, delta_y, gravity)
+        time_to_target = float(time_to_target)
+        if not reachable or time_to_target <= 0: return
 
         self.physics.dx = delta_x / time_to_target
         self.physics.dy = vy0 if delta_y <= 0 else 0
@@ -162,4 +175,4 @@ class AIController:
         self.physics.platform_to_jump_to = target_platform
         
         if config.DEBUG_LOGGING:
-            logging.info(f"Прыгаю к ({optimal_landing_x:.0f}, {target_platform.top:.0f})! V=({self.physics.dx:.2f}, {self.physics.dy:.2f}), T~={time_to_target:.0f} кадров") 
\ No newline at end of file
+            logging.info(f"Прыгаю к ({optimal_landing_x:.0f}, {target_platform.top:.0f})! V=({self.physics.dx:.2f}, {self.physics.dy:.2f}), T~={time_to_target:.2f} с") 
\ No newline at end of file
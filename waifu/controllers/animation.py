@@ -1,50 +1,106 @@
 import pygame
 import logging
 import config
+from ..sprite_cache import SpriteCache
 
 class AnimationController:
-    """Управляет загрузкой, выбором и отображением спрайтов."""
+    """
+    Управляет загрузкой, выбором и отображением спрайтов.
+    Анимации описываются данными (config.ANIMATIONS: состояние -> кадры с длительностями).
+    Все кадры лежат в одном атласе, кадр - subsurface атласа без копирования пикселей.
+    Отраженные влево кадры создаются при первом использовании и кешируются.
+    """
 
-    def __init__(self, width, height):
+    def __init__(self, width, height, headless=False):
         self.width = width
         self.height = height
-        self.sprites = {}
+        self.headless = headless # Без дисплея convert_alpha() недоступен
+        self.sprite_cache = SpriteCache()
+        self.atlas = None
+        self.frames = []       # Кадры вправо: subsurface атласа
+        self.animations = {}   # состояние -> [(номер кадра в атласе, длительность в мс)]
+        self._flipped = {}     # номер кадра -> отраженная копия
         self.load_sprites()
-        if not self.sprites:
+        if not self.animations:
             raise RuntimeError("Критическая ошибка: не удалось загрузить спрайты.")
-        
-        self.image_list = self.sprites['idle']['right'] # Default
+
+        self.state = "idle"
+        self.facing_direction = "right"
         self.current_sprite_index = 0
         self.animation_timer = 0
 
     def load_sprites(self):
-        """Загружает и масштабирует все спрайты из конфига."""
+        """Загружает и масштабирует все спрайты из конфига в один атлас."""
         try:
-            raw_images = {name: pygame.image.load(path).convert_alpha() for name, path in config.SPRITE_PATHS.items()}
-            scaled_images = {name: pygame.transform.smoothscale(img, (self.width, self.height)) for name, img in raw_images.items()}
-            self.sprites = {
-                "idle": self.prepare_sprite_set(scaled_images["idle"]),
-                "walk": self.prepare_sprite_set(scaled_images["walk1"], scaled_images["walk2"]),
-                "sit": self.prepare_sprite_set(scaled_images["sit"]),
+            for state, frames in config.ANIMATIONS.items():
+                # Нулевая длительность зациклила бы update()
+                if not frames or any(not duration > 0 for _, duration in frames):
+                    raise ValueError(f"анимация '{state}' должна состоять из кадров с длительностью больше 0")
+            names = list(config.SPRITE_PATHS)
+            images = [self.sprite_cache.get_or_build(name, config.SPRITE_PATHS[name], (self.width, self.height),
+                                                     "smoothscale", lambda name=name: [self.build_frame(config.SPRITE_PATHS[name])])[0]
+                      for name in names]
+
+            atlas = pygame.Surface((self.width * len(images), self.height), pygame.SRCALPHA)
+            for i, image in enumerate(images):
+                # BLEND_RGBA_MAX по прозрачному фону копирует пиксели вместе с альфой как есть
+                atlas.blit(image, (i * self.width, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            if not self.headless:
+                atlas = atlas.convert_alpha()
+            del images, image # Поверхности поверх mmap больше не нужны
+            self.sprite_cache.close() # Пиксели уже в атласе
+
+            self.atlas = atlas
+            self.frames = [atlas.subsurface((i * self.width, 0, self.width, self.height)) for i in range(len(names))]
+            self._flipped = {}
+            frame_numbers = {name: i for i, name in enumerate(names)}
+            self.animations = {
+                state: [(frame_numbers[name], duration) for name, duration in frames]
+                for state, frames in config.ANIMATIONS.items()
             }
         except Exception as e:
             logging.critical(f"Ошибка загрузки спрайтов: {e}")
 
-    def prepare_sprite_set(self, *surfaces):
-        """Создает словарь с кадрами для левого и правого направления."""
-        return {
-            "right": list(surfaces),
-            "left": [pygame.transform.flip(s, True, False) for s in surfaces]
-        }
+    def build_frame(self, path):
+        """Декодирует PNG и масштабирует под размер спрайта."""
+        image = pygame.image.load(path)
+        if not self.headless:
+            image = image.convert_alpha()
+        return pygame.transform.smoothscale(image, (self.width, self.height))
+
+    def reset(self):
+        """Начинает анимацию с первого кадра (при смене состояния)."""
+        self.current_sprite_index = 0
+        self.animation_timer = 0
 
     def update(self, delta_time, state, facing_direction):
         """Обновляет текущий кадр анимации."""
-        self.image_list = self.sprites[state][facing_direction]
-        self.animation_timer += delta_time
-        if self.animation_timer > config.ANIMATION_INTERVAL:
+        self.state = state
+        self.facing_direction = facing_direction
+        frames = self.animations[state]
+        if len(frames) == 1:
+            self.current_sprite_index = 0
             self.animation_timer = 0
-            self.current_sprite_index = (self.current_sprite_index + 1) % len(self.image_list)
-    
+            return
+        self.current_sprite_index %= len(frames)
+        self.animation_timer += delta_time
+        # Остаток переносится на следующий кадр - темп анимации не зависит от FPS
+        while self.animation_timer >= frames[self.current_sprite_index][1]:
+            self.animation_timer -= frames[self.current_sprite_index][1]
+            self.current_sprite_index = (self.current_sprite_index + 1) % len(frames)
+
     def get_current_sprite(self):
         """Возвращает текущий спрайт для отрисовки."""
-        return self.image_list[self.current_sprite_index] 
\ No newline at end of file
+        frames = self.animations[self.state]
+        frame = frames[self.current_sprite_index % len(frames)][0]
+        if self.facing_direction == "right":
+            return self.frames[frame]
+        flipped = self._flipped.get(frame)
+        if flipped is None:
+            flipped = self._flipped[frame] = pygame.transform.flip(self.frames[frame], True, False)
+        return flipped
+
+    def memory_bytes(self):
+        """Сколько памяти занимают пиксели атласа и созданных отраженных кадров."""
+        surfaces = [self.atlas] + list(self._flipped.values()) if self.atlas else []
+        return sum(s.get_width() * s.get_height() * s.get_bytesize() for s in surfaces)
@@ -52,9 +52,10 @@ class InputHandler:
         """Заканчивает перетаскивание и придает инерцию."""
         if self.is_mouse_dragging:
             self.is_mouse_dragging = False
-            # Применяем инерцию
-            self.physics.dx = self.last_drag_dx * config.DRAG_INERTIA_FACTOR
-            self.physics.dy = self.last_drag_dy * config.DRAG_INERTIA_FACTOR
+            # Применяем инерцию: смещение за шаг физики переводим в скорость (px/с)
+            steps_per_second = 1000 / config.PHYSICS_INTERVAL
+            self.physics.dx = self.last_drag_dx * config.DRAG_INERTIA_FACTOR * steps_per_second
+            self.physics.dy = self.last_drag_dy * config.DRAG_INERTIA_FACTOR * steps_per_second
 
     def on_drag(self, event):
         """Обновляет позицию персонажа во время перетаскивания."""
@@ -67,8 +68,7 @@ class InputHandler:
             self.last_drag_dx = new_win_x - self.physics.x
             self.last_drag_dy = new_win_y - self.physics.y
 
-            self.physics.x = new_win_x
-            self.physics.y = new_win_y
+            self.physics.set_position(new_win_x, new_win_y)
             self.physics.dx = 0
             self.physics.dy = 0
             
@@ -1,68 +1,159 @@
 import logging
-import sys
-from screeninfo import get_monitors
+import threading
+import time
+from collections import namedtuple
 
 import config
-from ..platform import Platform
-from ..utils import get_desktop_windows
+from ..navigation import NavigationGraph
+from ..platform import Platform, PlatformIndex, PlatformStore, merge_diffs
+from ..occlusion import visible_top_edges
+from ..backends.windows import Win32WindowSource, IS_WIN
 
-# Зависимости для Windows-специфичных функций
-try:
-    import win32gui
-    import pywintypes
-    IS_WIN = sys.platform.startswith('win')
-except ImportError:
-    IS_WIN = False
+# Результат одного сканирования, готовый к подмене на границе кадра.
+# diff и navigation заполняет prepare() в том же потоке, где шло сканирование.
+ScanResult = namedtuple("ScanResult", "platforms monitors duration ready_at diff navigation",
+                        defaults=(None, None))
 
 
 class PlatformManager:
-    """Управляет обнаружением и обновлением платформ (окон и мониторов)."""
+    """
+    Управляет обнаружением и обновлением платформ (окон и мониторов).
+    Сканирование, дифф и обновление графа прыжков идут в фоновом потоке;
+    основной цикл только применяет дифф к индексу физики и подменяет граф
+    на границе кадра и никогда не ждет Win32.
+    С threaded=False (детерминированная симуляция) сканирует синхронно по таймеру.
+    """
 
-    def __init__(self, character, hwnd):
+    def __init__(self, character, hwnd, source=None, threaded=True):
         self.character = character
         self.hwnd = hwnd
+        self.threaded = threaded
+        self.update_timer = 0
+        if source is None and IS_WIN:
+            source = Win32WindowSource(hwnd)
+        self.source = source
         self.platforms = []
+        self.index = PlatformIndex() # Индекс основного потока (физика)
+        self.navigation = None       # Снимок графа прыжков для AI
         self.monitors = []
-        self.update_timer = 0
-        self.update() # Первоначальное сканирование
+        # Принадлежат потоку сканера: набор платформ, его индекс и изменяемый граф прыжков
+        self.store = PlatformStore()
+        self._scan_index = PlatformIndex()
+        self._graph = NavigationGraph(character.width, character.height, self._scan_index)
+
+        # Двойная буферизация: фоновый поток кладет сюда следующий набор платформ
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._worker = None
+
+        # Метрики (в секундах)
+        self.last_scan_duration = 0.0
+        self.last_swap_latency = 0.0
+        self.scan_count = 0
+
+    def start(self):
+        """Выполняет первое сканирование синхронно и запускает фоновый сканер."""
+        if self.source is None: return
+        self.scan_platforms()
+        if not self.threaded: return
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._scan_loop, name="PlatformScanner", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Останавливает фоновый сканер."""
+        self._stop_event.set()
+        if self._worker:
+            self._worker.join(timeout=config.PLATFORM_UPDATE_INTERVAL)
+            self._worker = None
 
     def update(self, delta_time=0):
-        """Периодически обновляет список платформ."""
-        self.update_timer += delta_time
-        if self.update_timer > (config.PLATFORM_UPDATE_INTERVAL * 1000):
-            self.scan_platforms()
-            self.update_timer = 0
+        """Вызывается на границе кадра: подменяет платформы, если готов новый набор."""
+        if not self.threaded:
+            self.update_timer += delta_time
+            if self.update_timer > (config.PLATFORM_UPDATE_INTERVAL * 1000):
+                self.scan_platforms()
+                self.update_timer = 0
+            return
+        with self._lock:
+            result, self._pending = self._pending, None
+        if result:
+            self._publish(result)
 
-    def scan_platforms(self):
-        """Сканирует окна и мониторы, чтобы создать платформы."""
-        if not IS_WIN: return
-        self.monitors = get_monitors()
-        
-        window_rects = get_desktop_windows()
-        new_platforms = []
+    def _scan_loop(self):
+        while not self._stop_event.wait(config.PLATFORM_UPDATE_INTERVAL):
+            try:
+                result = self.prepare(self.build_platforms())
+            except Exception as e:
+                logging.error(f"Ошибка фонового сканирования платформ: {e}")
+                continue
+            self._submit(result)
+
+    def _submit(self, result):
+        """
+        Отдает готовый скан основному потоку. Если предыдущий еще не забран,
+        его дифф склеивается с новым - иначе индекс физики разошелся бы с store.
+        """
+        with self._lock:
+            if self._pending is not None:
+                result = result._replace(diff=merge_diffs(self._pending.diff, result.diff))
+            self._pending = result
+
+    def build_platforms(self):
+        """Сканирует окна и мониторы источника и строит новый набор платформ."""
+        start = time.perf_counter()
+        monitors = self.source.get_monitors()
+        windows = self.source.get_windows()
+        # Видимые участки верхних граней с учетом окон, лежащих выше по Z-порядку
+        visible_edges = visible_top_edges([window.rect for window in windows])
+        # Словарь вместо списка: дедупликация одинаковых платформ за O(1)
+        new_platforms = {}
         
-        for w_rect in window_rects:
-            left, top, right, bottom = w_rect
-            if (right - left) > 150 and (bottom - top) > 50:
-                try:
-                    if self.hwnd == win32gui.WindowFromPoint((left, top)):
-                        continue
-                except pywintypes.error:
-                    pass 
-                
-                new_platform = Platform(left, top, right, top + 2)
-                if new_platform not in new_platforms:
-                    new_platforms.append(new_platform)
-
-        for m in self.monitors:
-            new_platform = Platform(m.x, m.y + m.height, m.x + m.width, m.y + m.height + 2)
-            if new_platform not in new_platforms:
-                new_platforms.append(new_platform)
-                
-        self.platforms = new_platforms 
-        self.character.update_platforms_list(self.platforms)
+        for window, segments in zip(windows, visible_edges):
+            left, top, right, bottom = window.rect
+            if (right - left) > config.MIN_PLATFORM_WIDTH and (bottom - top) > config.MIN_PLATFORM_HEIGHT:
+                is_target = any(title in window.title for title in config.TARGET_WINDOW_TITLES)
+                for seg_left, seg_right in segments:
+                    if seg_right - seg_left > config.MIN_PLATFORM_WIDTH:
+                        # Ключ - начало участка относительно окна, а не его номер: появление
+                        # или исчезновение соседнего участка не перенумеровывает остальные
+                        new_platforms.setdefault(Platform(seg_left, top, seg_right, top + 2, is_target=is_target,
+                                                          key=(window.hwnd, seg_left - left)))
+
+        for i, m in enumerate(monitors):
+            new_platforms.setdefault(Platform(m.x, m.y + m.height, m.x + m.width, m.y + m.height + 2, key=("monitor", i)))
+
+        return ScanResult(list(new_platforms), monitors, time.perf_counter() - start, time.perf_counter())
+
+    def prepare(self, result):
+        """
+        Применяет скан как дифф (неизменившиеся платформы сохраняют идентичность),
+        обновляет граф прыжков и снимает с него копию. Выполняется в потоке сканера.
+        """
+        diff = self.store.apply(result.platforms)
+        self._scan_index.apply_diff(diff)
+        self._graph.apply_diff(diff)
+        return result._replace(platforms=self.store.platforms, diff=diff, navigation=self._graph.snapshot())
+
+    def scan_platforms(self):
+        """Синхронно сканирует окна и мониторы и сразу публикует платформы."""
+        if self.source is None: return
+        self._publish(self.prepare(self.build_platforms()))
+
+    def _publish(self, result):
+        diff = result.diff
+        self.index.apply_diff(diff)
+        self.platforms = result.platforms
+        self.navigation = result.navigation
+        self.monitors = result.monitors
+        self.last_scan_duration = result.duration
+        self.last_swap_latency = time.perf_counter() - result.ready_at
+        self.scan_count += 1
+        self.character.update_platforms_list(self.platforms, diff)
         if config.DEBUG_LOGGING:
-            logging.info(f"Обновлены платформы ({len(self.platforms)} шт).")
+            logging.info(f"Обновлены платформы ({len(self.platforms)} шт, +{len(diff.added)} "
+                         f"-{len(diff.removed)} ~{len(diff.moved)}) за {result.duration * 1000:.1f} мс.")
 
     def check_teleport_conditions(self):
         """Проверяет, не упал ли персонаж за пределы экрана."""
@@ -72,4 +163,4 @@ class PlatformManager:
         if self.character.y > max_y + 200:
             logging.warning("Персонаж упал за пределы экрана! Телепортация.")
             primary = next((m for m in self.monitors if m.is_primary), self.monitors[0])
-            self.character.teleport(primary.x + primary.width / 2, primary.y + primary.height / 2) 
\ No newline at end of file
+            self.character.teleport(primary.x + primary.width / 2, primary.y + primary.height / 2)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+import config
+
+
+def descent_time(vy0, d, gravity):
+    """
+    Момент, когда персонаж, стартовав со скоростью vy0 (vy0 <= MAX_FALL_SPEED),
+    оказывается на d ниже точки взлета на нисходящей ветви - с тем же
+    ограничением скорости падения MAX_FALL_SPEED, что и в PhysicsController.
+    Возвращает (время, достижимо); работает и с числами, и с массивами NumPy.
+    """
+    v_max = config.MAX_FALL_SPEED
+    # До момента t_clamp - парабола, после - равномерное падение со скоростью v_max
+    t_clamp = (v_max - vy0) / gravity
+    d_clamp = (v_max ** 2 - vy0 ** 2) / (2 * gravity)
+    disc = vy0 ** 2 + 2 * gravity * d
+    t = np.where(d <= d_clamp, (-vy0 + np.sqrt(np.maximum(disc, 0))) / gravity,
+                 t_clamp + (d - d_clamp) / v_max)
+    return t, disc >= 0
+
+
+class JumpEvaluator:
+    """
+    Пакетная проверка прыжков на NumPy. Для всех кандидатов (платформа, точка
+    приземления) сразу решает баллистику по модели WaifuCharacter
+    (jump_gravity/jump_velocity, скорость падения ограничена MAX_FALL_SPEED)
+    и точно пересекает траекторию со всеми платформами: момент касания верхней
+    грани на спуске и нижней - на подъеме.
+    """
+    def __init__(self, char_width, char_height):
+        self.char_width = char_width
+        self.char_height = char_height
+        self.set_platforms([])
+
+    def set_platforms(self, platforms):
+        """Кэширует координаты платформ массивами. Вызывается при изменении набора платформ."""
+        self.platforms = list(platforms)
+        self._positions = {id(p): i for i, p in enumerate(self.platforms)}
+        coords = np.array([(p.left, p.top, p.right, p.bottom) for p in self.platforms], dtype=float).reshape(-1, 4)
+        self.left, self.top, self.right, self.bottom = coords.T
+
+    def position(self, platform):
+        """Номер платформы в кэшированных массивах (или -1)."""
+        return self._positions.get(id(platform), -1)
+
+    def candidates(self, source, targets, samples):
+        """
+        Строит кандидатов: по samples точек приземления на каждой целевой платформе.
+        Платформы, которых нет в кэше (set_platforms еще не вызван для нового
+        набора), пропускаются. Возвращает (номера целей, landing_x, takeoff_x) массивами.
+        """
+        w = self.char_width
+        positions = [i for i in (self.position(p) for p in targets) if i >= 0]
+        target_idx = np.repeat(positions, samples).astype(int)
+        fractions = np.tile(np.linspace(0.0, 1.0, samples), len(positions))
+        land_min = self.left[target_idx]
+        land_max = np.maximum(land_min, self.right[target_idx] - w)
+        landing_x = land_min + (land_max - land_min) * fractions
+        takeoff_x = np.clip(landing_x, source.left, max(source.left, source.right - w))
+        return target_idx, landing_x, takeoff_x
+
+    def evaluate(self, source, target_idx, landing_x, takeoff_x, start_x, gravity, jump_velocity):
+        """
+        Возвращает (mask, cost): mask - прыжок выполним и траектория не задевает
+        другие платформы, cost - время в секундах (дойти до точки взлета + полет).
+        """
+        w, h, g = self.char_width, self.char_height, gravity
+        y0 = source.top - h
+        dx = landing_x - takeoff_x
+        dy = (self.top[target_idx] - h) - y0
+
+        # Баллистика, как в AIController.jump_to_platform
+        up = dy <= 0
+        vy0 = np.where(up, -jump_velocity, 0.0)
+        flight_time, mask = descent_time(vy0, dy, g)
+        mask &= flight_time > 0
+        safe_time = np.where(flight_time > 0, flight_time, 1.0)
+        vx = dx / safe_time
+        mask &= np.abs(vx) <= config.MAX_HORIZONTAL_SPEED
+
+        # Матрицы кандидат x платформа
+        vy0_c, vx_c, t_c, x0_c = vy0[:, None], vx[:, None], flight_time[:, None], takeoff_x[:, None]
+        eps = 1e-6
+
+        # Приземление на чужую верхнюю грань: ноги пересекают top на нисходящей ветви
+        t_top, reach_top = descent_time(vy0_c, self.top - h - y0, g)
+        x_top = x0_c + vx_c * t_top
+        hits = reach_top & (t_top > eps) & (t_top < t_c - eps) & \
+               (np.maximum(x_top, self.left) < np.minimum(x_top + w, self.right))
+
+        # Удар головой о нижнюю грань на восходящей ветви
+        d_bottom = vy0_c ** 2 + 2 * g * (self.bottom - y0)
+        t_bottom = (-vy0_c - np.sqrt(np.maximum(d_bottom, 0))) / g
+        x_bottom = x0_c + vx_c * t_bottom
+        hits |= (vy0_c < 0) & (d_bottom >= 0) & (t_bottom > eps) & (t_bottom < t_c - eps) & \
+                (np.maximum(x_bottom, self.left) < np.minimum(x_bottom + w, self.right))
+
+        # Исходная и целевая платформы игнорируются физикой во время прыжка
+        source_idx = self.position(source)
+        if source_idx >= 0:
+            hits[:, source_idx] = False
+        hits[np.arange(len(target_idx)), target_idx] = False
+        mask &= ~hits.any(axis=1)
+
+        cost = np.abs(start_x - takeoff_x) / config.WALK_SPEED + flight_time
+        return mask, cost
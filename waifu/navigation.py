@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+from collections import namedtuple
+
+import config
+
+# Ребро графа: прыжок с платформы source на target.
+# takeoff/landing - допустимые интервалы X персонажа на платформах,
+# takeoff_x/landing_x - выбранные точки прыжка, cost - стоимость для планировщика.
+JumpEdge = namedtuple("JumpEdge", "source target takeoff landing takeoff_x landing_x cost")
+
+
+class NavigationGraph:
+    """
+    Граф достижимости платформ: узлы - платформы, ребра - выполнимые прыжки.
+    Строится инкрементально по PlatformDiff; для каждой непроходимой пары
+    запоминается платформа, которая перекрывает прыжок, чтобы пересчитать
+    пару, когда эта платформа исчезнет или сдвинется.
+
+    Коридоры ребер лежат в сетке по оси X (как в PlatformIndex), поэтому новая
+    платформа проверяет только ребра своих колонок, а не все ребра графа.
+    Граф меняется в потоке сканера; основной поток получает копию snapshot().
+    """
+    def __init__(self, char_width, char_height, platform_index, cell_width=None):
+        self.char_width = char_width
+        self.char_height = char_height
+        self.index = platform_index # Индекс того же набора платформ, уже обновленный по диффу
+        self.cell_width = cell_width or config.PLATFORM_INDEX_CELL_WIDTH
+        self._edges = {}      # платформа -> {цель: JumpEdge}
+        self._corridors = {}  # колонка -> {(source, target): коридор ребра}
+        self._blocked = {}    # платформа-препятствие -> множество пар (source, target)
+        self._blocker_of = {} # пара (source, target) -> препятствие
+        self._pairs_of = {}   # платформа -> перекрытые пары, где она source или target
+
+    def __len__(self):
+        return len(self._edges)
+
+    def __contains__(self, platform):
+        return platform in self._edges
+
+    @property
+    def blocked_pairs(self):
+        return len(self._blocker_of)
+
+    def edges_from(self, platform):
+        """Все прыжки с платформы (поиск в словаре, без перебора платформ)."""
+        return list(self._edges.get(platform, {}).values())
+
+    def snapshot(self):
+        """Копия ребер только для чтения - для основного потока, пока этот граф меняется дальше."""
+        graph = NavigationGraph(self.char_width, self.char_height, None, self.cell_width)
+        graph._edges = {platform: dict(targets) for platform, targets in self._edges.items()}
+        return graph
+
+    def apply_diff(self, diff):
+        """Обновляет граф по PlatformDiff. Индекс платформ к этому моменту уже обновлен."""
+        for p in diff.removed:
+            self._remove_node(p)
+        for old, new in diff.moved:
+            self._remove_node(old)
+        for old, new in diff.moved:
+            self._add_node(new)
+        for p in diff.added:
+            self._add_node(p)
+
+    def _add_node(self, platform):
+        # Новая платформа может перекрыть уже существующие прыжки: ищем их по сетке коридоров
+        covered = {}
+        for col in self._columns(platform.left, platform.right):
+            for pair, (left, top, right, bottom) in self._corridors.get(col, {}).items():
+                if (platform.top < bottom and platform.bottom > top and
+                        max(left, platform.left) < min(right, platform.right)):
+                    covered[pair] = None
+        for source, target in covered:
+            self._drop_edge(source, target)
+            self._block((source, target), platform)
+
+        self._edges[platform] = {}
+        for other in list(self._edges):
+            if other is not platform:
+                self._link(platform, other)
+                self._link(other, platform)
+
+    def _remove_node(self, platform):
+        if platform not in self._edges: return
+        for target in list(self._edges[platform]):
+            self._drop_edge(platform, target)
+        del self._edges[platform]
+        for source, targets in self._edges.items():
+            if platform in targets:
+                self._drop_edge(source, platform)
+        # Перекрытые пары с этой платформой больше не понадобятся
+        for pair in list(self._pairs_of.get(platform, ())):
+            self._unblock(pair)
+        # Прыжки, которые перекрывала эта платформа, могли стать возможными
+        released = list(self._blocked.get(platform, ()))
+        for pair in released:
+            self._unblock(pair)
+        for source, target in released:
+            if source in self._edges and target in self._edges:
+                self._link(source, target)
+
+    def _link(self, source, target):
+        edge = self._make_edge(source, target)
+        if edge is None: return
+        blocker = self.index.find_overlapping(*self._corridor(edge), exclude=(source, target))
+        if blocker is not None:
+            self._block((source, target), blocker)
+            return
+        self._store_edge(edge)
+
+    def _store_edge(self, edge):
+        self._edges[edge.source][edge.target] = edge
+        corridor = self._corridor(edge)
+        for col in self._columns(corridor[0], corridor[2]):
+            self._corridors.setdefault(col, {})[(edge.source, edge.target)] = corridor
+
+    def _drop_edge(self, source, target):
+        edge = self._edges[source].pop(target, None)
+        if edge is None: return
+        left, _, right, _ = self._corridor(edge)
+        for col in self._columns(left, right):
+            cell = self._corridors[col]
+            del cell[(source, target)]
+            if not cell:
+                del self._corridors[col]
+
+    def _block(self, pair, blocker):
+        self._unblock(pair)
+        self._blocked.setdefault(blocker, set()).add(pair)
+        self._blocker_of[pair] = blocker
+        for node in pair:
+            self._pairs_of.setdefault(node, set()).add(pair)
+
+    def _unblock(self, pair):
+        blocker = self._blocker_of.pop(pair, None)
+        if blocker is None: return
+        pairs = self._blocked[blocker]
+        pairs.discard(pair)
+        if not pairs:
+            del self._blocked[blocker]
+        for node in pair:
+            node_pairs = self._pairs_of.get(node)
+            if node_pairs is not None:
+                node_pairs.discard(pair)
+                if not node_pairs:
+                    del self._pairs_of[node]
+
+    def _columns(self, left, right):
+        return range(int(left // self.cell_width), int((right - 1) // self.cell_width) + 1)
+
+    def _make_edge(self, source, target):
+        """Строит ребро, если прыжок возможен по высоте; иначе None."""
+        if target.top <= 0:
+            return None
+        is_jumping_down = target.top > source.top
+        if not is_jumping_down and (source.top - target.top) > config.JUMP_HEIGHT:
+            return None
+
+        takeoff = (source.left, max(source.left, source.right - self.char_width))
+        landing = (target.left, max(target.left, target.right - self.char_width))
+        # Точка приземления - ближайшая к середине исходной платформы, взлет - ближайший к ней
+        landing_x = max(landing[0], min((takeoff[0] + takeoff[1]) / 2, landing[1]))
+        takeoff_x = max(takeoff[0], min(landing_x, takeoff[1]))
+        cost = abs(landing_x - takeoff_x) + abs(target.top - source.top) + config.NAV_JUMP_COST
+        return JumpEdge(source, target, takeoff, landing, takeoff_x, landing_x, cost)
+
+    def _corridor(self, edge):
+        """Прямоугольник (left, top, right, bottom), который должен быть свободен для прыжка."""
+        return (min(edge.takeoff_x, edge.landing_x),
+                min(edge.source.top, edge.target.top),
+                max(edge.takeoff_x, edge.landing_x) + self.char_width,
+                max(edge.source.top, edge.target.top))
+
+    def find_path(self, start, goals):
+        """
+        A* от платформы start до ближайшей из goals.
+        Возвращает список ребер (пустой, если start уже цель) или None, если пути нет.
+        """
+        goals = [g for g in goals if g in self._edges]
+        if start in goals:
+            return []
+        if start not in self._edges or not goals:
+            return None
+
+        def heuristic(p):
+            # Допустимая оценка: вертикальное расстояние входит в стоимость каждого прыжка
+            return min(abs(p.top - g.top) for g in goals)
+
+        counter = itertools.count()
+        open_heap = [(heuristic(start), next(counter), start)]
+        best_cost = {start: 0}
+        came_from = {}
+        goal_set = set(goals)
+        while open_heap:
+            _, _, node = heapq.heappop(open_heap)
+            if node in goal_set:
+                path = []
+                while node in came_from:
+                    edge = came_from[node]
+                    path.append(edge)
+                    node = edge.source
+                return path[::-1]
+            for edge in self._edges[node].values():
+                cost = best_cost[node] + edge.cost
+                if cost < best_cost.get(edge.target, float("inf")):
+                    best_cost[edge.target] = cost
+                    came_from[edge.target] = edge
+                    heapq.heappush(open_heap, (cost + heuristic(edge.target), next(counter), edge.target))
+        return None
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Расчет видимых участков верхних граней окон с учетом перекрытия.
+
+Заметающая прямая идет сверху вниз по Y. Активные окна (top <= y < bottom)
+хранятся в дереве отрезков по сжатым X-координатам: каждый узел знает
+минимальный Z-индекс накрывающих его окон. Участок грани окна с индексом z
+виден, если над ним нет активного окна с меньшим индексом (выше в Z-порядке).
+Итого O((n + k) log n), где k - число полученных сегментов.
+"""
+import heapq
+from bisect import bisect_left
+
+_INF = float("inf")
+
+
+class _CoverTree:
+    """Дерево отрезков: мультимножество Z-индексов окон, накрывающих каждый узел."""
+
+    def __init__(self, xs):
+        self.xs = xs
+        self.size = len(xs) - 1
+        nodes = 4 * max(self.size, 1)
+        self.heaps = [[] for _ in range(nodes)]
+        self.removed = [{} for _ in range(nodes)]
+        self.agg_min = [_INF] * nodes # min по листьям поддерева от min Z на пути к листу
+        self.agg_max = [_INF] * nodes # max по листьям поддерева от того же значения
+
+    def _own_min(self, node):
+        heap, removed = self.heaps[node], self.removed[node]
+        # Ленивое удаление: выбрасываем из вершины кучи уже удаленные значения
+        while heap and removed.get(heap[0]):
+            removed[heap[0]] -= 1
+            heapq.heappop(heap)
+        return heap[0] if heap else _INF
+
+    def _pull(self, node, leaf):
+        own = self._own_min(node)
+        if leaf:
+            self.agg_min[node] = self.agg_max[node] = own
+        else:
+            l, r = 2 * node, 2 * node + 1
+            self.agg_min[node] = min(own, self.agg_min[l], self.agg_min[r])
+            self.agg_max[node] = min(own, max(self.agg_max[l], self.agg_max[r]))
+
+    def update(self, ql, qr, z, add, node=1, lo=0, hi=None):
+        """Добавляет (add=True) или удаляет окно z на листах [ql, qr)."""
+        if hi is None: hi = self.size
+        if qr <= lo or hi <= ql:
+            return
+        if ql <= lo and hi <= qr:
+            if add:
+                heapq.heappush(self.heaps[node], z)
+            else:
+                self.removed[node][z] = self.removed[node].get(z, 0) + 1
+            self._pull(node, hi - lo == 1)
+            return
+        mid = (lo + hi) // 2
+        self.update(ql, qr, z, add, 2 * node, lo, mid)
+        self.update(ql, qr, z, add, 2 * node + 1, mid, hi)
+        self._pull(node, False)
+
+    def visible(self, ql, qr, z, out, node=1, lo=0, hi=None, path_min=_INF):
+        """Добавляет в out участки [ql, qr), не накрытые окнами с индексом меньше z."""
+        if hi is None: hi = self.size
+        if qr <= lo or hi <= ql:
+            return
+        path_min = min(path_min, self._own_min(node))
+        if path_min < z:
+            return # весь узел накрыт окном выше по Z
+        if ql <= lo and hi <= qr:
+            if self.agg_min[node] >= z:
+                # Весь узел виден: склеиваем с предыдущим сегментом, если он примыкает
+                left, right = self.xs[lo], self.xs[hi]
+                if out and out[-1][1] == left:
+                    out[-1] = (out[-1][0], right)
+                else:
+                    out.append((left, right))
+                return
+            if self.agg_max[node] < z:
+                return
+        mid = (lo + hi) // 2
+        self.visible(ql, qr, z, out, 2 * node, lo, mid, path_min)
+        self.visible(ql, qr, z, out, 2 * node + 1, mid, hi, path_min)
+
+
+def visible_top_edges(rects):
+    """
+    rects - прямоугольники (left, top, right, bottom) по Z-порядку, сверху вниз.
+    Возвращает для каждого окна список видимых участков (left, right) его верхней грани.
+    """
+    if not rects:
+        return []
+    xs = sorted({x for r in rects for x in (r[0], r[2])})
+
+    # События по Y: сначала удаление (на bottom), затем добавление (на top), затем запрос грани
+    events = []
+    for z, (left, top, right, bottom) in enumerate(rects):
+        if right <= left or bottom <= top:
+            continue
+        events.append((top, 1, z))
+        events.append((top, 2, z))
+        events.append((bottom, 0, z))
+    events.sort()
+
+    tree = _CoverTree(xs)
+    result = [[] for _ in rects]
+    for _, kind, z in events:
+        left, _, right, _ = rects[z]
+        ql, qr = bisect_left(xs, left), bisect_left(xs, right)
+        if kind == 2:
+            tree.visible(ql, qr, z, result[z])
+        else:
+            tree.update(ql, qr, z, add=(kind == 1))
+    return result
@@ -7,12 +7,17 @@ class PhysicsController:
     """
     Управляет всей физикой персонажа.
     Версия 5.0: Поддержка управляемой параболы прыжка через gravity_override.
+    Версия 5.1: Поиск столкновений через пространственный индекс платформ.
+    Версия 6.0: Фиксированный шаг по времени; скорости в px/с, ускорения в px/с².
     """
     def __init__(self, char_width, char_height):
         self.x = 500
         self.y = 500
         self.dx = 0
         self.dy = 0
+        # Позиция до последнего шага - для интерполяции при отрисовке
+        self.prev_x = self.x
+        self.prev_y = self.y
         
         self.on_ground = False
         self.was_on_ground = False
@@ -25,8 +30,32 @@ class PhysicsController:
         self.platform_to_ignore = None
         self.platform_to_jump_to = None
 
-    def update(self, platforms):
+    def set_position(self, x, y):
+        """Мгновенно перемещает персонажа без интерполяции с прошлой позицией."""
+        self.x, self.y = x, y
+        self.prev_x, self.prev_y = x, y
+
+    def interpolated_position(self, alpha):
+        """Позиция между двумя последними шагами физики (alpha в [0, 1])."""
+        return (self.prev_x + (self.x - self.prev_x) * alpha,
+                self.prev_y + (self.y - self.prev_y) * alpha)
+
+    def apply_platform_diff(self, diff):
+        """Переносит ссылки на сдвинутые платформы и забывает удаленные."""
+        replacements = {id(old): new for old, new in diff.moved}
+        replacements.update((id(p), None) for p in diff.removed)
+        for attr in ("current_platform", "platform_to_ignore", "platform_to_jump_to"):
+            platform = getattr(self, attr)
+            if platform is not None and id(platform) in replacements:
+                setattr(self, attr, replacements[id(platform)])
+
+    def update(self, platform_index, dt):
+        """
+        Выполняет один шаг физики длительностью dt секунд.
+        platform_index - PlatformIndex текущих платформ.
+        """
         self.was_on_ground = self.on_ground
+        self.prev_x, self.prev_y = self.x, self.y
         
         if self.on_ground:
             self.platform_to_ignore = None
@@ -34,10 +63,11 @@ class PhysicsController:
         
         # --- Основной цикл обновления физики ---
         # 1. Применяем гравитацию (если не в прыжке со своей гравитацией)
+        start_dy = self.dy
         if self.gravity_override is None:
-            self.dy += config.GRAVITY
+            self.dy += config.GRAVITY * dt
         else:
-            self.dy += self.gravity_override
+            self.dy += self.gravity_override * dt
 
         # 2. Ограничиваем максимальную скорость падения
         if self.dy > config.MAX_FALL_SPEED:
@@ -47,44 +77,31 @@ class PhysicsController:
         if abs(self.dx) > config.MAX_HORIZONTAL_SPEED:
             self.dx = config.MAX_HORIZONTAL_SPEED * (1 if self.dx > 0 else -1)
         
-        next_x = self.x + self.dx
-        next_y = self.y + self.dy
+        next_x = self.x + self.dx * dt
+        # Средняя скорость за шаг: при постоянном ускорении парабола точная при любом dt
+        next_y = self.y + (start_dy + self.dy) / 2 * dt
         
-        # 4. Ищем самую высокую платформу, на которую мы МОЖЕМ приземлиться
+        # 4. Ищем самую высокую платформу, на которую мы МОЖЕМ приземлиться.
+        # Индекс отдает только платформы под траекторией персонажа за этот шаг.
         best_platform = None
         
         # Падаем вниз или движемся горизонтально (dy >= 0)
         if self.dy >= 0:
-            potential_grounds = []
-            
-            for p in platforms:
-                if p == self.platform_to_ignore:
-                    continue
-                # Проверяем горизонтальное пересечение
-                if max(next_x, p.left) < min(next_x + self.char_width, p.right):
-                    # Персонаж должен пересечь верхнюю грань платформы за этот кадр
-                    if (self.y + self.char_height) <= p.top + 1 and (next_y + self.char_height) >= p.top:
-                        potential_grounds.append(p)
-            
-            if potential_grounds:
-                # Выбираем самую высокую из возможных платформ (с наименьшим Y)
-                best_platform = min(potential_grounds, key=lambda p: p.top)
+            # Персонаж должен пересечь верхнюю грань платформы за этот кадр
+            best_platform = platform_index.find_ground(
+                next_x, next_x + self.char_width,
+                self.y + self.char_height - 1, next_y + self.char_height,
+                ignore=self.platform_to_ignore)
         
         # NEW: Проверка столкновения с потолком (когда прыгаем вверх)
         else: # self.dy < 0
-            potential_ceilings = []
-            for p in platforms:
-                 if p == self.platform_to_ignore or p == self.platform_to_jump_to:
-                    continue
-                 # Проверяем горизонтальное пересечение
-                 if max(next_x, p.left) < min(next_x + self.char_width, p.right):
-                    # Персонаж должен пересечь нижнюю грань платформы за этот кадр
-                    if self.y >= p.bottom and next_y <= p.bottom:
-                        potential_ceilings.append(p)
+            # Персонаж должен пересечь нижнюю грань платформы за этот кадр
+            best_ceiling = platform_index.find_ceiling(
+                next_x, next_x + self.char_width, next_y, self.y,
+                ignore=(self.platform_to_ignore, self.platform_to_jump_to))
             
-            if potential_ceilings:
-                # Выбираем самый низкий потолок, в который врезались
-                best_ceiling = max(potential_ceilings, key=lambda p: p.bottom)
+            if best_ceiling:
+                # Упираемся в самый низкий потолок, в который врезались
                 self.y = best_ceiling.bottom
                 self.dy = 0 # Обнуляем скорость, чтобы начать падать
                 # self.platform_to_ignore = None # НЕ СБРАСЫВАЕМ! Иначе сразу приземлимся на исходную.
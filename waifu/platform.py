@@ -1,24 +1,251 @@
 # -*- coding: utf-8 -*-
 
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import config
+
+# Разница между двумя сканированиями: moved - пары (старая, новая) платформа
+PlatformDiff = namedtuple("PlatformDiff", "added removed moved")
+
+
+def merge_diffs(first, second):
+    """
+    Склеивает два последовательных диффа (A -> B и B -> C) в один A -> C.
+    Платформы сравниваются по идентичности; ушедшая и пришедшая платформы
+    с одним key становятся парой moved.
+    """
+    def leaving(diff):
+        return list(diff.removed) + [old for old, _ in diff.moved]
+
+    def entering(diff):
+        return list(diff.added) + [new for _, new in diff.moved]
+
+    entered_first = {id(p) for p in entering(first)}
+    left_second = {id(p) for p in leaving(second)}
+    gone = leaving(first) + [p for p in leaving(second) if id(p) not in entered_first]
+    came = [p for p in entering(first) if id(p) not in left_second] + entering(second)
+
+    gone_by_key = {p.key: p for p in gone}
+    added, moved = [], []
+    for p in came:
+        old = gone_by_key.pop(p.key, None)
+        if old is None:
+            added.append(p)
+        else:
+            moved.append((old, p))
+    return PlatformDiff(added, list(gone_by_key.values()), moved)
+
+
 class Platform:
-    """Представляет платформу, по которой может ходить персонаж (окно или край монитора)."""
-    def __init__(self, left, top, right, bottom, platform_type='floor', is_target=False):
+    """
+    Представляет платформу, по которой может ходить персонаж (окно или край монитора).
+    Хешируется по геометрии; key - устойчивый идентификатор источника (hwnd окна
+    или номер монитора), по которому сопоставляются платформы между сканированиями.
+    Геометрию после создания не меняем: сдвинутое окно - это новая платформа.
+    """
+    __slots__ = ("left", "top", "right", "bottom", "platform_type", "is_target", "key", "_hash")
+
+    def __init__(self, left, top, right, bottom, platform_type='floor', is_target=False, key=None):
         self.left = left
         self.top = top
         self.right = right
         self.bottom = bottom
         self.platform_type = platform_type
         self.is_target = is_target
+        self.key = key
+        self._hash = hash(self._geometry())
 
     @property
     def width(self):
         return self.right - self.left
+
+    def _geometry(self):
+        return (self.left, self.top, self.right, self.bottom, self.platform_type)
         
     def __eq__(self, other):
         if not isinstance(other, Platform):
             return NotImplemented
-        return (self.left == other.left and
-                self.top == other.top and
-                self.right == other.right and
-                self.bottom == other.bottom and
-                self.platform_type == other.platform_type) 
\ No newline at end of file
+        return self._geometry() == other._geometry()
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return f"Platform({self.left}, {self.top}, {self.right}, {self.bottom}, key={self.key!r})"
+
+
+class PlatformStore:
+    """
+    Текущий набор платформ, сопоставленный по key. Каждое новое сканирование
+    применяется как дифф: у неизменившихся платформ сохраняется идентичность объекта,
+    поэтому ссылки вроде platform_to_ignore переживают пересканирование.
+    """
+    def __init__(self):
+        self._by_key = {}
+
+    @property
+    def platforms(self):
+        return list(self._by_key.values())
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def apply(self, platforms):
+        """Заменяет набор платформ новым и возвращает PlatformDiff."""
+        added, moved = [], []
+        new_by_key = {}
+        for p in platforms:
+            old = self._by_key.get(p.key)
+            if old is None:
+                added.append(p)
+                new_by_key[p.key] = p
+            elif old == p:
+                old.is_target = p.is_target # не влияет на хеш
+                new_by_key[p.key] = old
+            else:
+                moved.append((old, p))
+                new_by_key[p.key] = p
+        removed = [p for key, p in self._by_key.items() if key not in new_by_key]
+        self._by_key = new_by_key
+        return PlatformDiff(added, removed, moved)
+
+
+class PlatformIndex:
+    """
+    Пространственный индекс платформ: равномерная сетка по оси X,
+    внутри каждой колонки платформы отсортированы по top и по bottom.
+    Обновляется инкрементально по диффу при публикации нового набора платформ.
+    """
+    def __init__(self, platforms=(), cell_width=None):
+        self.cell_width = cell_width or config.PLATFORM_INDEX_CELL_WIDTH
+        self._platforms = {} # id(платформы) -> платформа: членство по идентичности, не по геометрии
+        self._by_top = {}    # колонка -> (список top, список платформ)
+        self._by_bottom = {} # колонка -> (список bottom, список платформ)
+        self._max_height = 0 # Для поиска по прямоугольнику через сортировку по top
+        for p in platforms:
+            self.add(p)
+
+    @property
+    def platforms(self):
+        return list(self._platforms.values())
+
+    def __iter__(self):
+        return iter(self._platforms.values())
+
+    def __len__(self):
+        return len(self._platforms)
+
+    def __contains__(self, platform):
+        return self._platforms.get(id(platform)) is platform
+
+    def add(self, p):
+        if p in self: return
+        self._platforms[id(p)] = p
+        self._max_height = max(self._max_height, p.bottom - p.top)
+        for col in self._columns(p.left, p.right):
+            self._insert(self._by_top, col, p.top, p)
+            self._insert(self._by_bottom, col, p.bottom, p)
+
+    def remove(self, p):
+        if p not in self: return
+        del self._platforms[id(p)]
+        for col in self._columns(p.left, p.right):
+            self._delete(self._by_top, col, p.top, p)
+            self._delete(self._by_bottom, col, p.bottom, p)
+
+    def apply_diff(self, diff):
+        """
+        Применяет PlatformDiff без перестройки всего индекса. Сначала удаляется
+        все старое, потом добавляется новое: новая геометрия одной платформы может
+        совпасть со старой геометрией другой, еще не удаленной.
+        """
+        for p in diff.removed:
+            self.remove(p)
+        for old, _ in diff.moved:
+            self.remove(old)
+        for _, new in diff.moved:
+            self.add(new)
+        for p in diff.added:
+            self.add(p)
+
+    def _columns(self, left, right):
+        return range(int(left // self.cell_width), int((right - 1) // self.cell_width) + 1)
+
+    @staticmethod
+    def _insert(buckets, col, key, platform):
+        keys, items = buckets.setdefault(col, ([], []))
+        i = bisect_right(keys, key)
+        keys.insert(i, key)
+        items.insert(i, platform)
+
+    @staticmethod
+    def _delete(buckets, col, key, platform):
+        keys, items = buckets[col]
+        for i in range(bisect_left(keys, key), bisect_right(keys, key)):
+            if items[i] is platform:
+                del keys[i]
+                del items[i]
+                break
+        if not keys:
+            del buckets[col]
+
+    def find_overlapping(self, left, top, right, bottom, exclude=()):
+        """
+        Возвращает любую платформу (кроме exclude), пересекающую прямоугольник
+        [left, right) x [top, bottom), или None.
+        """
+        for col in self._columns(left, right):
+            bucket = self._by_top.get(col)
+            if not bucket: continue
+            keys, items = bucket
+            for i in range(bisect_right(keys, top - self._max_height), bisect_left(keys, bottom)):
+                p = items[i]
+                if p.bottom > top and max(left, p.left) < min(right, p.right) \
+                        and not any(p is q for q in exclude):
+                    return p
+        return None
+
+    def find_ground(self, left, right, y_from, y_to, ignore=None):
+        """
+        Возвращает самую высокую платформу, пересекающую [left, right) по X,
+        у которой y_from <= top <= y_to (верхняя грань пересечена за шаг).
+        """
+        best = None
+        for col in self._columns(left, right):
+            bucket = self._by_top.get(col)
+            if not bucket: continue
+            keys, items = bucket
+            for i in range(bisect_left(keys, y_from), len(keys)):
+                top = keys[i]
+                if top > y_to or (best is not None and top >= best.top):
+                    break
+                p = items[i]
+                if p is ignore: # идентичность платформ устойчива между сканированиями
+                    continue
+                if max(left, p.left) < min(right, p.right):
+                    best = p
+                    break
+        return best
+
+    def find_ceiling(self, left, right, y_from, y_to, ignore=()):
+        """
+        Возвращает самый низкий потолок, пересекающий [left, right) по X,
+        у которого y_from <= bottom <= y_to (нижняя грань пересечена за шаг).
+        """
+        best = None
+        for col in self._columns(left, right):
+            bucket = self._by_bottom.get(col)
+            if not bucket: continue
+            keys, items = bucket
+            for i in range(bisect_right(keys, y_to) - 1, -1, -1):
+                bottom = keys[i]
+                if bottom < y_from or (best is not None and bottom <= best.bottom):
+                    break
+                p = items[i]
+                if any(p is q for q in ignore):
+                    continue
+                if max(left, p.left) < min(right, p.right):
+                    best = p
+                    break
+        return best
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import pygame
+
+
+class Renderer:
+    """
+    Отрисовка персонажа с отслеживанием изменений. Кадр перерисовывается,
+    только если сменился ключ (состояние, направление, индекс кадра), и на экран
+    выводится лишь грязная область - объединение непрозрачных границ старого
+    и нового спрайта. Окно двигается, только когда меняется целая позиция.
+    window - waifu.backends.host_window.HostWindow или None (окно не двигаем).
+    """
+    def __init__(self, screen, background, window=None):
+        self.screen = screen
+        self.background = background
+        self.window = window
+
+        self._frame_key = None
+        self._sprite_rect = None
+        self._position = None
+
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+        self.moves = 0
+        self.moves_skipped = 0
+
+    def invalidate(self):
+        """Принудительная полная перерисовка (окно было перекрыто, сменился режим и т.п.)."""
+        self._frame_key = None
+        self._sprite_rect = None
+
+    def render(self, character):
+        """Перерисовывает персонажа и двигает окно, если что-то изменилось."""
+        self.draw(character)
+        self.move(character)
+
+    def draw(self, character):
+        animation = character.animation
+        key = (character.state, character.facing_direction, animation.current_sprite_index)
+        if key == self._frame_key:
+            self.frames_skipped += 1
+            return
+        sprite = animation.get_current_sprite()
+        sprite_rect = sprite.get_bounding_rect()
+        if self._sprite_rect is None:
+            dirty = self.screen.get_rect()
+        else:
+            dirty = sprite_rect.union(self._sprite_rect)
+
+        self.screen.fill(self.background, dirty)
+        character.draw(self.screen)
+        pygame.display.update(dirty)
+
+        self._frame_key = key
+        self._sprite_rect = sprite_rect
+        self.frames_drawn += 1
+
+    def move(self, character):
+        if self.window is None:
+            return
+        position = character.render_position
+        if position == self._position:
+            self.moves_skipped += 1
+            return
+        self.window.move(*position)
+        self._position = position
+        self.moves += 1
+
+    def stats(self):
+        return {
+            "frames_drawn": self.frames_drawn,
+            "frames_skipped": self.frames_skipped,
+            "moves": self.moves,
+            "moves_skipped": self.moves_skipped,
+        }
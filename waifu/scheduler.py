@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+import pygame
+
+import config
+
+
+class FrameScheduler:
+    """
+    Адаптивный темп главного цикла. Пока персонаж стоит на земле в idle,
+    его не тащат и нет событий ввода, цикл идет с частотой IDLE_FPS и ждет
+    в pygame.event.wait - любое событие будит его сразу. На перетаскивание,
+    ходьбу, прыжок или падение сразу возвращается полная частота FPS.
+
+    Также считает процессорное время по состояниям персонажа (report()),
+    чтобы было видно, сколько экономит режим простоя.
+    """
+    def __init__(self, active_fps=None, idle_fps=None, idle_delay=None):
+        self.active_fps = active_fps or config.FPS
+        self.idle_fps = idle_fps or config.IDLE_FPS
+        self.idle_delay = idle_delay or config.IDLE_RAMP_DELAY # мс без активности до перехода в простой
+        self.clock = pygame.time.Clock()
+        self.idle = False
+
+        self._last_activity = pygame.time.get_ticks()
+        self._state = None
+        self._wall_mark = time.perf_counter()
+        self._cpu_mark = time.process_time()
+        self._report_mark = self._wall_mark
+        self.state_stats = {} # состояние -> [кадры, секунды, секунды CPU]
+
+    def is_active(self, character):
+        """Нужна ли сейчас полная частота кадров."""
+        return (character.state != "idle" or not character.physics.on_ground
+                or character.input.is_mouse_dragging or character.physics.dx != 0)
+
+    def tick(self, character):
+        """Ждет следующий кадр. Возвращает (прошедшее время в мс, список событий)."""
+        self._account(character)
+        now = pygame.time.get_ticks()
+        if self.is_active(character):
+            self._last_activity = now
+        self.idle = now - self._last_activity >= self.idle_delay
+
+        if self.idle:
+            # Ждем событие не дольше, чем длится кадр простоя
+            timeout = int(1000 / self.idle_fps - self.clock.get_rawtime())
+            events = []
+            if timeout > 0:
+                event = pygame.event.wait(timeout)
+                if event.type != pygame.NOEVENT:
+                    events.append(event)
+            events += pygame.event.get()
+            delta_time = self.clock.tick()
+        else:
+            delta_time = self.clock.tick(self.active_fps)
+            events = pygame.event.get()
+
+        if events:
+            self._last_activity = pygame.time.get_ticks()
+        return delta_time, events
+
+    def _account(self, character):
+        """Относит время и CPU прошедшего кадра к состоянию, в котором он прошел."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self._state is not None:
+            stats = self.state_stats.setdefault(self._state, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += wall - self._wall_mark
+            stats[2] += cpu - self._cpu_mark
+        self._wall_mark, self._cpu_mark = wall, cpu
+        self._state = "drag" if character.input.is_mouse_dragging else character.state
+
+        if config.DEBUG_LOGGING and wall - self._report_mark >= config.CPU_REPORT_INTERVAL:
+            self._report_mark = wall
+            logging.info(f"Нагрузка по состояниям: {self.report()}")
+
+    def report(self):
+        """Для каждого состояния: кадры, секунды, средний FPS и загрузка CPU процессом в %."""
+        return {
+            state: {
+                "frames": frames,
+                "seconds": round(seconds, 1),
+                "fps": round(frames / seconds, 1) if seconds else 0.0,
+                "cpu_percent": round(100 * cpu / seconds, 1) if seconds else 0.0,
+            }
+            for state, (frames, seconds, cpu) in self.state_stats.items()
+        }
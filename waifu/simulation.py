@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Безголовая детерминированная симуляция персонажа: без дисплея, без Win32 и
+без сети. Платформы берутся из синтетического источника окон, решения AI -
+из RNG с заданным seed, а update() вызывается подряд без clock.tick.
+
+Запуск: python -m waifu.simulation --seconds 3600 --windows 40 --seed 1
+"""
+import argparse
+import logging
+import os
+import random
+import time
+
+import config
+
+# Фиктивный видеодрайвер SDL: pygame не пытается открыть окно
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from .backends.windows import Monitor, SyntheticWindowSource
+from .character import WaifuCharacter
+
+DEFAULT_MONITORS = [Monitor(0, 0, 1920, 1080, True), Monitor(1920, 0, 1920, 1080, False)]
+
+
+def create_headless_character(window_source=None, seed=0, windows=40):
+    """Создает WaifuCharacter в безголовом режиме с синтетическими окнами и seeded RNG."""
+    if window_source is None:
+        window_source = SyntheticWindowSource.random(windows, seed=seed, monitors=DEFAULT_MONITORS)
+    return WaifuCharacter(window_source=window_source, rng=random.Random(seed), headless=True)
+
+
+def run_simulation(character, ticks, frame_ms=1000 / config.FPS):
+    """
+    Выполняет ticks вызовов character.update(frame_ms) так быстро, как возможно.
+    Возвращает статистику: смоделированное время и тики в секунду.
+    """
+    start = time.perf_counter()
+    for _ in range(ticks):
+        character.update(frame_ms)
+    elapsed = time.perf_counter() - start
+    simulated = ticks * frame_ms / 1000
+    return {
+        "ticks": ticks,
+        "elapsed_s": elapsed,
+        "simulated_s": simulated,
+        "ticks_per_second": ticks / elapsed if elapsed else float("inf"),
+        "speedup": simulated / elapsed if elapsed else float("inf"),
+        "final_position": (round(character.x, 3), round(character.y, 3)),
+        "final_state": character.state,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Безголовая симуляция Desktop Waifu")
+    parser.add_argument("--seconds", type=float, default=600, help="Сколько секунд поведения смоделировать")
+    parser.add_argument("--fps", type=float, default=config.FPS, help="Частота кадров симуляции")
+    parser.add_argument("--windows", type=int, default=40, help="Количество синтетических окон")
+    parser.add_argument("--seed", type=int, default=0, help="Seed для окон и решений AI")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    character = create_headless_character(seed=args.seed, windows=args.windows)
+    ticks = int(args.seconds * args.fps)
+    stats = run_simulation(character, ticks, frame_ms=1000 / args.fps)
+    character.shutdown()
+
+    print(f"Смоделировано {stats['simulated_s']:.0f} с за {stats['elapsed_s']:.2f} с "
+          f"({stats['ticks_per_second']:.0f} тиков/с, x{stats['speedup']:.0f}); "
+          f"позиция {stats['final_position']}, состояние {stats['final_state']}")
+
+
+if __name__ == "__main__":
+    main()
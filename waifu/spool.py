@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+
+import config
+
+
+class Spool:
+    """
+    Дисковая очередь телеметрии на случай, когда сервер недоступен.
+    Записи (JSON-объекты) дописываются строками в сегменты NNNNNNNN.seg;
+    при превышении segment_size начинается новый сегмент. Позиция чтения
+    (номер сегмента, смещение) хранится в файле offset и заменяется атомарно,
+    поэтому после падения процесса уже отправленные записи не повторяются.
+
+    Полностью прочитанные сегменты удаляются (компакция); если весь спул больше
+    max_bytes, удаляются самые старые сегменты - потеря старых данных лучше,
+    чем переполненный диск.
+    """
+    def __init__(self, directory, segment_size=None, max_bytes=None):
+        self.directory = directory
+        self.segment_size = segment_size or config.SPOOL_SEGMENT_SIZE
+        self.max_bytes = max_bytes or config.SPOOL_MAX_BYTES
+        self._lock = threading.Lock()
+        self.dropped_bytes = 0 # Сколько данных удалено из-за лимита размера
+
+        os.makedirs(directory, exist_ok=True)
+        self._sizes = {} # номер сегмента -> размер в байтах
+        for name in os.listdir(directory):
+            if name.endswith(".seg"):
+                self._sizes[int(name[:-4])] = os.path.getsize(os.path.join(directory, name))
+        if not self._sizes:
+            self._sizes[0] = 0
+
+        self._active = max(self._sizes)
+        self._repair_tail()
+        self._writer = open(self._path(self._active), "ab")
+        self._offset = self._load_offset()
+
+    # --- Запись ---
+
+    def append(self, records):
+        """Дописывает записи в конец спула."""
+        data = b"".join(json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n" for r in records)
+        if not data:
+            return
+        with self._lock:
+            if self._sizes[self._active] and self._sizes[self._active] + len(data) > self.segment_size:
+                self._rotate()
+            self._writer.write(data)
+            self._writer.flush()
+            self._sizes[self._active] += len(data)
+            self._enforce_limit()
+
+    # --- Чтение ---
+
+    @property
+    def pending(self):
+        """Есть ли непрочитанные записи."""
+        return self._offset < (self._active, self._sizes[self._active])
+
+    @property
+    def size(self):
+        return sum(self._sizes.values())
+
+    def read(self, max_records):
+        """
+        Возвращает (записи, курсор) - до max_records записей с позиции чтения.
+        Позиция не сдвигается, пока курсор не передан в commit().
+        """
+        records = []
+        with self._lock:
+            segment, position = self._offset
+            while len(records) < max_records and (segment, position) < (self._active, self._sizes[self._active]):
+                if segment not in self._sizes:
+                    segment, position = self._next_segment(segment), 0
+                    continue
+                with open(self._path(segment), "rb") as f:
+                    f.seek(position)
+                    while len(records) < max_records:
+                        line = f.readline()
+                        if not line.endswith(b"\n"):
+                            break
+                        position += len(line)
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            pass # Поврежденная строка - пропускаем
+                if len(records) < max_records and segment != self._active:
+                    segment, position = self._next_segment(segment), 0
+        return records, (segment, position)
+
+    def commit(self, cursor):
+        """Сохраняет позицию чтения и удаляет полностью прочитанные сегменты."""
+        with self._lock:
+            self._offset = max(self._offset, cursor)
+            if self._offset == (self._active, self._sizes[self._active]) and self._offset[1]:
+                # Все прочитано - начинаем новый сегмент, старый удаляется ниже
+                self._rotate()
+                self._offset = (self._active, 0)
+            self._save_offset()
+            for segment in sorted(self._sizes):
+                if segment >= self._offset[0]:
+                    break
+                self._delete(segment)
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+
+    # --- Внутреннее ---
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"{segment:08d}.seg")
+
+    def _next_segment(self, segment):
+        return min((s for s in self._sizes if s > segment), default=self._active)
+
+    def _rotate(self):
+        self._writer.close()
+        self._active += 1
+        self._sizes[self._active] = 0
+        self._writer = open(self._path(self._active), "ab")
+
+    def _delete(self, segment):
+        try:
+            os.remove(self._path(segment))
+        except OSError:
+            pass
+        del self._sizes[segment]
+
+    def _enforce_limit(self):
+        total = sum(self._sizes.values())
+        while total > self.max_bytes and len(self._sizes) > 1:
+            oldest = min(self._sizes)
+            total -= self._sizes[oldest]
+            self.dropped_bytes += self._sizes[oldest]
+            self._delete(oldest)
+            if self._offset[0] <= oldest:
+                self._offset = (min(self._sizes), 0)
+
+    def _repair_tail(self):
+        """Обрезает недописанную строку в конце активного сегмента (после падения)."""
+        path = self._path(self._active)
+        if not os.path.exists(path) or not self._sizes[self._active]:
+            return
+        with open(path, "r+b") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+                self._sizes[self._active] = end
+
+    def _load_offset(self):
+        try:
+            with open(os.path.join(self.directory, "offset"), "r") as f:
+                segment, position = (int(v) for v in f.read().split())
+        except (OSError, ValueError):
+            return (min(self._sizes), 0)
+        if segment not in self._sizes:
+            # Сегмент уже удален - читаем с первого оставшегося
+            return (min(s for s in self._sizes if s > segment), 0) if segment < self._active else (self._active, 0)
+        return (segment, min(position, self._sizes[segment]))
+
+    def _save_offset(self):
+        path = os.path.join(self.directory, "offset")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f"{self._offset[0]} {self._offset[1]}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+
+import pygame
+
+import config
+
+# Заголовок файла кеша: сигнатура, версия формата, ширина, высота, число кадров
+_HEADER = struct.Struct("<4sHHHH")
+_MAGIC = b"WSPR"
+_FORMAT_VERSION = 2
+
+
+class SpriteCache:
+    """
+    Дисковый кеш готовых (масштабированных) кадров. Кадры
+    хранятся сырыми RGBA-байтами подряд и при загрузке отображаются в память
+    (mmap) и оборачиваются в Surface без декодирования PNG и масштабирования.
+
+    Ключ - хеш содержимого исходного файла, целевой размер, режим масштабирования
+    и версия pygame: при изменении любого из них кеш пересобирается сам.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or config.SPRITE_CACHE_DIR
+        self._maps = [] # Открытые mmap, на которые ссылаются поверхности
+
+    def close(self):
+        """Освобождает mmap; поверхности из load() после этого использовать нельзя."""
+        for data in self._maps:
+            try:
+                data.close()
+            except BufferError:
+                pass # На буфер еще ссылается живая поверхность
+        self._maps = []
+
+    def key(self, path, size, mode):
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(f"{size[0]}x{size[1]}:{mode}:{pygame.version.ver}:{_FORMAT_VERSION}".encode())
+        return digest.hexdigest()[:20]
+
+    def _path(self, name, key):
+        return os.path.join(self.directory, f"{name}-{key}.raw")
+
+    def load(self, name, key):
+        """Возвращает список кадров из кеша или None, если записи нет или она повреждена."""
+        path = self._path(name, key)
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        magic, version, width, height, count = _HEADER.unpack_from(data) if len(data) >= _HEADER.size else (None,) * 5
+        frame_size = width * height * 4 if magic == _MAGIC else 0
+        if magic != _MAGIC or version != _FORMAT_VERSION or len(data) != _HEADER.size + frame_size * count:
+            data.close()
+            logging.warning(f"Кеш спрайта {name} поврежден, пересобираю.")
+            return None
+
+        view = memoryview(data)
+        frames = [
+            pygame.image.frombuffer(view[_HEADER.size + i * frame_size:_HEADER.size + (i + 1) * frame_size],
+                                    (width, height), "RGBA")
+            for i in range(count)
+        ]
+        self._maps.append(data)
+        return frames
+
+    def store(self, name, key, frames):
+        """Сохраняет кадры одного размера (атомарно) и удаляет устаревшие записи этого спрайта."""
+        width, height = frames[0].get_size()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(name, key)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, width, height, len(frames)))
+                for frame in frames:
+                    f.write(pygame.image.tobytes(frame, "RGBA"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Не удалось сохранить кеш спрайта {name}: {e}")
+            return
+
+        for file_name in os.listdir(self.directory):
+            stale = os.path.join(self.directory, file_name)
+            if file_name.startswith(f"{name}-") and file_name.endswith(".raw") and stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass # Файл еще отображен в память (Windows) - удалим при следующем запуске
+
+    def get_or_build(self, name, path, size, mode, build):
+        """Возвращает кадры из кеша; при промахе вызывает build() и сохраняет результат."""
+        try:
+            key = self.key(path, size, mode)
+        except OSError:
+            return build() # Без исходного файла кешировать нечего - пусть build сообщит ошибку
+        frames = self.load(name, key)
+        if frames is None:
+            frames = build()
+            self.store(name, key, frames)
+        return frames
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+
+
+class StartupTimeline:
+    """
+    Хронология запуска: длительность каждой фазы главного потока и фоновых задач.
+    started - момент начала отсчета (time.perf_counter() в самом начале процесса).
+    """
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self._lock = threading.Lock()
+        self.phases = [] # (фаза, мс)
+        self.tasks = []  # (фоновая задача, мс)
+
+    def mark(self, phase):
+        """Завершает фазу главного потока, начатую предыдущей меткой."""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def record_task(self, name, duration_ms):
+        with self._lock:
+            self.tasks.append((name, duration_ms))
+
+    def report(self):
+        phases = ", ".join(f"{name} {ms:.0f} мс" for name, ms in self.phases)
+        report = f"Запуск за {(self._last - self.started) * 1000:.0f} мс: {phases}"
+        with self._lock:
+            if self.tasks:
+                report += "; фоновые задачи: " + ", ".join(f"{name} {ms:.0f} мс" for name, ms in self.tasks)
+        return report
+
+
+def run_in_background(name, task, timeline=None, on_done=None):
+    """
+    Выполняет задачу запуска (проверку обновлений, сервера) в фоновом потоке,
+    не задерживая появление персонажа. on_done получает результат задачи.
+    """
+    def _run():
+        start = time.perf_counter()
+        result = None
+        try:
+            result = task()
+        except Exception as e:
+            logging.error(f"Фоновая задача {name} завершилась с ошибкой: {e}", exc_info=True)
+        duration_ms = (time.perf_counter() - start) * 1000
+        if timeline is not None:
+            timeline.record_task(name, duration_ms)
+        logging.info(f"Фоновая задача {name}: {duration_ms:.0f} мс")
+        if on_done is not None:
+            on_done(result)
+
+    thread = threading.Thread(target=_run, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+
+import config
+from .spool import Spool
+
+# close() без явного таймаута: запрос, который уже идет, плюс отправка последней пачки при остановке
+DEFAULT_CLOSE_TIMEOUT = object()
+
+
+def open_spool(name):
+    """Открывает дисковый спул SPOOL_DIR/name; None, если диск недоступен."""
+    try:
+        return Spool(os.path.join(config.SPOOL_DIR, name))
+    except OSError:
+        return None
+
+
+class BatchShipper:
+    """
+    Неблокирующая отправка записей на сервер пачками.
+    submit() только кладет запись в ограниченную очередь (несколько микросекунд);
+    единственный долгоживущий фоновый поток собирает пачки по размеру или по времени,
+    сжимает их gzip и отправляет POST-запросом с JSON-массивом через одну
+    keep-alive сессию requests (пул соединений HTTP/1.1).
+
+    overflow_policy: "drop_oldest" - при переполнении вытесняются самые старые
+    записи, "drop_newest" - отбрасываются новые. Все потери учитываются в счетчиках.
+
+    Неудачная пачка повторяется с экспоненциальной задержкой; после серии
+    неудач подряд срабатывает предохранитель (circuit breaker): отправка
+    приостанавливается на TELEMETRY_BREAKER_COOLDOWN секунд.
+    Если задан spool, недоставленные записи (и очередь, пока сервер недоступен
+    или процесс завершается) сохраняются на диск и досылаются, когда сервер вернется.
+    """
+    def __init__(self, url, max_queue=None, batch_size=None, flush_interval=None,
+                 overflow_policy=None, compress=True, encode=None, spool=None, name="BatchShipper"):
+        self.url = url
+        self.max_queue = max_queue or config.LOG_QUEUE_SIZE
+        self.batch_size = batch_size or config.LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or config.LOG_FLUSH_INTERVAL
+        self.overflow_policy = overflow_policy or config.LOG_OVERFLOW_POLICY
+        self.compress = compress
+        self.encode = encode or (lambda item: item) # Превращает запись очереди в JSON-объект
+        self.spool = spool # waifu.spool.Spool: сюда уходят записи, пока сервер недоступен
+        self.session = requests.Session()
+
+        self._queue = deque()
+        self._lock = threading.Lock() # Для слияния записей в очереди (см. StatusShipper)
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._stopping = False
+
+        # Предохранитель
+        self.breaker_state = "closed" # closed / open / half_open
+        self._breaker_opened_at = 0.0
+        self._consecutive_failures = 0
+
+        # Счетчики
+        self.submitted = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.retries = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.rejected = 0
+
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        """Ставит запись в очередь без блокировки. Возвращает False, если запись отброшена."""
+        self.submitted += 1
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            if self.overflow_policy == "drop_newest":
+                return False
+            try:
+                self._queue.popleft()
+            except IndexError:
+                pass
+        self._queue.append(item)
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def stats(self):
+        connections, requests_made = self._pool_counters()
+        return {
+            "queue_depth": len(self._queue),
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "rejected": self.rejected,
+            "spool_bytes": self.spool.size if self.spool is not None else 0,
+            "spool_dropped_bytes": self.spool.dropped_bytes if self.spool is not None else 0,
+            "breaker": self.breaker_state,
+            "connections": connections,
+            "requests": requests_made,
+            "connection_reuse": (1 - connections / requests_made) if requests_made else 0.0,
+        }
+
+    def close(self, timeout=DEFAULT_CLOSE_TIMEOUT):
+        """
+        Отправляет оставшееся и останавливает поток (не дольше timeout секунд; None - до остановки).
+        По умолчанию ждет два таймаута запроса: меньший срок обрывал бы отправку на середине.
+        """
+        if timeout is DEFAULT_CLOSE_TIMEOUT:
+            timeout = 2 * config.TELEMETRY_TIMEOUT + 1
+        self._stopping = True
+        self._stop_event.set()
+        self._wakeup.set()
+        self.thread.join(timeout)
+
+    def _pool_counters(self):
+        """Сколько TCP-соединений открыто и сколько запросов через них сделано."""
+        connections = requests_made = 0
+        try:
+            pools = self.session.get_adapter(self.url).poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                connections += pool.num_connections
+                requests_made += pool.num_requests
+        except Exception:
+            pass
+        return connections, requests_made
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            stopping = self._stopping
+            if self._breaker_allows():
+                self._flush(stopping)
+            if self._queue and self.spool is not None and (stopping or self.breaker_state == "open"):
+                # Сервер недоступен или процесс завершается - сохраняем очередь на диск
+                self._spool_records(self._take_batch(len(self._queue)))
+            if stopping:
+                if self.spool is not None:
+                    self.spool.close()
+                return
+
+    def _flush(self, stopping):
+        if self.spool is not None and self.spool.pending:
+            if stopping:
+                return # Очередь ляжет в спул следом за старыми записями
+            # Сначала досылаем спул большими пачками, чтобы сохранить порядок записей
+            while self.spool.pending:
+                if self._queue:
+                    self._spool_records(self._take_batch(len(self._queue)))
+                records, cursor = self.spool.read(config.SPOOL_DRAIN_BATCH)
+                if not self._deliver(records):
+                    return
+                self.spool.commit(cursor)
+                self.replayed += len(records)
+        while self._queue:
+            records = self._take_batch(self.batch_size)
+            if not self._deliver(records):
+                if self.spool is not None:
+                    self._spool_records(records)
+                else:
+                    self.failed += len(records)
+                return
+            if not stopping and len(self._queue) < self.batch_size:
+                break # Неполную пачку отправим по таймеру
+
+    def _spool_records(self, records):
+        try:
+            self.spool.append(records)
+            self.spooled += len(records)
+        except OSError:
+            self.failed += len(records)
+
+    def _take_batch(self, size):
+        """Забирает до size записей из очереди и кодирует их в JSON-объекты."""
+        batch = []
+        with self._lock:
+            while self._queue and len(batch) < size:
+                batch.append(self._queue.popleft())
+        return [self.encode(item) for item in batch]
+
+    def _breaker_allows(self):
+        if self.breaker_state == "open":
+            if time.monotonic() - self._breaker_opened_at < config.TELEMETRY_BREAKER_COOLDOWN:
+                return False
+            self.breaker_state = "half_open" # Пробная отправка
+        return True
+
+    def _deliver(self, batch):
+        """Отправляет пачку закодированных записей с повторами. Возвращает True при успехе."""
+        attempt = 0
+        while True:
+            accepted = self._post(batch)
+            if accepted is None:
+                # Сервер отверг пачку как некорректную - повтор не поможет, не держим ее в спуле
+                self.rejected += len(batch)
+                return True
+            if accepted:
+                self._consecutive_failures = 0
+                self.breaker_state = "closed"
+                self.sent += len(batch)
+                self.batches += 1
+                return True
+
+            self._consecutive_failures += 1
+            if self.breaker_state == "half_open" or \
+                    self._consecutive_failures >= config.TELEMETRY_BREAKER_THRESHOLD:
+                self.breaker_state = "open"
+                self._breaker_opened_at = time.monotonic()
+                break
+            if attempt >= config.TELEMETRY_MAX_RETRIES or self._stopping:
+                break
+            # Экспоненциальная задержка со случайным разбросом
+            delay = min(config.TELEMETRY_BACKOFF_MAX, config.TELEMETRY_BACKOFF_BASE * 2 ** attempt)
+            self.retries += 1
+            attempt += 1
+            if self._stop_event.wait(delay * random.uniform(0.5, 1.0)):
+                break
+        return False
+
+    def _post(self, batch):
+        """True - пачка принята, False - повторить позже, None - сервер отверг ее как некорректную."""
+        body = json.dumps(batch, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        try:
+            response = self.session.post(self.url, data=body, headers=headers, timeout=config.TELEMETRY_TIMEOUT)
+        except requests.RequestException:
+            # Не логируем, чтобы не попасть в бесконечный цикл логирования
+            return False
+        if response.status_code in (400, 422):
+            return None
+        return response.ok
+
+
+class StatusShipper(BatchShipper):
+    """
+    Отправка статусов персонажа. Обновления сливаются еще в очереди с последним
+    неотправленным статусом того же клиента (client_id), где бы он ни стоял:
+    повтор того же действия отбрасывается, а статус, который продержался
+    меньше STATUS_COALESCE_WINDOW секунд (дерганье walk/idle), заменяется следующим.
+    """
+    def __init__(self, url):
+        super().__init__(url, max_queue=config.STATUS_QUEUE_SIZE, batch_size=config.STATUS_BATCH_SIZE,
+                         flush_interval=config.STATUS_FLUSH_INTERVAL, encode=lambda item: item[2],
+                         spool=open_spool("status"), name="StatusShipper")
+        self.coalesced = 0
+        # client_id -> последняя запись очереди [номер, время постановки, статус]
+        self._latest = {}
+        self._sequence = 0
+
+    def _pending(self, entry):
+        """Запись еще в очереди: очередь убывает только с головы, номера растут к хвосту."""
+        return bool(self._queue) and entry[0] >= self._queue[0][0]
+
+    def submit_status(self, payload):
+        now = time.monotonic()
+        client = payload.get("client_id")
+        with self._lock:
+            entry = self._latest.get(client)
+            if entry is not None and self._pending(entry):
+                if entry[2].get("action") == payload.get("action"):
+                    self.coalesced += 1
+                    return True
+                if now - entry[1] < config.STATUS_COALESCE_WINDOW:
+                    entry[1], entry[2] = now, payload
+                    self.coalesced += 1
+                    return True
+            self._sequence += 1
+            entry = [self._sequence, now, payload]
+            if not self.submit(entry):
+                return False
+            self._latest[client] = entry
+            return True
+
+    def stats(self):
+        stats = super().stats()
+        stats["coalesced"] = self.coalesced
+        return stats
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Дельта-обновление клиента по манифесту релиза.
+
+Манифест (manifest.json в ассетах релиза) перечисляет файлы клиента с их
+SHA-256 и размером. Клиент скачивает только файлы, чей хеш отличается от
+локального, докачивает прерванные загрузки через HTTP Range и проверяет хеш
+прямо во время загрузки. Скачанное складывается в папку staging и только
+после успешной загрузки всех файлов подменяет рабочие файлы (с откатом при ошибке).
+Файлы клиента, которых больше нет в манифесте, при установке удаляются.
+
+Создание манифеста для релиза:
+    python -m waifu.updater --version 2.1.4 \\
+        --base-url https://raw.githubusercontent.com/Timok277/Waifu/v2.1.4/ > manifest.json
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import requests
+
+import config
+
+# Что входит в клиент (относительно корня приложения)
+CLIENT_FILES = ("main_app.py", "config.py", "requirements.txt")
+CLIENT_DIRS = ("waifu", "assets")
+SKIP_DIRS = ("__pycache__",)
+
+
+class UpdateError(Exception):
+    """Обновление не удалось: некорректный манифест или файл не прошел проверку."""
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def client_files(app_dir):
+    """Относительные пути (через "/") всех файлов клиента в app_dir."""
+    paths = [p for p in CLIENT_FILES if os.path.isfile(os.path.join(app_dir, p))]
+    for directory in CLIENT_DIRS:
+        for root, dirs, files in os.walk(os.path.join(app_dir, directory)):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+            for name in sorted(files):
+                if not name.endswith((".pyc", ".pyo")):
+                    paths.append(os.path.relpath(os.path.join(root, name), app_dir).replace(os.sep, "/"))
+    return paths
+
+
+def build_manifest(app_dir, version, base_url):
+    """Строит манифест релиза по файлам клиента в app_dir."""
+    paths = client_files(app_dir)
+    return {
+        "version": version,
+        "base_url": base_url,
+        "files": [
+            {"path": p, "sha256": file_sha256(os.path.join(app_dir, p)), "size": os.path.getsize(os.path.join(app_dir, p))}
+            for p in paths
+        ],
+    }
+
+
+class Updater:
+    """
+    Загрузка и установка обновления по манифесту.
+    app_dir - корень приложения; staging_dir - куда складываются скачанные файлы
+    (по умолчанию UPDATE_STAGING_DIR внутри app_dir); session - requests.Session.
+    """
+    def __init__(self, app_dir, staging_dir=None, session=None, chunk_size=64 * 1024):
+        self.app_dir = os.path.abspath(app_dir)
+        self.staging_dir = staging_dir or os.path.join(self.app_dir, config.UPDATE_STAGING_DIR)
+        self.session = session or requests.Session()
+        self.chunk_size = chunk_size
+
+        self.bytes_downloaded = 0
+        self.bytes_resumed = 0 # Сколько байт не пришлось качать заново благодаря Range
+
+    @property
+    def is_staged(self):
+        """Обновление скачано целиком и ждет apply()."""
+        return os.path.exists(os.path.join(self.staging_dir, "manifest.json"))
+
+    # --- Манифест ---
+
+    def fetch_manifest(self, url):
+        response = self.session.get(url, timeout=config.UPDATE_TIMEOUT)
+        response.raise_for_status()
+        return self.validate_manifest(response.json())
+
+    def validate_manifest(self, manifest):
+        try:
+            entries = manifest["files"]
+            for entry in entries:
+                self._local_path(self.app_dir, entry["path"])
+                if len(entry["sha256"]) != 64 or int(entry["size"]) < 0:
+                    raise UpdateError(f"Некорректная запись манифеста: {entry['path']}")
+        except (KeyError, TypeError, ValueError) as e:
+            raise UpdateError(f"Некорректный манифест: {e}")
+        return manifest
+
+    @staticmethod
+    def _local_path(root, relative):
+        """Путь файла из манифеста внутри root; пути за пределами root запрещены."""
+        path = os.path.normpath(os.path.join(root, relative))
+        if os.path.isabs(relative) or not path.startswith(os.path.normpath(root) + os.sep):
+            raise UpdateError(f"Недопустимый путь в манифесте: {relative}")
+        return path
+
+    def changed_files(self, manifest):
+        """Записи манифеста, которых нет локально или чье содержимое отличается."""
+        changed = []
+        for entry in manifest["files"]:
+            path = self._local_path(self.app_dir, entry["path"])
+            if not os.path.isfile(path) or os.path.getsize(path) != entry["size"] \
+                    or file_sha256(path) != entry["sha256"]:
+                changed.append(entry)
+        return changed
+
+    def obsolete_files(self, manifest):
+        """Локальные файлы клиента, которых нет в манифесте (удалены в новой версии)."""
+        listed = {entry["path"] for entry in manifest["files"]}
+        return [p for p in client_files(self.app_dir) if p not in listed]
+
+    # --- Загрузка ---
+
+    def _url(self, manifest, entry):
+        return entry.get("url") or manifest["base_url"] + entry["path"]
+
+    def download(self, url, entry):
+        """
+        Скачивает файл в staging с докачкой (.part + Range) и потоковой проверкой
+        SHA-256. Возвращает путь к проверенному файлу.
+        """
+        staged = self._local_path(self.staging_dir, entry["path"])
+        if os.path.isfile(staged) and file_sha256(staged) == entry["sha256"]:
+            return staged # Уже скачан при прошлой попытке
+        os.makedirs(os.path.dirname(staged), exist_ok=True)
+
+        part = staged + ".part"
+        offset = os.path.getsize(part) if os.path.isfile(part) else 0
+        digest = hashlib.sha256()
+        if 0 < offset <= entry["size"]:
+            with open(part, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        else:
+            offset = 0
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with self.session.get(url, headers=headers, stream=True, timeout=config.UPDATE_TIMEOUT) as response:
+            if response.status_code == 416 and offset == entry["size"]:
+                pass # Файл уже докачан целиком
+            else:
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    # Сервер не поддерживает Range - качаем заново
+                    offset, digest = 0, hashlib.sha256()
+                self.bytes_resumed += offset
+                size = offset
+                with open(part, "ab" if offset else "wb") as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        size += len(chunk)
+                        if size > entry["size"]:
+                            break
+                        digest.update(chunk)
+                        f.write(chunk)
+                        self.bytes_downloaded += len(chunk)
+
+        if os.path.getsize(part) != entry["size"] or digest.hexdigest() != entry["sha256"]:
+            os.remove(part)
+            raise UpdateError(f"Файл {entry['path']} не прошел проверку SHA-256")
+        os.replace(part, staged)
+        return staged
+
+    def stage(self, manifest):
+        """
+        Скачивает все изменившиеся файлы в staging. Готовность staging отмечается
+        файлом manifest.json (изменившиеся файлы и файлы к удалению) - без него
+        apply() ничего не трогает.
+        """
+        marker = os.path.join(self.staging_dir, "manifest.json")
+        if os.path.exists(marker):
+            os.remove(marker)
+        changed = self.changed_files(manifest)
+        logging.info(f"Обновление {manifest.get('version')}: изменилось файлов - {len(changed)} из {len(manifest['files'])}")
+        for entry in changed:
+            self.download(self._url(manifest, entry), entry)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump(dict(manifest, files=changed, removed=self.obsolete_files(manifest)), f, ensure_ascii=False)
+        return changed
+
+    # --- Установка ---
+
+    def apply(self):
+        """
+        Подменяет рабочие файлы скачанными и удаляет файлы, исключенные из манифеста.
+        Старые версии сохраняются в резервную папку; при ошибке уже замененные
+        и удаленные файлы возвращаются обратно. Возвращает список обновленных путей.
+        """
+        marker = os.path.join(self.staging_dir, "manifest.json")
+        if not os.path.exists(marker):
+            return []
+        with open(marker, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        backup_dir = os.path.join(self.staging_dir, "backup")
+        replaced = [] # (рабочий путь, путь копии или None для нового файла)
+        try:
+            for relative in manifest.get("removed", ()):
+                target = self._local_path(self.app_dir, relative)
+                if os.path.exists(target):
+                    backup = self._local_path(backup_dir, relative)
+                    os.makedirs(os.path.dirname(backup), exist_ok=True)
+                    os.replace(target, backup)
+                    replaced.append((target, backup))
+            for entry in manifest["files"]:
+                staged = self._local_path(self.staging_dir, entry["path"])
+                target = self._local_path(self.app_dir, entry["path"])
+                backup = None
+                if os.path.exists(target):
+                    backup = self._local_path(backup_dir, entry["path"])
+                    os.makedirs(os.path.dirname(backup), exist_ok=True)
+                    shutil.copy2(target, backup)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(staged, target)
+                replaced.append((target, backup))
+        except OSError as e:
+            for target, backup in reversed(replaced):
+                if backup is not None:
+                    os.replace(backup, target)
+                elif os.path.exists(target):
+                    os.remove(target)
+            raise UpdateError(f"Не удалось установить обновление, изменения отменены: {e}")
+
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        return [entry["path"] for entry in manifest["files"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Создание манифеста релиза для дельта-обновления")
+    parser.add_argument("--version", required=True, help="Версия релиза")
+    parser.add_argument("--base-url", required=True, help="URL, к которому добавляются пути файлов")
+    parser.add_argument("--root", default=".", help="Корень приложения")
+    args = parser.parse_args()
+    print(json.dumps(build_manifest(args.root, args.version, args.base_url), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
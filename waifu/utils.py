@@ -2,24 +2,15 @@
 
 import logging
 import requests
-import webbrowser
 import sys
 import os
 import config
-from PIL import Image
-import pygame
-import pygetwindow
-import psutil
-import random
-import math
 from datetime import datetime
-import zipfile
-import subprocess
 import threading
-from packaging.version import parse as parse_version
-import shutil
-import tempfile
-import platform
+from collections import namedtuple
+from types import SimpleNamespace
+
+from .telemetry import BatchShipper, StatusShipper, open_spool
 
 # --- Новая зависимость для get_desktop_windows ---
 try:
@@ -32,56 +23,101 @@ except ImportError:
     IS_WIN = False
 
 
-def get_desktop_windows():
+# Видимое окно рабочего стола: дескриптор, PID процесса-владельца, заголовок и (left, top, right, bottom)
+DesktopWindow = namedtuple("DesktopWindow", "hwnd pid title rect")
+
+
+def _win32_api():
+    """Собирает функции win32gui/win32process и константы win32con в один объект-бэкенд."""
+    return SimpleNamespace(
+        EnumWindows=win32gui.EnumWindows,
+        IsWindowVisible=win32gui.IsWindowVisible,
+        GetWindowText=win32gui.GetWindowText,
+        GetWindowLong=win32gui.GetWindowLong,
+        GetWindowRect=win32gui.GetWindowRect,
+        GetTopWindow=win32gui.GetTopWindow,
+        GetWindow=win32gui.GetWindow,
+        GetWindowThreadProcessId=win32process.GetWindowThreadProcessId,
+        GWL_STYLE=win32con.GWL_STYLE,
+        GWL_EXSTYLE=win32con.GWL_EXSTYLE,
+        WS_CAPTION=win32con.WS_CAPTION,
+        WS_EX_TOOLWINDOW=win32con.WS_EX_TOOLWINDOW,
+        GW_HWNDNEXT=win32con.GW_HWNDNEXT,
+    )
+
+
+def get_desktop_windows(api=None):
     """
-    Возвращает список видимых окон на рабочем столе в формате (x, y, w, h),
+    Возвращает список видимых окон рабочего стола (DesktopWindow),
     отсортированный по Z-порядку (от верхнего к нижнему).
-    Работает только под Windows.
+    api - бэкенд с интерфейсом win32gui/win32process (по умолчанию реальный Win32,
+    для тестов - waifu.backends.fake_win32.FakeWindowTree).
     """
-    if not IS_WIN:
-        return []
+    if api is None:
+        if not IS_WIN:
+            return []
+        api = _win32_api()
 
-    windows = []
+    # 1. Один проход EnumWindows: словарь hwnd -> окно для подходящих окон
+    candidates = {}
     def _enum_cb(hwnd, results):
-        if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd) != '':
-            # Пропускаем окна с определенными стилями, которые не являются "настоящими" окнами
-            style = win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
-            if not (style & win32con.WS_CAPTION): # Пропускаем окна без заголовка
-                 return True
-            ex_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-            if ex_style & win32con.WS_EX_TOOLWINDOW: # Пропускаем "инструментальные" окна
-                return True
+        if not api.IsWindowVisible(hwnd):
+            return True
+        title = api.GetWindowText(hwnd)
+        if title == '':
+            return True
+        # Пропускаем окна с определенными стилями, которые не являются "настоящими" окнами
+        style = api.GetWindowLong(hwnd, api.GWL_STYLE)
+        if not (style & api.WS_CAPTION): # Пропускаем окна без заголовка
+            return True
+        ex_style = api.GetWindowLong(hwnd, api.GWL_EXSTYLE)
+        if ex_style & api.WS_EX_TOOLWINDOW: # Пропускаем "инструментальные" окна
+            return True
 
-            rect = win32gui.GetWindowRect(hwnd)
-            if (rect[2] - rect[0]) > 0 and (rect[3] - rect[1]) > 0:
-                results.append((hwnd, rect))
+        rect = api.GetWindowRect(hwnd)
+        if (rect[2] - rect[0]) > 0 and (rect[3] - rect[1]) > 0:
+            results[hwnd] = (title, rect)
         return True
 
-    temp_windows = []
-    win32gui.EnumWindows(_enum_cb, temp_windows)
-
-    # Сортировка по Z-order. Более "высокие" окна (ближе к пользователю) идут первыми.
-    # Мы итерируемся от самого верхнего окна вниз.
-    hwnd = win32gui.GetTopWindow(None)
-    while hwnd:
-        for h, rect in temp_windows:
-            if h == hwnd:
-                windows.append(rect)
-                break
-        hwnd = win32gui.GetWindow(hwnd, win32con.GW_HWNDNEXT)
+    api.EnumWindows(_enum_cb, candidates)
+
+    # 2. Один проход по цепочке Z-order с поиском в словаре за O(1).
+    # Более "высокие" окна (ближе к пользователю) идут первыми.
+    windows = []
+    seen = set()
+    hwnd = api.GetTopWindow(None)
+    while hwnd and hwnd not in seen:
+        # Z-порядок может поменяться во время обхода - защищаемся от зацикливания
+        seen.add(hwnd)
+        found = candidates.pop(hwnd, None)
+        if found:
+            title, rect = found
+            pid = api.GetWindowThreadProcessId(hwnd)[1]
+            windows.append(DesktopWindow(hwnd, pid, title, tuple(rect)))
+        hwnd = api.GetWindow(hwnd, api.GW_HWNDNEXT)
         
     return windows
 
 def scale_image(image, scale_factor):
     """Масштабирует изображение в scale_factor раз с использованием smoothscale для лучшего качества."""
+    import pygame
     new_size = (int(image.get_width() * scale_factor), int(image.get_height() * scale_factor))
     return pygame.transform.smoothscale(image, new_size)
 
 def check_for_updates():
     """
     Проверяет наличие обновлений на GitHub, скачивает их и подготавливает
-    скрипт для установки.
+    к установке. Возвращает True, если обновление готово и приложение нужно
+    закрыть (функция выполняется в фоновом потоке, поэтому сама процесс не
+    завершает). Дельта-обновление ставит install_update() уже после остановки
+    персонажа, полный архив - скрипт updater.bat.
     """
+    # Модули, нужные только для обновления, импортируем лениво - не тормозим запуск
+    import subprocess
+    import tempfile
+    from packaging.version import parse as parse_version
+    from .updater import Updater, UpdateError
+
     logging.info(f"Текущая версия: {config.CURRENT_VERSION}")
     try:
         # 1. Получаем информацию о последнем релизе
@@ -93,16 +129,28 @@ def check_for_updates():
         logging.info(f"Последняя версия на GitHub: {latest_version}")
 
         # 2. Сравниваем версии
-        if latest_version > config.CURRENT_VERSION:
+        if parse_version(latest_version) > parse_version(config.CURRENT_VERSION):
             logging.info("Доступна новая версия! Начинаю процесс обновления...")
+            app_path = _app_path()
+            main_script_path = os.path.join(app_path, "main_app.py")
+
+            # 3. Дельта-обновление по манифесту: качаем только изменившиеся файлы
+            manifest_asset = next((a for a in latest_release['assets'] if a['name'] == config.UPDATE_MANIFEST_NAME), None)
+            if manifest_asset:
+                updater = Updater(app_path)
+                manifest = updater.fetch_manifest(manifest_asset['browser_download_url'])
+                updater.stage(manifest)
+                logging.info(f"Обновление скачано: {updater.bytes_downloaded} байт "
+                             f"(докачка сэкономила {updater.bytes_resumed} байт).")
+                return True
 
-            # 3. Находим ассет с клиентским архивом
+            # 4. Релиз без манифеста - полный архив
             asset = next((a for a in latest_release['assets'] if a['name'] == 'Client.zip'), None)
             if not asset:
                 logging.error("Не найден 'Client.zip' в последнем релизе.")
-                return
+                return False
 
-            # 4. Скачиваем архив во временную папку
+            # Скачиваем архив во временную папку
             temp_dir = tempfile.gettempdir()
             zip_path = os.path.join(temp_dir, "waifu_update.zip")
             logging.info(f"Скачиваю архив... {asset['browser_download_url']}")
@@ -114,9 +162,7 @@ def check_for_updates():
                         f.write(chunk)
             logging.info(f"Архив успешно скачан в: {zip_path}")
             
-            # 5. Создаем и запускаем .bat скрипт для обновления
-            app_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-            main_script_path = os.path.join(app_path, "main_app.py")
+            # Создаем и запускаем .bat скрипт для обновления
             pid = os.getpid()
 
             updater_script_path = os.path.join(temp_dir, "updater.bat")
@@ -142,15 +188,48 @@ del "%~f0"
 
             logging.info("Запускаю скрипт обновления и закрываю приложение...")
             subprocess.Popen([updater_script_path], creationflags=subprocess.CREATE_NEW_CONSOLE)
-            sys.exit()
+            return True
 
         else:
             logging.info("У вас последняя версия.")
 
     except requests.RequestException as e:
         logging.error(f"Ошибка при проверке обновлений: {e}")
+    except UpdateError as e:
+        # Скачанное остается в staging - следующая попытка докачает недостающее
+        logging.error(f"Ошибка обновления: {e}")
     except Exception as e:
         logging.error(f"Непредвиденная ошибка в процессе обновления: {e}", exc_info=True)
+    return False
+
+def _app_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def install_update():
+    """
+    Устанавливает дельта-обновление, скачанное check_for_updates, и запускает
+    приложение заново. Вызывается из основного потока после character.shutdown(),
+    поэтому файлы подменяются у остановленного клиента. Перед запуском нового
+    процесса дожидаемся остановки отправителей статусов и логов - их спулы
+    закрыты, и два процесса не работают с одними сегментами одновременно.
+    """
+    import subprocess
+    from .updater import Updater, UpdateError
+
+    app_path = _app_path()
+    updater = Updater(app_path)
+    if not updater.is_staged:
+        return False # Полный архив устанавливает и перезапускает updater.bat
+    try:
+        updated = updater.apply()
+        logging.info(f"Обновлено файлов: {len(updated)}. Перезапускаю приложение...")
+    except UpdateError as e:
+        # Файлы возвращены на место - перезапускаем прежнюю версию
+        logging.error(f"Ошибка установки обновления: {e}")
+    _close_telemetry_spools()
+    flags = subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform.startswith('win') else 0
+    subprocess.Popen([sys.executable, os.path.join(app_path, "main_app.py")], cwd=app_path, creationflags=flags)
+    return True
 
 def check_server_availability():
     try:
@@ -161,34 +240,80 @@ def check_server_availability():
         logging.error(f"Сервер {config.SERVER_URL} недоступен.")
     return False
 
-def send_to_server(endpoint: str, data: dict):
-    def _send():
-        try:
-            requests.post(endpoint, json=data, timeout=3)
-        except requests.exceptions.RequestException:
-            pass 
-    threading.Thread(target=_send, daemon=True).start() 
+_status_shipper = None
+_status_lock = threading.Lock()
+
+def _get_status_shipper():
+    """Единственный на процесс отправитель статусов (создается при первом статусе)."""
+    global _status_shipper
+    with _status_lock:
+        if _status_shipper is None:
+            _status_shipper = StatusShipper(f"{config.SERVER_URL}/status/batch")
+        return _status_shipper
+
+def send_status(data: dict):
+    """Ставит статус персонажа в очередь на отправку; не блокирует и не создает потоков."""
+    _get_status_shipper().submit_status(data)
+
+def telemetry_stats():
+    """Счетчики фоновой отправки: глубина очередей, переиспользование соединений, число потоков."""
+    stats = {"threads": threading.active_count()}
+    if _status_shipper is not None:
+        stats["status"] = _status_shipper.stats()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, LogstashHttpHandler):
+            stats["logs"] = handler.shipper.stats()
+    return stats
+
+def _close_telemetry_spools():
+    """Останавливает отправителей статусов и логов без таймаута: после возврата их спулы закрыты."""
+    if _status_shipper is not None:
+        _status_shipper.close(timeout=None)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, LogstashHttpHandler):
+            root.removeHandler(handler)
+            handler.shipper.close(timeout=None)
+            handler.close()
+
+def shutdown_telemetry():
+    """Досылает накопленные статусы при выходе."""
+    if _status_shipper is not None:
+        _status_shipper.close()
 
 class LogstashHttpHandler(logging.Handler):
     """
     Кастомный обработчик логов для отправки записей на HTTP эндпоинт (сервер).
+    emit() только ставит запись в очередь; отправка идет пачками в фоновом потоке
+    (см. waifu.telemetry.BatchShipper) на эндпоинт /log/batch; пока сервер
+    недоступен, записи копятся в дисковом спуле SPOOL_DIR/logs.
     """
     def __init__(self, server_url, client_id):
         super().__init__()
-        self.url = f"{server_url}/log"
+        self.url = f"{server_url}/log/batch"
         self.client_id = client_id
+        self.shipper = BatchShipper(self.url, encode=self._encode, spool=open_spool("logs"), name="LogShipper")
+        self._sender_ident = self.shipper.thread.ident
 
     def emit(self, record):
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "level": record.levelname,
-            "message": self.format(record),
-            "source": record.name,
+        # Записи самого отправителя (requests/urllib3) не отправляем - иначе цикл
+        if record.thread == self._sender_ident:
+            return
+        try:
+            self.shipper.submit((record.created, record.levelname, self.format(record), record.name))
+        except Exception:
+            self.handleError(record)
+
+    def _encode(self, item):
+        created, level, message, source = item
+        return {
+            "timestamp": datetime.utcfromtimestamp(created).isoformat(),
+            "level": level,
+            "message": message,
+            "source": source,
             "client_id": self.client_id
         }
-        try:
-            # Используем timeout, чтобы не блокировать приложение надолго
-            requests.post(self.url, json=log_entry, timeout=2)
-        except requests.RequestException:
-            # Не выводим ошибку, чтобы не попасть в бесконечный цикл логирования
-            pass 
\ No newline at end of file
+
+    def close(self):
+        self.shipper.close()
+        super().close()